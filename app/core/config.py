@@ -33,6 +33,9 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".jpg", ".jpeg", ".png", ".tiff"]
     UPLOAD_DIR: str = "uploads"
     FILE_CLEANUP_HOURS: int = 1
+    BATCH_MAX_FILES: int = 2000  # Files per batch upload (loose files or archive members)
+    BATCH_MAX_ARCHIVE_MB: int = 1024  # Size limit of a zip/tar batch upload
+    BATCH_MAX_EXTRACTED_MB: int = 4096  # Limit on the unpacked size of all archive members together
     
     # Email Configuration (MailerSend HTTP API)
     MAILERSEND_API_KEY: str = ""  # MailerSend API token
@@ -47,6 +50,66 @@ class Settings(BaseSettings):
     TESSERACT_CMD: str = "/usr/bin/tesseract"  # Path to tesseract binary
     DEFAULT_LANGUAGE: str = "eng"
     OCR_TIMEOUT_SECONDS: int = 30
+    DEFAULT_PREPROCESSING_PROFILE: str = "balanced"  # 'fast', 'balanced' or 'accurate'
+    OCR_SKIP_BLANK_PAGES: bool = True  # Detect blank pages and skip Tesseract for them
+    BLANK_PAGE_MAX_INK_RATIO: float = 0.0003  # Below this fraction of ink pixels a page is blank
+    BLANK_PAGE_MIN_STDDEV: float = 1.5  # Below this intensity std-dev a page is flat (blank)
+    OCR_AUTO_ROTATE: bool = False  # Detect 90/180/270° page orientation and fix it before OCR
+    OCR_ROTATE_MIN_CONFIDENCE: float = 2.0  # Tesseract OSD orientation confidence needed to rotate
+    OCR_ROTATE_MIN_LINES: int = 5  # Without OSD: text lines needed before the heuristic rotates
+    OCR_ROTATE_MARGIN: float = 1.5  # Without OSD: how clearly one reading must beat the other
+    OCR_TEXT_REGIONS: bool = False  # Crop detected text blocks and OCR only those
+    OCR_TEXT_REGIONS_MAX_COVERAGE: float = 0.7  # OCR the whole page if blocks cover more than this
+    OCR_TEXT_REGIONS_MAX_CALLS: int = 3  # Most blocks OCR'd one by one when each spawns tesseract (pytesseract engine)
+    OCR_PROGRESSIVE: bool = False  # Fast draft pass, then refine only low-confidence lines
+    OCR_DRAFT_PROFILE: str = "fast"  # Preprocessing profile for the draft pass
+    OCR_REFINE_CONFIDENCE: float = 70.0  # Lines below this mean confidence (0-100) are refined
+    OCR_REFINE_UPSCALE: float = 2.0  # Upscale factor for refined line crops
+    OCR_REFINE_MAX_LINES: int = 10  # More weak lines than this: one full pass with the requested profile instead
+    OCR_REFINE_MAX_CALLS: int = 2  # Same limit when each line spawns tesseract (pytesseract engine)
+    OCR_SINGLE_PASS: bool = True  # One Tesseract call per page (text + confidences)
+    OCR_PARALLEL_PAGES: bool = False  # OCR pages of a PDF concurrently on a process pool
+    OCR_WORKERS: int = 2  # Page pool size (processes)
+    OCR_JOB_MEMORY_MB: int = 512  # Memory budget for the pages of one job in flight
+    OCR_JOB_WORKERS: int = 8  # Documents in progress at once (their pages share OCR_PAGE_SLOTS)
+    OCR_JOB_QUEUE_SIZE: int = 20  # Jobs allowed to wait for a worker before uploads are refused
+    OCR_JOB_RETENTION_MINUTES: int = 60  # Finished job status kept in memory for /jobs/{job_id}
+    OCR_JOB_MAX_FINISHED: int = 5000  # Oldest finished jobs are forgotten beyond this many
+    OCR_MEMORY_BUDGET_MB: int = 1536  # Estimated memory of running jobs; more jobs wait in the queue
+    OCR_MAX_QUEUED_PAGES: int = 2000  # Pages allowed to wait before uploads get 503 + Retry-After
+    OCR_FAIR_SCHEDULING: bool = True  # Interleave pages of different users (weighted fair queuing)
+    OCR_PAGE_SLOTS: int = 2  # Pages recognized at once across all jobs
+    OCR_USER_PAGE_CAP: int = 2  # Pages of one user recognized at once
+    PDF_RASTER_WINDOW: int = 4  # Pages rendered per pdftoppm call when streaming a PDF
+    PDF_USE_TEXT_LAYER: bool = True  # Use embedded PDF text instead of OCR where present
+    PDF_TEXT_LAYER_MIN_CHARS: int = 20  # Minimum non-space characters for a usable text layer
+    PDF_TEXT_LAYER_MIN_DENSITY: float = 2.0  # Non-space characters per square inch - below it a stamp, not a page
+    PDF_TEXT_LAYER_MAX_IMAGE_COVERAGE: float = 0.5  # Pages with raster images over this share of the area get OCR
+    PDF_ADAPTIVE_DPI: bool = False  # Pick each page's DPI from its detected glyph size
+    PDF_PROBE_DPI: int = 72  # Resolution of the cheap glyph-size probe render
+    PDF_MIN_DPI: int = 100
+    PDF_MAX_DPI: int = 400
+    OCR_TARGET_XHEIGHT_PX: int = 20  # x-height Tesseract recognizes best
+    OCR_ADAPTIVE_MAX_DIMENSION: int = 4500  # Pixel cap for adaptive-DPI pages (fixed DPI uses 1500)
+    OCR_ENGINE: str = "pytesseract"  # 'pytesseract' or 'tesserocr' (persistent recognizers)
+    TESSERACT_POOL_SIZE: int = 2  # Warm recognizers per language (per process)
+    TESSERACT_RECYCLE_PAGES: int = 200  # Restart a recognizer after this many pages
+    
+    # OCR Result Cache
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "ocr_cache"
+    OCR_CACHE_MAX_MB: int = 256
+    OCR_PAGE_CACHE_ENABLED: bool = True  # Reuse results for pages with identical pixels
+    OCR_PAGE_CACHE_MAX_MB: int = 256
+
+    # Finished job results (shared by all worker processes)
+    RESULT_STORE_PATH: str = "ocr_results.db"  # SQLite file
+    RESULT_STORE_TTL_MINUTES: int = 60
+    RESULT_STORE_MAX_MB: int = 256
+
+    # Stored text compression
+    TEXT_COMPRESSION: str = "zlib"  # 'zlib' or 'zstd' (needs the zstandard package)
+    TEXT_COMPRESSION_LEVEL: int = 6
     
     # Redis (for session storage - optional for MVP)
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -68,3 +68,13 @@ class OCRProcessingException(HTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=detail
         )
+
+
+class ServiceUnavailableException(HTTPException):
+    """Raised when the server is temporarily out of OCR capacity"""
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)} if retry_after is not None else None
+        )
@@ -0,0 +1,264 @@
+"""
+app/core/text_codec.py
+Compression of stored OCR text (zlib, or zstd when installed) with a dictionary
+trained on the pages already in the database
+
+Every value starts with a 5-byte header - codec, then the id of the dictionary
+it was compressed with - so dictionaries can be retrained at any time: old rows
+keep decoding with the dictionary recorded in their header. Dictionaries are
+kept in the text_dictionaries table, next to the rows that need them.
+
+Train a dictionary from stored pages (new pages use it after a restart):
+    python -m app.core.text_codec [--size 32768] [--samples 5000]
+"""
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import argparse
+import re
+import struct
+import threading
+import zlib
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency - zlib is always available
+    zstandard = None
+
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+HEADER = struct.Struct(">BI")  # codec, dictionary id (0 = none)
+
+# zlib only looks back 32KB, so a bigger preset dictionary is wasted
+ZLIB_MAX_DICTIONARY = 32 * 1024
+
+# Fallback until a dictionary is trained. Words common in OCR'd business
+# documents; the most frequent last (zlib finds nearby matches cheaper).
+# Never edit it - rows compressed with it are decoded by its crc32 id.
+BUILTIN_DICTIONARY = (
+    " Signature Authorized Registration Description Department Information"
+    " Address Telephone Reference Agreement Customer Company Account Number"
+    " Balance Payment Subtotal Quantity Invoice Amount Total Price Date Page"
+    " Name Phone Email www. http:// .com Tel: Fax: No. Inc. Ltd. USD $ %"
+    " which would there their about other after also been from have this"
+    " with that will your are for not but all any can our has was you"
+    " the and of to in is on by at as be or a"
+).encode("utf-8")
+
+
+def dictionary_id(data: bytes) -> int:
+    return zlib.crc32(data) or 1
+
+
+class TextCodec:
+    """Encodes text to header + compressed bytes and back"""
+
+    def __init__(self, codec: str, level: int):
+        self.codec = CODEC_ZSTD if codec == "zstd" and zstandard is not None else CODEC_ZLIB
+        self.level = level
+        self._dictionaries: Dict[int, bytes] = {dictionary_id(BUILTIN_DICTIONARY): BUILTIN_DICTIONARY}
+        self._zstd_dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._lock = threading.Lock()
+        self.active_id = self._load_dictionaries()
+
+    def _load_dictionaries(self) -> int:
+        """Register every trained dictionary; the newest one compresses new text"""
+        from app.core.database import SessionLocal
+        from app.models.user import TextDictionary
+
+        active = dictionary_id(BUILTIN_DICTIONARY)
+        db = SessionLocal()
+        try:
+            rows = db.query(TextDictionary.id, TextDictionary.data).order_by(
+                TextDictionary.created_at, TextDictionary.id
+            ).all()
+        except SQLAlchemyError as e:
+            # Table not created yet - nothing can have been compressed with a trained one
+            print(f"Could not load text dictionaries, using the built-in one: {e}")
+            return active
+        finally:
+            db.close()
+
+        for dict_id, data in rows:
+            self._dictionaries[dict_id] = bytes(data)
+            active = dict_id
+        return active
+
+    def _dictionary(self, dict_id: int) -> bytes:
+        data = self._dictionaries.get(dict_id)
+        if data is None:
+            # Trained by another process after this one started
+            with self._lock:
+                self._load_dictionaries()
+            data = self._dictionaries.get(dict_id)
+            if data is None:
+                raise ValueError(f"Unknown text dictionary {dict_id:08x} - was text_dictionaries emptied?")
+        return data
+
+    def _zstd_dictionary(self, dict_id: int) -> "zstandard.ZstdCompressionDict":
+        zdict = self._zstd_dictionaries.get(dict_id)
+        if zdict is None:
+            zdict = zstandard.ZstdCompressionDict(self._dictionary(dict_id))
+            self._zstd_dictionaries[dict_id] = zdict
+        return zdict
+
+    def encode(self, text: str) -> bytes:
+        raw = text.encode("utf-8")
+        if self.codec == CODEC_ZSTD:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._zstd_dictionary(self.active_id)
+            )
+            payload = compressor.compress(raw)
+        else:
+            compressor = zlib.compressobj(
+                self.level, zdict=self._dictionary(self.active_id)[-ZLIB_MAX_DICTIONARY:]
+            )
+            payload = compressor.compress(raw) + compressor.flush()
+
+        if len(payload) >= len(raw):  # short or incompressible text
+            return HEADER.pack(CODEC_RAW, 0) + raw
+        return HEADER.pack(self.codec, self.active_id) + payload
+
+    def decode(self, value: bytes) -> str:
+        codec, dict_id = HEADER.unpack_from(value)
+        payload = value[HEADER.size:]
+        if codec == CODEC_RAW:
+            return payload.decode("utf-8")
+        if codec == CODEC_ZLIB:
+            decompressor = zlib.decompressobj(zdict=self._dictionary(dict_id)[-ZLIB_MAX_DICTIONARY:])
+            return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("Text was stored with zstd - install the zstandard package")
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dictionary(dict_id))
+            return decompressor.decompress(payload).decode("utf-8")
+        raise ValueError(f"Unknown text codec {codec}")
+
+
+_codec: Optional[TextCodec] = None
+_codec_lock = threading.Lock()
+
+
+def get_text_codec() -> TextCodec:
+    global _codec
+    with _codec_lock:
+        if _codec is None:
+            _codec = TextCodec(settings.TEXT_COMPRESSION, settings.TEXT_COMPRESSION_LEVEL)
+        return _codec
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored compressed (binary). Values are decoded when the row is
+    loaded, so map it with deferred() where listings shouldn't pay for that.
+    Plain text written before compression existed is read back unchanged.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return get_text_codec().encode(value)
+
+    def result_processor(self, dialect, coltype):
+        # Skip LargeBinary's own processor - it can't handle legacy text values
+        return lambda value: self.process_result_value(value, dialect)
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+        return get_text_codec().decode(bytes(value))
+
+
+def train_dictionary(samples: Iterable[str], size: int = ZLIB_MAX_DICTIONARY) -> bytes:
+    """
+    Build a dictionary from sample texts. With zstandard installed this is
+    zstd's trainer; otherwise the most frequent words and word pairs,
+    ordered so the most frequent end up last.
+    """
+    samples = [s for s in samples if s]
+    if zstandard is not None and len(samples) >= 10:
+        try:
+            return zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples]).as_bytes()
+        except zstandard.ZstdError:
+            pass  # too little data for zstd's trainer - use the fallback
+
+    counts: Counter = Counter()
+    for sample in samples:
+        words = re.findall(r"\S+", sample)
+        counts.update(words)
+        counts.update(" ".join(pair) for pair in zip(words, words[1:]))
+
+    # Savings ~ occurrences x length; skip what appears only once
+    ranked = sorted(
+        (item for item in counts.items() if item[1] > 1),
+        key=lambda item: item[1] * len(item[0]), reverse=True
+    )
+    chosen, used = [], 0
+    for phrase, _ in ranked:
+        entry = (" " + phrase).encode("utf-8")
+        if used + len(entry) > size:
+            continue
+        chosen.append(entry)
+        used += len(entry)
+    return b"".join(reversed(chosen))
+
+
+def save_dictionary(db: Session, data: bytes) -> int:
+    """
+    Store a dictionary under its id. The newest (created_at) one is used for
+    new text; saving one that exists again makes it the newest.
+    """
+    from app.models.user import TextDictionary
+
+    dict_id = dictionary_id(data)
+    stored = db.get(TextDictionary, dict_id)
+    if stored is None:
+        db.add(TextDictionary(id=dict_id, data=data, created_at=datetime.utcnow()))
+    else:
+        stored.created_at = datetime.utcnow()
+    db.commit()
+    return dict_id
+
+
+def main():
+    from app.core.database import SessionLocal
+    from app.models.user import DocumentPage
+
+    parser = argparse.ArgumentParser(description="Train the text compression dictionary on stored pages")
+    parser.add_argument("--size", type=int, default=ZLIB_MAX_DICTIONARY, help="dictionary size in bytes")
+    parser.add_argument("--samples", type=int, default=5000, help="most recent pages to learn from")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = db.query(DocumentPage.text).order_by(DocumentPage.id.desc()).limit(args.samples)
+        samples = [text for text, in rows]
+        if not samples:
+            raise SystemExit("No stored pages to train on")
+
+        data = train_dictionary(samples, args.size)
+        dict_id = save_dictionary(db, data)
+    finally:
+        db.close()
+
+    codec = TextCodec(settings.TEXT_COMPRESSION, settings.TEXT_COMPRESSION_LEVEL)
+    raw = sum(len(s.encode("utf-8")) for s in samples)
+    packed = sum(len(codec.encode(s)) for s in samples)
+    print(f"Dictionary {dict_id:08x} ({len(data)} bytes) stored in text_dictionaries")
+    print(f"{len(samples)} sample pages: {raw} -> {packed} bytes ({packed / raw:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 """
 app/models/user.py
-Database models for User, Session, OTP, and Document
+Database models for User, Session, OTP, Document and DocumentPage
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Float, Text, LargeBinary, UniqueConstraint, Index
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime, timedelta
 import uuid
 
 from app.core.database import Base
 from app.core.config import settings
+from app.core.text_codec import CompressedText
 
 
 class User(Base):
@@ -99,6 +100,8 @@ class OTP(Base):
 class Document(Base):
     """Processed document model - stores OCR results"""
     __tablename__ = "documents"
+    # Serves the history listing: a user's documents newest first, id breaks ties
+    __table_args__ = (Index("ix_documents_user_created", "user_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(String, unique=True, index=True, nullable=False)
@@ -106,7 +109,8 @@ class Document(Base):
     filename = Column(String, nullable=False)
     file_type = Column(String, nullable=True)  # 'pdf', 'image'
     total_pages = Column(Integer, default=1)
-    extracted_text = Column(Text, nullable=True)  # Store the extracted text
+    # Legacy rows only - text now lives in document_pages; loaded on first access
+    extracted_text = deferred(Column(Text, nullable=True))
     confidence = Column(Float, nullable=True)
     processing_time = Column(Float, nullable=True)
     status = Column(String, default="completed")  # 'processing', 'completed', 'failed'
@@ -114,3 +118,39 @@ class Document(Base):
     
     # Relationships
     user = relationship("User", back_populates="documents")
+    pages = relationship(
+        "DocumentPage", back_populates="document", cascade="all, delete-orphan",
+        order_by="DocumentPage.page_number", lazy="dynamic"
+    )
+
+
+class DocumentPage(Base):
+    """OCR result of one page of a processed document"""
+    __tablename__ = "document_pages"
+    __table_args__ = (UniqueConstraint("document_id", "page_number", name="uq_document_page"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    page_number = Column(Integer, nullable=False)
+    # Compressed at rest and loaded on first access (see DocumentService.get_pages)
+    text = deferred(Column(CompressedText, nullable=False, default=""))
+    confidence = Column(Float, nullable=True)  # None for blank pages
+    processing_time = Column(Float, nullable=True)
+    source = Column(String, default="ocr")  # 'ocr' or 'text_layer'
+    # JSON list of [text, confidence, x, y, width, height] per word
+    words = deferred(Column(CompressedText, nullable=True))
+    page_width = Column(Integer, nullable=True)
+    page_height = Column(Integer, nullable=True)
+    
+    # Relationships
+    document = relationship("Document", back_populates="pages")
+
+
+class TextDictionary(Base):
+    """Trained compression dictionary for stored text (see app.core.text_codec)"""
+    __tablename__ = "text_dictionaries"
+
+    # crc32 of the data, as written in the header of every value compressed with it
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -3,110 +3,322 @@ app/routers/ocr.py
 OCR processing API endpoints
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import APIRouter, Depends, Request, UploadFile, File, Form
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
-import uuid
+import asyncio
+import json
 import time
-import os
-from datetime import datetime
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.dependencies import get_verified_user
 from app.models.user import User, Document
-from app.schemas.ocr import OCRResponse, OCRResult
+from app.schemas.ocr import OCRBatchResponse, OCRExportRequest, OCRResponse, OCRResult, OCRStatus
 from app.services.ocr_service import OCRService
 from app.services.file_service import FileService
+from app.services.document_service import DocumentService
+from app.services.export_service import EXPORT_FORMATS, export_filename, stream_document, stream_zip
+from app.services.job_queue import OCRBatchJob, OCRJob, get_job_queue
+from app.services.ocr_cache import get_result_cache, get_page_cache
+from app.services.preprocessing import PREPROCESSING_PROFILES
+from app.services.admission import get_admission_controller
+from app.services.result_store import get_result_store
+from app.services.scheduler import get_scheduler
+from app.services.search_service import SearchIndex
 from app.core.exceptions import BadRequestException, OCRProcessingException
 
 
 router = APIRouter()
 
 
-# In-memory storage for OCR jobs (temporary, also saved to DB)
-ocr_jobs = {}
+# Comment line sent on idle event streams so proxies don't drop the connection
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _validate_profile(profile: Optional[str]):
+    if profile is not None and profile not in PREPROCESSING_PROFILES:
+        raise BadRequestException(
+            f"Unknown preprocessing profile. Supported: {', '.join(PREPROCESSING_PROFILES)}"
+        )
+
+
+def _remember_job(job: OCRJob):
+    """
+    Keep finished results for /result/{job_id} (called from the worker thread),
+    then free them on the job - the queue only holds on to its status
+    """
+    if job.status == "completed":
+        store = get_result_store()
+        store.put(job.job_id, job.user_id, job.response)
+
+        # Each file of a batch has its own result page too
+        if isinstance(job, OCRBatchJob):
+            for response in job.response.files:
+                store.put(response.job_id, job.user_id, response)
+
+    job.release_results()
+
+
+def _stored_result(job_id: str, user: User, batch: bool = False):
+    """A finished result owned by `user`, from the shared result store"""
+    stored = get_result_store().get(job_id)
+
+    if not stored or isinstance(stored[1], OCRBatchResponse) != batch:
+        raise BadRequestException("Batch not found" if batch else "Job not found")
+
+    # Verify ownership
+    user_id, response = stored
+    if user_id != user.id:
+        raise BadRequestException("Unauthorized access to job")
+
+    return response
+
+
+def _submit_upload(
+    file: UploadFile, language: Optional[str], profile: Optional[str], user: User
+) -> OCRJob:
+    """Save the upload and queue it for OCR"""
+    _validate_profile(profile)
+    # Don't spend time writing an upload that would be refused
+    get_job_queue().check_capacity()
+
+    file_path, file_hash = FileService().save_upload(file)
+    return _submit_saved(file.filename, file_path, file_hash, language, profile, user)
+
+
+def _submit_saved(
+    filename: str, file_path: str, file_hash: str,
+    language: Optional[str], profile: Optional[str], user: User
+) -> OCRJob:
+    """Queue a saved upload for OCR (the hash taken while saving is its cache key)"""
+    try:
+        job = OCRJob(user.id, filename, file_path, language, profile, file_hash=file_hash)
+        return get_job_queue().submit(job, on_complete=_remember_job)
+    except Exception:
+        FileService().delete_file(file_path)
+        raise
 
 
 @router.post("/upload", response_model=OCRResponse)
 async def upload_and_process(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     language: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    current_user: User = Depends(get_verified_user)
+):
+    """
+    Upload and process a document
+    Waits for the result - meant for small files. The work runs on the job
+    queue, so the event loop stays free; large documents should use /jobs.
+    """
+    job = await run_in_threadpool(_submit_upload, file, language, profile, current_user)
+
+    await asyncio.wrap_future(job.future)
+
+    if job.status != "completed":
+        raise OCRProcessingException(job.error or "Failed to process document")
+    return _stored_result(job.job_id, current_user)
+
+
+@router.post("/jobs", response_model=OCRStatus, status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    current_user: User = Depends(get_verified_user)
+):
+    """
+    Upload a document for background processing
+    Returns a job id straight away; poll /jobs/{job_id} for progress
+    """
+    job = await run_in_threadpool(_submit_upload, file, language, profile, current_user)
+    return job.to_status()
+
+
+@router.post("/jobs/stream", response_model=OCRStatus, status_code=202)
+async def submit_job_stream(
+    request: Request,
+    filename: str,
+    language: Optional[str] = None,
+    profile: Optional[str] = None,
+    current_user: User = Depends(get_verified_user)
+):
+    """
+    Upload a document as the raw request body (not multipart) for background processing
+    The body is written to disk as it arrives - nothing is spooled first, an
+    oversize file is refused at Content-Length or as soon as it crosses the limit.
+    """
+    _validate_profile(profile)
+    get_job_queue().check_capacity()
+
+    content_length = request.headers.get("content-length")
+    file_path, file_hash = await FileService().save_request_stream(
+        request.stream(), filename,
+        int(content_length) if content_length and content_length.isdigit() else None
+    )
+    job = await run_in_threadpool(
+        _submit_saved, filename, file_path, file_hash, language, profile, current_user
+    )
+    return job.to_status()
+
+
+@router.get("/jobs/{job_id}", response_model=OCRStatus)
+async def get_job_status(
+    job_id: str,
     current_user: User = Depends(get_verified_user),
     db: Session = Depends(get_db)
 ):
     """
-    Upload and process a document
-    This is a synchronous endpoint - file is processed immediately
+    Get page-level progress of a background OCR job
+    Live progress is known only to the server process running the job;
+    elsewhere the job is reported once it is in the history.
     """
-    start_time = time.time()
-    
-    # Initialize services
-    file_service = FileService()
-    ocr_service = OCRService()
-    
-    # Save uploaded file
-    file_path = file_service.save_upload(file)
-    
-    # Schedule cleanup
-    background_tasks.add_task(file_service.delete_file, file_path)
-    
-    try:
-        # Process file
-        results = ocr_service.process_file(file_path, language)
-        
-        total_time = time.time() - start_time
-        job_id = str(uuid.uuid4())
-        
-        # Create response
-        response = OCRResponse(
+    job = get_job_queue().get(job_id)
+
+    if job is None:
+        # Finished long ago (or handled by another worker) - fall back to history
+        document = db.query(Document).filter(
+            Document.job_id == job_id,
+            Document.user_id == current_user.id
+        ).first()
+        if not document:
+            raise BadRequestException("Job not found")
+        return OCRStatus(
             job_id=job_id,
-            filename=file.filename,
-            total_pages=len(results),
-            results=results,
-            total_processing_time=total_time,
-            created_at=datetime.utcnow()
+            status=document.status,
+            progress=100,
+            message="Processing complete",
+            total_pages=document.total_pages,
+            pages_done=document.total_pages
         )
-        
-        # Store result for later retrieval (in-memory)
-        ocr_jobs[job_id] = {
-            "user_id": current_user.id,
-            "response": response,
-            "created_at": datetime.utcnow()
-        }
-        
-        # Save to database for persistent history
-        full_text = "\n\n".join([r.text for r in results])
-        avg_confidence = sum([r.confidence for r in results]) / len(results) if results else 0
-        
-        # Determine file type
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        file_type = "pdf" if file_ext == ".pdf" else "image"
-        
-        document = Document(
-            job_id=job_id,
-            user_id=current_user.id,
-            filename=file.filename,
-            file_type=file_type,
-            total_pages=len(results),
-            extracted_text=full_text[:50000],  # Limit to 50KB of text
-            confidence=avg_confidence,
-            processing_time=total_time,
-            status="completed"
+
+    if job.user_id != current_user.id:
+        raise BadRequestException("Unauthorized access to job")
+
+    return job.to_status()
+
+
+@router.post("/batches", response_model=OCRStatus, status_code=202)
+async def submit_batch(
+    files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    language: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
+    current_user: User = Depends(get_verified_user)
+):
+    """
+    Upload many documents as one background job
+    Send several `files`, or one zip/tar `archive`. Progress is reported per
+    file on /jobs/{batch_id} and /jobs/{batch_id}/events; the combined result
+    is at /batches/{batch_id}/result once done.
+    """
+    _validate_profile(profile)
+
+    files = [f for f in (files or []) if f.filename]
+    if not files and archive is None:
+        raise BadRequestException("Send files or an archive")
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise BadRequestException(f"Too many files. Maximum per batch: {settings.BATCH_MAX_FILES}")
+
+    # Copying, unpacking and page counting all block - keep them off the event loop
+    job = await run_in_threadpool(_submit_batch, files, archive, language, profile, current_user)
+    return job.to_status()
+
+
+def _submit_batch(
+    files: List[UploadFile], archive: Optional[UploadFile],
+    language: Optional[str], profile: Optional[str], user: User
+) -> OCRBatchJob:
+    """Save the batch's files (unpacking the archive) and queue them as one job"""
+    get_job_queue().check_capacity()
+
+    file_service = FileService()
+    saved = []  # (original filename, saved path, sha256)
+    try:
+        for file in files:
+            saved.append((file.filename, *file_service.save_upload(file)))
+        if archive is not None:
+            saved.extend(file_service.save_archive(archive))
+        if len(saved) > settings.BATCH_MAX_FILES:
+            raise BadRequestException(f"Too many files. Maximum per batch: {settings.BATCH_MAX_FILES}")
+
+        job = OCRBatchJob(
+            user.id, [(name, path) for name, path, _ in saved], language, profile,
+            file_hashes=[file_hash for _, _, file_hash in saved]
         )
-        db.add(document)
-        db.commit()
-        
-        return response
-    
-    except Exception as e:
-        # Cleanup on error
-        file_service.delete_file(file_path)
-        import traceback
-        traceback.print_exc()
-        print(f"OCR processing error: {str(e)}")
-        raise OCRProcessingException(f"Failed to process document: {str(e)}")
+        return get_job_queue().submit(job, on_complete=_remember_job)
+    except Exception:
+        file_service.delete_files([path for _, path, _ in saved])
+        raise
+
+
+@router.get("/batches/{batch_id}/result", response_model=OCRBatchResponse)
+async def get_batch_result(
+    batch_id: str,
+    current_user: User = Depends(get_verified_user)
+):
+    """Get the combined result of a finished batch"""
+    return _stored_result(batch_id, current_user, batch=True)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for a background OCR job
+    `page` carries each OCRResult as soon as its page is done, `progress`
+    carries pages_done/total_pages/eta_seconds, and the stream ends with
+    `done` (or `error`). Batches send a `file` event per finished file
+    instead of `page` events. Reconnecting replays what finished so far.
+    """
+    job = get_job_queue().get(job_id)
+
+    if job is None:
+        document = db.query(Document).filter(
+            Document.job_id == job_id,
+            Document.user_id == current_user.id
+        ).first()
+        if not document:
+            raise BadRequestException("Job not found")
+
+        async def finished_stream():
+            yield _sse("done", {"job_id": job_id, "total_pages": document.total_pages})
+
+        return StreamingResponse(finished_stream(), media_type="text/event-stream")
+
+    if job.user_id != current_user.id:
+        raise BadRequestException("Unauthorized access to job")
+
+    async def event_stream():
+        queue = job.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, data)
+                if event in ("done", "error"):
+                    break
+        finally:
+            job.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/result/{job_id}", response_model=OCRResponse)
@@ -115,50 +327,63 @@ async def get_result(
     current_user: User = Depends(get_verified_user)
 ):
     """Get OCR result by job ID"""
-    job = ocr_jobs.get(job_id)
-    
-    if not job:
-        raise BadRequestException("Job not found")
-    
-    # Verify ownership
-    if job["user_id"] != current_user.id:
-        raise BadRequestException("Unauthorized access to job")
-    
-    return job["response"]
+    return _stored_result(job_id, current_user)
 
 
 @router.post("/export/{job_id}")
 async def export_text(
     job_id: str,
-    format: str = "txt",  # Future: support docx, pdf
-    current_user: User = Depends(get_verified_user)
+    format: str = "txt",  # 'txt', 'jsonl', 'hocr' or 'text-pdf'
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
 ):
-    """Export OCR result as downloadable file"""
-    job = ocr_jobs.get(job_id)
-    
-    if not job:
-        raise BadRequestException("Job not found")
-    
-    if job["user_id"] != current_user.id:
-        raise BadRequestException("Unauthorized access to job")
-    
-    response_data: OCRResponse = job["response"]
-    
-    # Combine all page texts
-    full_text = "\n\n".join([
-        f"--- Page {result.page_number} ---\n{result.text}"
-        for result in response_data.results
-    ])
-    
-    if format == "txt":
-        return PlainTextResponse(
-            content=full_text,
-            headers={
-                "Content-Disposition": f"attachment; filename={response_data.filename}_extracted.txt"
-            }
-        )
-    else:
-        raise BadRequestException("Unsupported export format")
+    """
+    Export a stored document as a downloadable file, streamed page by page.
+    `text-pdf` is the recognized text re-typeset at the word positions - page
+    images aren't kept, so it is not a searchable copy of the scan.
+    """
+    if format not in EXPORT_FORMATS:
+        raise BadRequestException(f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    document = db.query(Document).filter(
+        Document.job_id == job_id,
+        Document.user_id == current_user.id
+    ).first()
+    if not document:
+        raise BadRequestException("Document not found")
+
+    return StreamingResponse(
+        stream_document(document.id, format),
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(document, format)}"'}
+    )
+
+
+@router.post("/export")
+async def export_documents(
+    request: OCRExportRequest,
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
+):
+    """Export many documents (all of them without job_ids) as one streamed zip"""
+    if request.format not in EXPORT_FORMATS:
+        raise BadRequestException(f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    job_ids = None
+    if request.job_ids is not None:
+        job_ids = list(dict.fromkeys(request.job_ids))
+        found = db.query(Document.id).filter(
+            Document.user_id == current_user.id,
+            Document.job_id.in_(job_ids)
+        ).count()
+        if found != len(job_ids):
+            raise BadRequestException("Document not found")
+
+    return StreamingResponse(
+        stream_zip(current_user.id, job_ids, request.format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="ocr_export_{request.format}.zip"'}
+    )
 
 
 @router.get("/languages")
@@ -173,31 +398,84 @@ async def get_supported_languages():
     }
 
 
+@router.get("/profiles")
+async def get_preprocessing_profiles():
+    """Get available preprocessing profiles and their stages"""
+    return {
+        "profiles": PREPROCESSING_PROFILES,
+        "default": settings.DEFAULT_PREPROCESSING_PROFILE
+    }
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: User = Depends(get_verified_user)
+):
+    """Get OCR result cache hit/miss statistics (this worker process)"""
+    cache = get_result_cache()
+    page_cache = get_page_cache()
+    return {
+        "files": {"enabled": True, **cache.stats()} if cache else {"enabled": False},
+        "pages": {"enabled": True, **page_cache.stats()} if page_cache else {"enabled": False},
+    }
+
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(
+    current_user: User = Depends(get_verified_user)
+):
+    """Get page slot usage and queue wait times per priority class (this worker process)"""
+    scheduler = get_scheduler()
+    return {"enabled": True, **scheduler.stats()} if scheduler else {"enabled": False}
+
+
+@router.get("/capacity")
+async def get_capacity(
+    current_user: User = Depends(get_verified_user)
+):
+    """Get running/queued work against the memory and queue limits (this worker process)"""
+    return get_admission_controller().stats()
+
+
 @router.get("/history")
 async def get_document_history(
     limit: int = 10,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_verified_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's recent processed documents"""
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id
-    ).order_by(Document.created_at.desc()).limit(limit).all()
-    
+    """Get user's processed documents, newest first (pass next_cursor back for older ones)"""
+    try:
+        documents, next_cursor = DocumentService(db).get_history(current_user.id, limit, cursor)
+    except ValueError as e:
+        raise BadRequestException(str(e))
+
     return {
-        "documents": [
-            {
-                "job_id": doc.job_id,
-                "filename": doc.filename,
-                "file_type": doc.file_type,
-                "total_pages": doc.total_pages,
-                "confidence": doc.confidence,
-                "processing_time": doc.processing_time,
-                "status": doc.status,
-                "created_at": doc.created_at.isoformat()
-            }
-            for doc in documents
-        ]
+        "documents": documents,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/search")
+async def search_documents(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over the text of the user's documents, best matching pages first"""
+    if not q.strip():
+        raise BadRequestException("Search query is empty")
+
+    started = time.perf_counter()
+    hits = SearchIndex(db).search(
+        current_user.id, q, limit=max(1, min(limit, 100)), offset=max(0, offset)
+    )
+    return {
+        "query": q,
+        "hits": hits,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1)
     }
 
 
@@ -207,7 +485,11 @@ async def get_document(
     current_user: User = Depends(get_verified_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific document by job ID (from database)"""
+    """
+    Get a specific document by job ID (from database)
+    Page text is fetched separately via /document/{job_id}/pages;
+    extracted_text is only set for documents saved before per-page storage.
+    """
     document = db.query(Document).filter(
         Document.job_id == job_id,
         Document.user_id == current_user.id
@@ -229,6 +511,66 @@ async def get_document(
     }
 
 
+@router.get("/document/{job_id}/pages")
+async def get_document_pages(
+    job_id: str,
+    start: int = 1,
+    end: Optional[int] = None,
+    limit: int = 20,
+    include_words: bool = False,
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a window of pages: page numbers start..end, at most `limit` (max 100)
+    Follow `next_start` to page through the whole document.
+    """
+    document = db.query(Document).filter(
+        Document.job_id == job_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise BadRequestException("Document not found")
+    
+    service = DocumentService(db)
+    pages = service.get_pages(document, start, end, limit, include_words)
+    
+    last = pages[-1].page_number if pages else None
+    has_more = last is not None and last < min(end or document.total_pages, document.total_pages)
+    return {
+        "job_id": document.job_id,
+        "total_pages": document.total_pages,
+        "pages": [service.page_to_dict(page, include_words) for page in pages],
+        "next_start": last + 1 if has_more else None
+    }
+
+
+@router.get("/document/{job_id}/pages/{page_number}")
+async def get_document_page(
+    job_id: str,
+    page_number: int,
+    include_words: bool = True,
+    current_user: User = Depends(get_verified_user),
+    db: Session = Depends(get_db)
+):
+    """Get one page of a document, with its word boxes"""
+    document = db.query(Document).filter(
+        Document.job_id == job_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise BadRequestException("Document not found")
+    
+    service = DocumentService(db)
+    page = service.get_page(document, page_number, include_words)
+    if not page:
+        raise BadRequestException("Page not found")
+    
+    return {"job_id": document.job_id, **service.page_to_dict(page, include_words)}
+
+
 @router.delete("/document/{job_id}")
 async def delete_document(
     job_id: str,
@@ -244,12 +586,10 @@ async def delete_document(
     if not document:
         raise BadRequestException("Document not found")
     
-    db.delete(document)
-    db.commit()
+    DocumentService(db).delete_document(document)
     
-    # Also remove from in-memory cache if present
-    if job_id in ocr_jobs:
-        del ocr_jobs[job_id]
+    # Also remove the stored result if it hasn't expired yet
+    get_result_store().delete(job_id)
     
     return {"message": "Document deleted successfully"}
 
@@ -259,17 +599,9 @@ async def cleanup_old_jobs(
     current_user: User = Depends(get_verified_user)
 ):
     """Cleanup old OCR jobs (admin only in production)"""
-    cutoff_time = datetime.utcnow()
-    
-    jobs_to_delete = []
-    for job_id, job_data in ocr_jobs.items():
-        # Delete jobs older than 1 hour
-        if (cutoff_time - job_data["created_at"]).total_seconds() > 3600:
-            jobs_to_delete.append(job_id)
-    
-    for job_id in jobs_to_delete:
-        del ocr_jobs[job_id]
+    # Expired results are also purged automatically as new ones are stored
+    removed = get_result_store().purge_expired()
     
     return {
-        "message": f"Cleaned up {len(jobs_to_delete)} old jobs"
-    }
\ No newline at end of file
+        "message": f"Cleaned up {removed} old jobs"
+    }
@@ -4,15 +4,44 @@ OCR-related Pydantic schemas
 """
 
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
+class TextRegion(BaseModel):
+    """Text block sent to recognition, in preprocessed-page pixel coordinates"""
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class WordBox(BaseModel):
+    """Recognized word, in preprocessed-page pixel coordinates"""
+    text: str
+    confidence: float  # 0-100, as reported by Tesseract
+    x: int
+    y: int
+    width: int
+    height: int
+
+
 class OCRResult(BaseModel):
     page_number: int
     text: str
     confidence: Optional[float] = None
     processing_time: float
+    source: str = "ocr"  # 'ocr' or 'text_layer' (embedded PDF text)
+    dpi: Optional[int] = None  # Rasterization DPI for OCR'd PDF pages
+    is_blank: bool = False  # Blank page - OCR was skipped
+    rotation: int = 0  # Clockwise degrees applied to make the page upright
+    preprocessing_profile: Optional[str] = None
+    stage_timings: Optional[Dict[str, float]] = None  # Preprocessing stage → seconds
+    regions: Optional[List[TextRegion]] = None  # Cropped text blocks (when region detection is on)
+    refined_lines: Optional[int] = None  # Lines re-recognized by progressive OCR's second pass
+    words: Optional[List[WordBox]] = None  # Word boxes (OCR'd pages only)
+    page_width: Optional[int] = None  # Size of the image the word boxes refer to
+    page_height: Optional[int] = None
 
 
 class OCRResponse(BaseModel):
@@ -24,8 +53,32 @@ class OCRResponse(BaseModel):
     created_at: datetime
 
 
+class OCRBatchFailure(BaseModel):
+    filename: str
+    error: str
+
+
+class OCRBatchResponse(BaseModel):
+    batch_id: str
+    total_files: int
+    total_pages: int
+    files: List[OCRResponse]  # One per successfully processed file, in upload order
+    failed: List[OCRBatchFailure] = []
+    total_processing_time: float
+    created_at: datetime
+
+
 class OCRStatus(BaseModel):
     job_id: str
-    status: str  # 'processing', 'completed', 'failed'
+    status: str  # 'queued', 'processing', 'completed', 'failed'
     progress: int  # 0-100
-    message: Optional[str] = None
\ No newline at end of file
+    message: Optional[str] = None
+    total_pages: Optional[int] = None  # Known once the document has been opened
+    pages_done: int = 0
+    total_files: Optional[int] = None  # Batches only
+    files_done: int = 0
+
+
+class OCRExportRequest(BaseModel):
+    job_ids: Optional[List[str]] = None  # None exports every document of the user
+    format: str = "txt"  # 'txt', 'jsonl', 'hocr' or 'text-pdf'
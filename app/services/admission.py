@@ -0,0 +1,202 @@
+"""
+app/services/admission.py
+Admission control for the OCR path - bounds memory in use and work waiting
+"""
+
+from typing import Dict, List, Optional
+import math
+import os
+import re
+import threading
+
+from PIL import Image
+from pdf2image import pdfinfo_from_path
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.services.page_pool import estimate_page_memory_mb_for_size
+
+
+# Page size assumed when a file can't be inspected (US Letter)
+DEFAULT_PAGE_POINTS = (612, 792)
+
+# Seconds per page assumed until real jobs have been timed
+INITIAL_PAGE_SECONDS = 2.0
+
+# Weight of the newest job in the running per-page time average
+PAGE_SECONDS_SMOOTHING = 0.2
+
+MAX_RETRY_AFTER_SECONDS = 600
+
+
+class JobEstimate:
+    """Expected pages and peak memory of one job"""
+
+    def __init__(self, pages: int, memory_mb: float):
+        self.pages = pages
+        self.memory_mb = memory_mb
+
+
+def estimate_job(file_paths: List[str]) -> JobEstimate:
+    """
+    Estimate a job from its files without decoding them: page count and
+    size from the PDF info / image header. Peak memory is one rasterized
+    window plus the pages the job may have in flight, at the largest page size.
+    """
+    pages = 0
+    largest_page_mb = 0.0
+    has_pdf = False
+
+    for file_path in file_paths:
+        if os.path.splitext(file_path)[1].lower() == ".pdf":
+            has_pdf = True
+            page_count, (width, height) = _pdf_pages_and_size(file_path)
+            max_dimension = settings.OCR_ADAPTIVE_MAX_DIMENSION if settings.PDF_ADAPTIVE_DPI else 1500
+        else:
+            page_count, (width, height) = 1, _image_size(file_path)
+            max_dimension = 1500
+        pages += page_count
+        largest_page_mb = max(
+            largest_page_mb, estimate_page_memory_mb_for_size(width, height, 3, max_dimension)
+        )
+
+    resident_pages = (settings.PDF_RASTER_WINDOW if has_pdf else 1) + settings.OCR_USER_PAGE_CAP
+    return JobEstimate(max(pages, 1), largest_page_mb * resident_pages)
+
+
+def _pdf_pages_and_size(pdf_path: str):
+    """(page count, first page size in pixels at the render DPI)"""
+    try:
+        info = pdfinfo_from_path(pdf_path)
+        page_count = int(info["Pages"])
+        match = re.match(r"([\d.]+) x ([\d.]+)", info.get("Page size", ""))
+        points = (float(match.group(1)), float(match.group(2))) if match else DEFAULT_PAGE_POINTS
+    except Exception as e:
+        print(f"Could not inspect PDF for admission, assuming one letter page: {e}")
+        page_count, points = 1, DEFAULT_PAGE_POINTS
+
+    dpi = settings.PDF_MAX_DPI if settings.PDF_ADAPTIVE_DPI else 150
+    return page_count, (int(points[0] * dpi / 72), int(points[1] * dpi / 72))
+
+
+def _image_size(image_path: str):
+    try:
+        with Image.open(image_path) as image:  # reads the header only
+            return image.size
+    except Exception:
+        return (int(DEFAULT_PAGE_POINTS[0] * 150 / 72), int(DEFAULT_PAGE_POINTS[1] * 150 / 72))
+
+
+class AdmissionController:
+    """
+    Jobs start only while the estimated memory of running jobs fits the
+    budget (one job may always run, so a huge document can't wait forever);
+    the rest wait. Once the waiting pages would exceed the limit, new work
+    is refused with 503 and a Retry-After computed from the backlog and the
+    measured time per page.
+    """
+
+    def __init__(self, memory_budget_mb: int, max_queued_pages: int, page_slots: int):
+        self.memory_budget_mb = memory_budget_mb
+        self.max_queued_pages = max_queued_pages
+        self.page_slots = max(1, page_slots)
+        self.running_jobs = 0
+        self.running_pages = 0
+        self.reserved_mb = 0.0
+        self.queued_jobs = 0
+        self.queued_pages = 0
+        self.rejected = 0
+        self.page_seconds = INITIAL_PAGE_SECONDS
+        self._condition = threading.Condition()
+
+    def check(self):
+        """
+        Refuse new work while the waiting pages are already at the limit -
+        cheap enough to run before an upload is even saved
+        """
+        with self._condition:
+            if self.queued_pages >= self.max_queued_pages:
+                self.rejected += 1
+                raise ServiceUnavailableException(
+                    "OCR capacity is saturated. Please try again shortly.",
+                    retry_after=self._retry_after()
+                )
+
+    def admit(self, estimate: JobEstimate):
+        """Accept a job into the queue or raise ServiceUnavailableException"""
+        with self._condition:
+            # An empty queue always takes the job, however big
+            if self.queued_pages and self.queued_pages + estimate.pages > self.max_queued_pages:
+                self.rejected += 1
+                raise ServiceUnavailableException(
+                    "OCR capacity is saturated. Please try again shortly.",
+                    retry_after=self._retry_after()
+                )
+            self.queued_jobs += 1
+            self.queued_pages += estimate.pages
+
+    def withdraw(self, estimate: JobEstimate):
+        """Undo admit() for a job that never ran"""
+        with self._condition:
+            self.queued_jobs -= 1
+            self.queued_pages -= estimate.pages
+            self._condition.notify_all()
+
+    def start(self, estimate: JobEstimate):
+        """Block until the job's memory fits the budget, then count it as running"""
+        with self._condition:
+            while self.running_jobs and self.reserved_mb + estimate.memory_mb > self.memory_budget_mb:
+                self._condition.wait()
+            self.queued_jobs -= 1
+            self.queued_pages -= estimate.pages
+            self.running_jobs += 1
+            self.running_pages += estimate.pages
+            self.reserved_mb += estimate.memory_mb
+
+    def finish(self, estimate: JobEstimate, page_seconds: Optional[float] = None):
+        """Release a running job's reservation; `page_seconds` is its mean time per page"""
+        with self._condition:
+            self.running_jobs -= 1
+            self.running_pages -= estimate.pages
+            self.reserved_mb -= estimate.memory_mb
+            if page_seconds is not None:
+                self.page_seconds += PAGE_SECONDS_SMOOTHING * (page_seconds - self.page_seconds)
+            self._condition.notify_all()
+
+    def _retry_after(self) -> int:
+        """Seconds until the backlog ahead of a new job should have drained"""
+        backlog = self.queued_pages + self.running_pages
+        seconds = backlog * self.page_seconds / self.page_slots
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, int(math.ceil(seconds))))
+
+    def stats(self) -> Dict[str, object]:
+        with self._condition:
+            return {
+                "running_jobs": self.running_jobs,
+                "running_pages": self.running_pages,
+                "reserved_mb": round(self.reserved_mb, 1),
+                "memory_budget_mb": self.memory_budget_mb,
+                "queued_jobs": self.queued_jobs,
+                "queued_pages": self.queued_pages,
+                "max_queued_pages": self.max_queued_pages,
+                "rejected": self.rejected,
+                "seconds_per_page": round(self.page_seconds, 2),
+                "retry_after": self._retry_after(),
+            }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller, creating it on first use"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                settings.OCR_MEMORY_BUDGET_MB,
+                settings.OCR_MAX_QUEUED_PAGES,
+                settings.OCR_PAGE_SLOTS
+            )
+        return _controller
@@ -0,0 +1,225 @@
+"""
+app/services/document_service.py
+Persistence of processed documents (OCR history)
+"""
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, undefer
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+import json
+import os
+
+from app.models.user import Document, DocumentPage
+from app.schemas.ocr import OCRResult, WordBox
+from app.services.search_service import SearchIndex
+
+
+# Most pages returned by one range request
+MAX_PAGES_PER_REQUEST = 100
+
+# Most documents returned by one history request
+MAX_HISTORY_PER_REQUEST = 100
+
+# Columns listed in the history - never the (possibly huge) legacy text blob
+HISTORY_COLUMNS = (
+    Document.id, Document.job_id, Document.filename, Document.file_type,
+    Document.total_pages, Document.confidence, Document.processing_time,
+    Document.status, Document.created_at
+)
+
+
+class DocumentService:
+    """Document history service"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save_results(
+        self,
+        job_id: str,
+        user_id: int,
+        filename: str,
+        results: List[OCRResult],
+        processing_time: float,
+        commit: bool = True
+    ) -> Document:
+        """Save an OCR result to the user's document history, one row per page"""
+        # Blank pages carry no confidence
+        confidences = [r.confidence for r in results if r.confidence is not None]
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+        # Determine file type
+        file_ext = os.path.splitext(filename)[1].lower()
+        file_type = "pdf" if file_ext == ".pdf" else "image"
+
+        document = Document(
+            job_id=job_id,
+            user_id=user_id,
+            filename=filename,
+            file_type=file_type,
+            total_pages=len(results),
+            confidence=avg_confidence,
+            processing_time=processing_time,
+            status="completed"
+        )
+        self.db.add(document)
+        self.db.flush()  # assigns document.id
+
+        pages = [self._page_row(document.id, result) for result in results]
+        self.db.add_all(pages)
+        self.db.flush()  # assigns page ids, the search index rows share them
+
+        SearchIndex(self.db).index_pages(
+            document, [(page.id, page.text) for page in pages if page.text]
+        )
+        if commit:
+            self.db.commit()
+        return document
+
+    def save_batch(
+        self, user_id: int, files: List[Tuple[str, str, List[OCRResult], float]]
+    ) -> List[Document]:
+        """Save (job_id, filename, results, processing_time) of every batch file in one transaction"""
+        try:
+            documents = [
+                self.save_results(job_id, user_id, filename, results, processing_time, commit=False)
+                for job_id, filename, results, processing_time in files
+            ]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return documents
+
+    def get_history(
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        A page of the user's documents, newest first, and the cursor for the next one.
+        Keyset pagination: the cursor is the (created_at, id) of the last row, so each
+        page is one range scan of ix_documents_user_created however deep it is.
+        """
+        limit = max(1, min(limit, MAX_HISTORY_PER_REQUEST))
+        query = self.db.query(*HISTORY_COLUMNS).filter(Document.user_id == user_id)
+        if cursor:
+            created_at, document_id = self.decode_cursor(cursor)
+            query = query.filter(tuple_(Document.created_at, Document.id) < (created_at, document_id))
+
+        # One extra row tells whether there is a next page
+        rows = query.order_by(
+            Document.created_at.desc(), Document.id.desc()
+        ).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        documents = [
+            {
+                "job_id": row.job_id,
+                "filename": row.filename,
+                "file_type": row.file_type,
+                "total_pages": row.total_pages,
+                "confidence": row.confidence,
+                "processing_time": row.processing_time,
+                "status": row.status,
+                "created_at": row.created_at.isoformat()
+            }
+            for row in rows
+        ]
+        return documents, next_cursor
+
+    @staticmethod
+    def encode_cursor(created_at: datetime, document_id: int) -> str:
+        raw = f"{created_at.isoformat()}|{document_id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """Raises ValueError for anything that isn't a cursor we handed out"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+            created_at, document_id = raw.split("|")
+            return datetime.fromisoformat(created_at), int(document_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError("Invalid history cursor") from e
+
+    def get_pages(
+        self, document: Document, start: int = 1, end: Optional[int] = None,
+        limit: int = 20, include_words: bool = False
+    ) -> List[DocumentPage]:
+        """Pages start..end (inclusive, by page number), at most `limit` of them"""
+        query = self._page_query(include_words).filter(
+            DocumentPage.document_id == document.id,
+            DocumentPage.page_number >= start
+        )
+        if end is not None:
+            query = query.filter(DocumentPage.page_number <= end)
+        limit = max(1, min(limit, MAX_PAGES_PER_REQUEST))
+        return query.order_by(DocumentPage.page_number).limit(limit).all()
+
+    def get_page(
+        self, document: Document, page_number: int, include_words: bool = False
+    ) -> Optional[DocumentPage]:
+        return self._page_query(include_words).filter(
+            DocumentPage.document_id == document.id,
+            DocumentPage.page_number == page_number
+        ).first()
+
+    def _page_query(self, include_words: bool):
+        """Page rows with their (compressed, deferred) text - and word boxes only when asked for"""
+        options = [undefer(DocumentPage.text)]
+        if include_words:
+            options.append(undefer(DocumentPage.words))
+        return self.db.query(DocumentPage).options(*options)
+
+    def delete_document(self, document: Document):
+        """Delete a document, its search entries and its pages (in bulk)"""
+        SearchIndex(self.db).remove_document(document)
+        self.db.query(DocumentPage).filter(
+            DocumentPage.document_id == document.id
+        ).delete(synchronize_session=False)
+        self.db.delete(document)
+        self.db.commit()
+
+    @staticmethod
+    def page_to_dict(page: DocumentPage, include_words: bool = False) -> dict:
+        data = {
+            "page_number": page.page_number,
+            "text": page.text,
+            "confidence": page.confidence,
+            "processing_time": page.processing_time,
+            "source": page.source,
+        }
+        if include_words:
+            data["page_width"] = page.page_width
+            data["page_height"] = page.page_height
+            data["words"] = [
+                WordBox(text=w[0], confidence=w[1], x=w[2], y=w[3], width=w[4], height=w[5]).model_dump()
+                for w in json.loads(page.words)
+            ] if page.words else None
+        return data
+
+    @staticmethod
+    def _page_row(document_id: int, result: OCRResult) -> DocumentPage:
+        words = None
+        if result.words is not None:
+            # Compact rows - a dense page has hundreds of words
+            words = json.dumps(
+                [[w.text, w.confidence, w.x, w.y, w.width, w.height] for w in result.words],
+                separators=(",", ":")
+            )
+        return DocumentPage(
+            document_id=document_id,
+            page_number=result.page_number,
+            text=result.text,
+            confidence=result.confidence,
+            processing_time=result.processing_time,
+            source=result.source,
+            words=words,
+            page_width=result.page_width,
+            page_height=result.page_height
+        )
@@ -0,0 +1,362 @@
+"""
+app/services/export_service.py
+Streaming export of stored documents (txt, JSON lines, hOCR, text-only PDF, zip of many)
+
+Every exporter is a generator of bytes that reads pages from the database a
+window at a time, so memory use doesn't depend on document size or count.
+"""
+
+from html import escape
+from typing import Iterator, List, Optional, Tuple
+import io
+import json
+import os
+import textwrap
+import zipfile
+import zlib
+
+from app.core.database import SessionLocal
+from app.models.user import Document, DocumentPage
+from app.schemas.ocr import WordBox
+from app.services.document_service import DocumentService
+
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "txt": ("text/plain", "txt"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "hocr": ("text/html", "hocr.html"),
+    "text-pdf": ("application/pdf", "text.pdf"),  # re-typeset text, no page images
+}
+
+# Pages read from the database per query
+PAGE_WINDOW = 20
+
+# Documents read per query in a bulk export
+DOCUMENT_WINDOW = 50
+
+# Zip output is handed on once this much has accumulated
+ZIP_FLUSH_BYTES = 64 * 1024
+
+# PDF pages are US Letter wide; word boxes are scaled to fit
+PDF_PAGE_WIDTH = 612
+PDF_PAGE_HEIGHT = 792
+PDF_MARGIN = 50
+PDF_FONT_SIZE = 10
+PDF_LEADING = 12
+
+
+def export_filename(document: Document, fmt: str) -> str:
+    return f"{document.filename}_extracted.{EXPORT_FORMATS[fmt][1]}"
+
+
+def stream_document(document_id: int, fmt: str) -> Iterator[bytes]:
+    """Export one document (with its own session - the request's is closed before streaming starts)"""
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is not None:
+            yield from ExportService(db).export(document, fmt)
+    finally:
+        db.close()
+
+
+def stream_zip(user_id: int, job_ids: Optional[List[str]], fmt: str) -> Iterator[bytes]:
+    """Zip of the user's documents (all of them when job_ids is None), one file per document"""
+    db = SessionLocal()
+    try:
+        yield from ExportService(db).export_zip(user_id, job_ids, fmt)
+    finally:
+        db.close()
+
+
+class ExportService:
+    """Turns stored pages into export formats, one page at a time"""
+
+    def __init__(self, db):
+        self.db = db
+        self.documents = DocumentService(db)
+
+    def export(self, document: Document, fmt: str) -> Iterator[bytes]:
+        exporters = {
+            "txt": self._txt,
+            "jsonl": self._jsonl,
+            "hocr": self._hocr,
+            "text-pdf": self._pdf,
+        }
+        return exporters[fmt](document)
+
+    def iter_pages(self, document: Document, include_words: bool = False) -> Iterator[DocumentPage]:
+        """Pages in order, PAGE_WINDOW at a time (legacy documents: their text blob as page 1)"""
+        start, found = 1, False
+        while True:
+            pages = self.documents.get_pages(document, start, None, PAGE_WINDOW, include_words)
+            if not pages:
+                break
+            found = True
+            yield from pages
+            start = pages[-1].page_number + 1
+
+        if not found and document.extracted_text:
+            yield DocumentPage(page_number=1, text=document.extracted_text)
+
+    def export_zip(self, user_id: int, job_ids: Optional[List[str]], fmt: str) -> Iterator[bytes]:
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for document in self._iter_documents(user_id, job_ids):
+                stem = os.path.splitext(document.filename)[0]
+                name = f"{stem}_{document.job_id[:8]}.{EXPORT_FORMATS[fmt][1]}"
+                with archive.open(name, "w", force_zip64=True) as member:
+                    for chunk in self.export(document, fmt):
+                        member.write(chunk)
+                        if sink.size >= ZIP_FLUSH_BYTES:
+                            yield from sink.drain()
+                yield from sink.drain()
+        yield from sink.drain()  # central directory
+
+    def _iter_documents(self, user_id: int, job_ids: Optional[List[str]]) -> Iterator[Document]:
+        last_id = 0
+        while True:
+            query = self.db.query(Document).filter(
+                Document.user_id == user_id, Document.id > last_id
+            )
+            if job_ids is not None:
+                query = query.filter(Document.job_id.in_(job_ids))
+            documents = query.order_by(Document.id).limit(DOCUMENT_WINDOW).all()
+            if not documents:
+                return
+            yield from documents
+            last_id = documents[-1].id
+
+    # Formats
+
+    def _txt(self, document: Document) -> Iterator[bytes]:
+        for i, page in enumerate(self.iter_pages(document)):
+            separator = "\n\n" if i else ""
+            yield f"{separator}--- Page {page.page_number} ---\n{page.text}".encode("utf-8")
+
+    def _jsonl(self, document: Document) -> Iterator[bytes]:
+        for page in self.iter_pages(document, include_words=True):
+            record = {
+                "job_id": document.job_id,
+                "filename": document.filename,
+                **DocumentService.page_to_dict(page, include_words=True)
+            }
+            yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _hocr(self, document: Document) -> Iterator[bytes]:
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"'
+            ' "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">\n<head>\n'
+            f' <title>{escape(document.filename)}</title>\n'
+            ' <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+            ' <meta name="ocr-system" content="PDF OCR Text Extractor"/>\n'
+            ' <meta name="ocr-capabilities" content="ocr_page ocr_line ocrx_word"/>\n'
+            '</head>\n<body>\n'
+        ).encode("utf-8")
+
+        for page in self.iter_pages(document, include_words=True):
+            n = page.page_number
+            title = f"ppageno {n - 1}"
+            if page.page_width and page.page_height:
+                title = f"bbox 0 0 {page.page_width} {page.page_height}; {title}"
+            parts = [f'<div class="ocr_page" id="page_{n}" title="{title}">\n']
+
+            words = _word_boxes(page)
+            if words:
+                for l, line in enumerate(_group_lines(words), 1):
+                    x0, y0 = min(w.x for w in line), min(w.y for w in line)
+                    x1 = max(w.x + w.width for w in line)
+                    y1 = max(w.y + w.height for w in line)
+                    parts.append(f' <span class="ocr_line" id="line_{n}_{l}" title="bbox {x0} {y0} {x1} {y1}">')
+                    parts.extend(
+                        f'<span class="ocrx_word" id="word_{n}_{l}_{i}"'
+                        f' title="bbox {w.x} {w.y} {w.x + w.width} {w.y + w.height};'
+                        f' x_wconf {round(w.confidence)}">{escape(w.text)}</span> '
+                        for i, w in enumerate(line, 1)
+                    )
+                    parts.append('</span>\n')
+            elif page.text:
+                # No word boxes (text layer pages, legacy documents)
+                lines = "<br/>\n".join(escape(line) for line in page.text.splitlines())
+                parts.append(f' <p class="ocr_par" id="par_{n}_1">{lines}</p>\n')
+
+            parts.append('</div>\n')
+            yield "".join(parts).encode("utf-8")
+
+        yield b"</body>\n</html>\n"
+
+    def _pdf(self, document: Document) -> Iterator[bytes]:
+        """
+        Text PDF: words at their recognized positions (page images aren't kept,
+        so there is nothing to lay an invisible text layer over); pages without
+        word boxes are typeset as plain lines
+        """
+        pdf = _PdfWriter()
+        yield pdf.header()
+        yield pdf.write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+                                  b" /Encoding /WinAnsiEncoding >>")
+
+        for page in self.iter_pages(document, include_words=True):
+            words = _word_boxes(page)
+            if words and page.page_width and page.page_height:
+                pages = [_positioned_words(words, page.page_width, page.page_height)]
+            else:
+                pages = _typeset_lines(page.text or "")
+            for width, height, content in pages:
+                yield pdf.add_page(width, height, content)
+
+        yield pdf.finish()
+
+
+# Helpers
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable target for ZipFile; written bytes are collected until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        """Everything written since the last drain - nothing when that is nothing"""
+        if self.size:
+            data = b"".join(self._chunks)
+            self._chunks, self.size = [], 0
+            yield data
+
+
+def _word_boxes(page: DocumentPage) -> List[WordBox]:
+    if not page.words:
+        return []
+    return [
+        WordBox(text=w[0], confidence=w[1], x=w[2], y=w[3], width=w[4], height=w[5])
+        for w in json.loads(page.words)
+    ]
+
+
+def _group_lines(words: List[WordBox]) -> List[List[WordBox]]:
+    """Split words (in reading order) into lines: a line ends when the next word moves left or below it"""
+    lines: List[List[WordBox]] = []
+    for word in words:
+        if lines:
+            previous = lines[-1][-1]
+            top = min(w.y for w in lines[-1])
+            bottom = max(w.y + w.height for w in lines[-1])
+            if word.x >= previous.x and top <= word.y + word.height / 2 <= bottom:
+                lines[-1].append(word)
+                continue
+        lines.append([word])
+    return lines
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _positioned_words(words: List[WordBox], page_width: int, page_height: int) -> Tuple[float, float, bytes]:
+    scale = PDF_PAGE_WIDTH / page_width
+    height = page_height * scale
+    ops = [b"BT"]
+    for w in words:
+        size = max(w.height * scale * 0.8, 1.0)
+        # Stretch to the box - Helvetica averages about half an em per character
+        stretch = 100 * (w.width * scale) / max(len(w.text) * size * 0.5, 1.0)
+        baseline = height - (w.y + w.height) * scale + size * 0.2
+        ops.append(
+            b"/F1 %.2f Tf %.1f Tz 1 0 0 1 %.2f %.2f Tm " % (size, stretch, w.x * scale, baseline)
+            + _pdf_string(w.text) + b" Tj"
+        )
+    ops.append(b"ET")
+    return PDF_PAGE_WIDTH, height, b"\n".join(ops)
+
+
+def _typeset_lines(text: str) -> List[Tuple[float, float, bytes]]:
+    """Plain text on Letter pages (one stored page may need several)"""
+    per_page = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+    lines = [
+        wrapped
+        for line in text.splitlines()
+        for wrapped in (textwrap.wrap(line, 95) or [""])
+    ] or [""]
+
+    pages = []
+    for start in range(0, len(lines), per_page):
+        ops = [b"BT /F1 %d Tf %d TL %d %d Td" % (
+            PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN
+        )]
+        ops.extend(_pdf_string(line) + b" Tj T*" for line in lines[start:start + per_page])
+        ops.append(b"ET")
+        pages.append((PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, b"\n".join(ops)))
+    return pages
+
+
+class _PdfWriter:
+    """
+    Minimal PDF emitter: objects are written as soon as they are complete and
+    only their byte offsets are kept. 1 = catalog, 2 = page tree, 3 = font.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.page_ids: List[int] = []
+        self.next_id = 4
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write_object(self, object_id: int, body: bytes) -> bytes:
+        self.offsets[object_id] = self.position
+        return self._emit(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def add_page(self, width: float, height: float, content: bytes) -> bytes:
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+
+        stream = zlib.compress(content)
+        out = self.write_object(
+            content_id,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        out += self.write_object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f]"
+            b" /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (width, height, content_id)
+        )
+        return out
+
+    def finish(self) -> bytes:
+        if not self.page_ids:  # a PDF needs at least one page
+            out = self.add_page(PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, b"")
+        else:
+            out = b""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        out += self.write_object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        out += self.write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.position
+        count = self.next_id
+        xref = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+        xref.extend(b"%010d 00000 n \n" % self.offsets[i] for i in range(1, count))
+        out += self._emit(b"".join(xref))
+        out += self._emit(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (count, xref_offset)
+        )
+        return out
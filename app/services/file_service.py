@@ -5,16 +5,86 @@ File upload and management service
 
 import os
 import uuid
-import shutil
+import hashlib
+import tarfile
+import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 from app.core.exceptions import BadRequestException
 
 
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# Bytes read per write when copying uploads
+CHUNK_SIZE = 1024 * 1024
+
+# File signatures, checked against the first bytes instead of trusting content_type
+SIGNATURES = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),  # JPEG
+    (b"II*\x00", "image"),  # TIFF, little-endian
+    (b"MM\x00*", "image"),  # TIFF, big-endian
+)
+SNIFF_BYTES = max(len(signature) for signature, _ in SIGNATURES)
+
+
+class _UploadWriter:
+    """
+    Writes one upload to disk chunk by chunk: hashes (SHA-256) as it goes,
+    stops as soon as the size limit is crossed and checks the file signature
+    once the first bytes are in
+    """
+
+    def __init__(self, file_path: Path, original_name: str):
+        self.file_path = file_path
+        self.name = os.path.basename(original_name)
+        self.is_pdf = os.path.splitext(original_name)[1].lower() == ".pdf"
+        self.max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        self.digest = hashlib.sha256()
+        self.head = b""
+        self.size = 0
+        self.buffer = open(file_path, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise BadRequestException(
+                f"{self.name} is too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+            )
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._check_signature()
+        self.digest.update(chunk)
+        self.buffer.write(chunk)
+
+    def finish(self) -> Tuple[str, str]:
+        """(saved path, sha256 hex digest)"""
+        if len(self.head) < SNIFF_BYTES:  # shorter than any signature
+            self._check_signature()
+        self.buffer.close()
+        return str(self.file_path), self.digest.hexdigest()
+
+    def abort(self):
+        self.buffer.close()
+        if self.file_path.exists():
+            self.file_path.unlink()
+
+    def _check_signature(self):
+        kind = next((kind for signature, kind in SIGNATURES if self.head.startswith(signature)), None)
+        if kind is None:
+            raise BadRequestException(f"{self.name} is not a PDF, JPEG, PNG or TIFF file")
+        # PDFs and images take different paths, chosen by extension
+        if (kind == "pdf") != self.is_pdf:
+            raise BadRequestException(f"{self.name}: file contents don't match its extension")
+
+
 class FileService:
     """File management service"""
     
@@ -22,28 +92,154 @@ class FileService:
         self.upload_dir = Path(settings.UPLOAD_DIR)
         self.upload_dir.mkdir(exist_ok=True)
     
-    def save_upload(self, file: UploadFile) -> str:
+    def save_upload(self, file: UploadFile) -> Tuple[str, str]:
         """
-        Save uploaded file and return file path
-        Returns: absolute path to saved file
+        Save uploaded file, hashing it on the way
+        Returns: (path to saved file, SHA-256 of its bytes)
         """
-        # Validate file
         self._validate_file(file)
-        
-        # Generate unique filename
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = self.upload_dir / unique_filename
-        
-        # Save file
+        return self._save_chunks(iter(lambda: file.file.read(CHUNK_SIZE), b""), file.filename)
+
+    async def save_request_stream(
+        self, chunks: AsyncIterator[bytes], filename: str, content_length: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Save a raw request body as it arrives, without spooling it first
+        Returns: (path to saved file, SHA-256 of its bytes)
+        """
+        self._validate_extension(filename)
+        # Refuse before reading anything when the client announces the size
+        if content_length is not None and content_length > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise BadRequestException(f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB")
+
+        writer = self._new_writer(filename)
+        pending: List[bytes] = []
+        pending_size = 0
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            raise BadRequestException(f"Failed to save file: {str(e)}")
-        
-        return str(file_path)
-    
+            # Request bodies arrive in small pieces - hand the writer thread CHUNK_SIZE at a time
+            async for chunk in chunks:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= CHUNK_SIZE:
+                    await run_in_threadpool(writer.write, b"".join(pending))
+                    pending, pending_size = [], 0
+            if pending_size:
+                await run_in_threadpool(writer.write, b"".join(pending))
+            return writer.finish()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def save_archive(self, file: UploadFile) -> List[Tuple[str, str, str]]:
+        """
+        Unpack a zip or tar upload member by member straight to disk
+        Returns: (original name, saved path, SHA-256) of every supported file
+        inside; other members (folders, readmes, __MACOSX) are skipped
+        """
+        name = (file.filename or "").lower()
+        if not name.endswith(ARCHIVE_EXTENSIONS):
+            raise BadRequestException(
+                f"Archive type not allowed. Supported: {', '.join(ARCHIVE_EXTENSIONS)}"
+            )
+
+        file.file.seek(0, 2)
+        archive_size = file.file.tell()
+        file.file.seek(0)
+        if archive_size > settings.BATCH_MAX_ARCHIVE_MB * 1024 * 1024:
+            raise BadRequestException(
+                f"Archive too large. Maximum size: {settings.BATCH_MAX_ARCHIVE_MB}MB"
+            )
+
+        saved: List[Tuple[str, str, str]] = []
+        # Compressed archives can expand far beyond their upload size
+        remaining = settings.BATCH_MAX_EXTRACTED_MB * 1024 * 1024
+        try:
+            if name.endswith(".zip"):
+                with zipfile.ZipFile(file.file) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not self._wanted_member(info.filename, info.file_size, saved):
+                            continue
+                        with archive.open(info) as member:
+                            file_path, file_hash = self._save_stream(member, info.filename, remaining)
+                        remaining -= os.path.getsize(file_path)
+                        saved.append((os.path.basename(info.filename), file_path, file_hash))
+            else:
+                # Stream mode: members are read in order without seeking back
+                with tarfile.open(fileobj=file.file, mode="r|*") as archive:
+                    for info in archive:
+                        if not info.isfile() or not self._wanted_member(info.name, info.size, saved):
+                            continue
+                        file_path, file_hash = self._save_stream(archive.extractfile(info), info.name, remaining)
+                        remaining -= os.path.getsize(file_path)
+                        saved.append((os.path.basename(info.name), file_path, file_hash))
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            self.delete_files([path for _, path, _ in saved])
+            raise BadRequestException(f"Could not read archive: {str(e)}")
+        except Exception:
+            self.delete_files([path for _, path, _ in saved])
+            raise
+
+        if not saved:
+            raise BadRequestException("Archive contains no supported files")
+        return saved
+
+    def _wanted_member(self, member_name: str, size: int, saved: List[Tuple[str, str, str]]) -> bool:
+        """Should an archive member be extracted? Raises when a batch limit is hit"""
+        base_name = os.path.basename(member_name)
+        if not base_name or base_name.startswith(".") or "__MACOSX" in member_name:
+            return False
+        if os.path.splitext(base_name)[1].lower() not in settings.ALLOWED_EXTENSIONS:
+            return False
+        if size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise BadRequestException(
+                f"{base_name} is too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+            )
+        if len(saved) >= settings.BATCH_MAX_FILES:
+            raise BadRequestException(f"Too many files. Maximum per batch: {settings.BATCH_MAX_FILES}")
+        return True
+
+    def _save_stream(
+        self, source: BinaryIO, original_name: str, archive_remaining: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Copy a stream to a new upload file, refusing to write past the size limit
+        (or past `archive_remaining`, the bytes an archive may still unpack)
+        """
+        # Declared sizes in an archive header can lie - the writer counts
+        chunks = iter(lambda: source.read(CHUNK_SIZE), b"")
+        if archive_remaining is not None:
+            chunks = self._archive_capped(chunks, archive_remaining)
+        return self._save_chunks(chunks, original_name)
+
+    @staticmethod
+    def _archive_capped(chunks: Iterable[bytes], remaining: int) -> Iterator[bytes]:
+        for chunk in chunks:
+            remaining -= len(chunk)
+            if remaining < 0:
+                raise BadRequestException(
+                    f"Archive unpacks to more than {settings.BATCH_MAX_EXTRACTED_MB}MB"
+                )
+            yield chunk
+
+    def _save_chunks(self, chunks: Iterable[bytes], original_name: str) -> Tuple[str, str]:
+        writer = self._new_writer(original_name)
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.finish()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def _new_writer(self, original_name: str) -> _UploadWriter:
+        file_ext = os.path.splitext(original_name)[1].lower()
+        return _UploadWriter(self.upload_dir / f"{uuid.uuid4()}{file_ext}", original_name)
+
+    def delete_files(self, file_paths: List[str]):
+        """Delete several files (e.g. the rest of a rejected batch)"""
+        for file_path in file_paths:
+            self.delete_file(file_path)
+
     def delete_file(self, file_path: str) -> bool:
         """Delete a file"""
         try:
@@ -56,39 +252,22 @@ class FileService:
             return False
     
     def _validate_file(self, file: UploadFile):
-        """Validate uploaded file"""
-        # Check file extension
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in settings.ALLOWED_EXTENSIONS:
+        """Validate uploaded file before reading it"""
+        self._validate_extension(file.filename)
+
+        # Starlette knows the size once the body is spooled - no need to seek through it
+        if file.size is not None and file.size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
             raise BadRequestException(
-                f"File type not allowed. Supported: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+                f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
             )
-        
-        # Check file size (read content to get actual size)
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Seek back to start
-        
-        max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-        if file_size > max_size:
+        # content_type is whatever the client claims - the writer checks the bytes
+
+    def _validate_extension(self, filename: Optional[str]):
+        file_ext = os.path.splitext(filename or "")[1].lower()
+        if file_ext not in settings.ALLOWED_EXTENSIONS:
             raise BadRequestException(
-                f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+                f"File type not allowed. Supported: {', '.join(settings.ALLOWED_EXTENSIONS)}"
             )
-        
-        # Validate content type
-        content_type = file.content_type or ""
-        valid_types = [
-            "application/pdf",
-            "image/jpeg",
-            "image/jpg",
-            "image/png",
-            "image/tiff"
-        ]
-        
-        if not any(ct in content_type for ct in valid_types):
-            # Additional check based on extension
-            if file_ext not in settings.ALLOWED_EXTENSIONS:
-                raise BadRequestException("Invalid file type")
     
     def cleanup_old_files(self):
         """Delete files older than FILE_CLEANUP_HOURS"""
@@ -0,0 +1,518 @@
+"""
+app/services/job_queue.py
+Background OCR job queue - upload returns immediately, a bounded worker pool does the work
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.exceptions import ServiceUnavailableException
+from app.schemas.ocr import (
+    OCRBatchFailure, OCRBatchResponse, OCRResponse, OCRResult, OCRStatus
+)
+from app.services.admission import JobEstimate, estimate_job, get_admission_controller
+from app.services.document_service import DocumentService
+from app.services.file_service import FileService
+from app.services.ocr_service import OCRService
+from app.services.scheduler import job_context
+
+
+class OCRJob:
+    """One uploaded file waiting for / going through OCR"""
+
+    def __init__(
+        self, user_id: int, filename: str, file_path: str,
+        language: Optional[str] = None, profile: Optional[str] = None,
+        file_hash: Optional[str] = None
+    ):
+        self.job_id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.filename = filename
+        self.file_path = file_path
+        self.language = language
+        self.profile = profile
+        self.file_hash = file_hash
+
+        # Single images are interactive; PDFs (and batches) can wait behind them
+        is_pdf = os.path.splitext(filename)[1].lower() == ".pdf"
+        self.priority = "bulk" if is_pdf else "interactive"
+
+        self.status = "queued"  # 'queued', 'processing', 'completed', 'failed'
+        self.total_pages: Optional[int] = None
+        self.pages_done = 0
+        self.results: List[OCRResult] = []
+        self.response: Optional[OCRResponse] = None
+        self.total_processing_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self.eta_seconds: Optional[float] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.future: Optional[Future] = None
+        self.estimate: Optional[JobEstimate] = None
+
+        # Event-stream subscribers: (loop, queue) of each open /events connection
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.RLock()
+        self._closed = False
+
+    @property
+    def progress(self) -> int:
+        if self.status == "completed":
+            return 100
+        if not self.total_pages:
+            return 0
+        return int(self.pages_done * 100 / self.total_pages)
+
+    def to_status(self) -> OCRStatus:
+        messages = {
+            "queued": "Waiting for a free OCR worker",
+            "processing": f"Processed {self.pages_done} of {self.total_pages or '?'} pages",
+            "completed": "Processing complete",
+        }
+        return OCRStatus(
+            job_id=self.job_id,
+            status=self.status,
+            progress=self.progress,
+            message=self.error if self.status == "failed" else messages.get(self.status),
+            total_pages=self.total_pages,
+            pages_done=self.pages_done
+        )
+
+    def progress_event(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "progress": self.progress,
+            "eta_seconds": round(self.eta_seconds, 1) if self.eta_seconds is not None else None,
+        }
+
+    def final_event(self) -> Tuple[str, Dict[str, Any]]:
+        if self.status == "failed":
+            return "error", {"job_id": self.job_id, "message": self.error}
+        return "done", {
+            "job_id": self.job_id,
+            "total_pages": self.total_pages,
+            "total_processing_time": self.total_processing_time,
+        }
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Open an event stream for the calling event loop.
+        The queue starts with a replay of what already happened (pages so far,
+        current progress, final event if finished), then receives live events
+        as (event, data) tuples.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            for event in self.replay_events():
+                queue.put_nowait(event)
+            queue.put_nowait(("progress", self.progress_event()))
+            if self._closed:
+                queue.put_nowait(self.final_event())
+            else:
+                self._listeners.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def replay_events(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [("page", result.model_dump()) for result in self.results]
+
+    def file_paths(self) -> List[str]:
+        return [self.file_path]
+
+    def release_results(self):
+        """
+        Drop the page results once they are stored elsewhere (result store,
+        database); only the status fields stay, for /jobs/{job_id}.
+        Event streams opened afterwards replay no pages, just the outcome.
+        """
+        with self._lock:
+            self.results = []
+            self.response = None
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._listeners = [(loop, q) for loop, q in self._listeners if q is not queue]
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """Hand an event to every subscriber (safe to call from worker threads)"""
+        for loop, queue in list(self._listeners):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:
+                # Subscriber's loop is gone (server shutting down)
+                self.unsubscribe(queue)
+
+
+class OCRBatchJob(OCRJob):
+    """Many uploaded files processed as one unit, with one Document per file"""
+
+    def __init__(
+        self, user_id: int, files: List[Tuple[str, str]],
+        language: Optional[str] = None, profile: Optional[str] = None,
+        file_hashes: Optional[List[str]] = None
+    ):
+        super().__init__(user_id, f"{len(files)} files", None, language, profile)
+        self.priority = "bulk"
+        self.files = files  # (original filename, saved path)
+        self.file_hashes = file_hashes  # SHA-256 per file, when computed while saving
+        self.file_job_ids = [str(uuid.uuid4()) for _ in files]
+        self.file_responses: List[Optional[OCRResponse]] = [None] * len(files)
+        self.failures: List[OCRBatchFailure] = []
+        self.files_done = 0
+        self.started_at: Optional[float] = None
+        self._file_events: List[Dict[str, Any]] = []
+
+    @property
+    def progress(self) -> int:
+        if self.status == "completed":
+            return 100
+        return int(self.files_done * 100 / len(self.files))
+
+    def to_status(self) -> OCRStatus:
+        status = super().to_status()
+        if self.status == "processing":
+            status.message = f"Processed {self.files_done} of {len(self.files)} files"
+        status.total_files = len(self.files)
+        status.files_done = self.files_done
+        return status
+
+    def progress_event(self) -> Dict[str, Any]:
+        event = super().progress_event()
+        event.update(total_files=len(self.files), files_done=self.files_done)
+        return event
+
+    def final_event(self) -> Tuple[str, Dict[str, Any]]:
+        event, data = super().final_event()
+        if event == "done":
+            data.update(
+                total_files=len(self.files),
+                completed_files=len(self.files) - len(self.failures),
+                failed_files=len(self.failures)
+            )
+        return event, data
+
+    def replay_events(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [("file", event) for event in self._file_events]
+
+    def file_paths(self) -> List[str]:
+        return [file_path for _, file_path in self.files]
+
+    def release_results(self):
+        super().release_results()
+        with self._lock:
+            self.file_responses = [None] * len(self.files)
+
+    def record_file(self, index: int, results: Optional[List[OCRResult]], error: Optional[Exception]):
+        """Store one finished file and notify subscribers (called from the worker thread)"""
+        filename = self.files[index][0]
+        with self._lock:
+            if results is not None:
+                self.file_responses[index] = OCRResponse(
+                    job_id=self.file_job_ids[index],
+                    filename=filename,
+                    total_pages=len(results),
+                    results=results,
+                    total_processing_time=sum(r.processing_time for r in results),
+                    created_at=datetime.utcnow()
+                )
+                self.pages_done += len(results)
+            else:
+                message = getattr(error, "detail", str(error))
+                self.failures.append(OCRBatchFailure(filename=filename, error=message))
+            self.files_done += 1
+
+            elapsed = time.time() - self.started_at
+            self.eta_seconds = elapsed / self.files_done * (len(self.files) - self.files_done)
+
+            event = {
+                "job_id": self.file_job_ids[index],
+                "filename": filename,
+                "status": "completed" if results is not None else "failed",
+                "total_pages": len(results) if results is not None else 0,
+                "error": None if results is not None else self.failures[-1].error,
+            }
+            self._file_events.append(event)
+            self.publish("file", event)
+            self.publish("progress", self.progress_event())
+
+
+class OCRJobQueue:
+    """
+    Bounded pool of worker threads running OCR jobs.
+    Jobs beyond OCR_JOB_WORKERS running + OCR_JOB_QUEUE_SIZE waiting are refused.
+
+    Jobs live in this process only: with several server workers, live status
+    and event streams are answered only by the worker that took the upload
+    (the others fall back to the database once the job is finished).
+    """
+
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-job")
+        self.jobs: Dict[str, OCRJob] = {}
+        self.lock = threading.Lock()
+        self.ocr_service = OCRService()
+        self.file_service = FileService()
+
+    def submit(
+        self, job: OCRJob, on_complete: Callable[[OCRJob], None] = None
+    ) -> OCRJob:
+        # A repeat upload is answered from the result cache without queueing
+        if self._complete_from_cache(job, on_complete):
+            return job
+
+        admission = get_admission_controller()
+        job.estimate = estimate_job(job.file_paths())
+
+        with self.lock:
+            self._prune()
+            self._check_slots()
+            admission.admit(job.estimate)
+            self.jobs[job.job_id] = job
+
+        try:
+            job.future = self.executor.submit(self._run, job, on_complete)
+        except Exception:
+            # Shutting down - the job will never run, give its place back
+            admission.withdraw(job.estimate)
+            with self.lock:
+                self.jobs.pop(job.job_id, None)
+            raise
+        return job
+
+    def check_capacity(self):
+        """
+        Raise ServiceUnavailableException when new work would be refused anyway,
+        so callers can check before saving an upload
+        """
+        with self.lock:
+            self._check_slots()
+        get_admission_controller().check()
+
+    def _check_slots(self):
+        """Called with self.lock held"""
+        active = sum(1 for j in self.jobs.values() if j.status in ("queued", "processing"))
+        if active >= self.workers + self.max_queued:
+            raise ServiceUnavailableException(
+                "OCR queue is full. Please try again shortly.",
+                retry_after=get_admission_controller().stats()["retry_after"]
+            )
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self.jobs.get(job_id)
+
+    def _complete_from_cache(
+        self, job: OCRJob, on_complete: Optional[Callable[[OCRJob], None]]
+    ) -> bool:
+        """Finish a single-file job from cached results, if there are any"""
+        if isinstance(job, OCRBatchJob) or not job.file_hash:
+            return False
+        start_time = time.time()
+        results = self.ocr_service.cached_results(job.file_hash, job.language, job.profile)
+        if results is None:
+            return False
+
+        job.results = list(results)
+        self._save_document(job, job.results, time.time() - start_time)
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        self.file_service.delete_files(job.file_paths())
+
+        with self.lock:
+            self.jobs[job.job_id] = job
+        job.future = Future()
+        job.future.set_result(job)
+        self._close(job, on_complete)
+        return True
+
+    def _run(self, job: OCRJob, on_complete: Optional[Callable[[OCRJob], None]]):
+        # Stays 'queued' until its estimated memory fits next to the running jobs
+        admission = get_admission_controller()
+        admission.start(job.estimate)
+
+        start_time = time.time()
+        job.status = "processing"
+        job.publish("progress", job.progress_event())
+
+        try:
+            with job_context(job.user_id, job.priority):
+                if isinstance(job, OCRBatchJob):
+                    self._process_batch(job, start_time)
+                else:
+                    self._process_document(job, start_time)
+            job.status = "completed"
+        except Exception as e:
+            print(f"OCR job {job.job_id} failed: {str(e)}")
+            job.error = f"Failed to process document: {getattr(e, 'detail', str(e))}"
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.utcnow()
+            self.file_service.delete_files(job.file_paths())
+            admission.finish(job.estimate, self._page_seconds(job))
+
+        self._close(job, on_complete)
+        return job
+
+    @staticmethod
+    def _close(job: OCRJob, on_complete: Optional[Callable[[OCRJob], None]]):
+        if on_complete is not None:
+            on_complete(job)
+
+        # Final events go out last, so the result is already retrievable when clients see them
+        with job._lock:
+            job.eta_seconds = 0.0 if job.status == "completed" else None
+            job.publish("progress", job.progress_event())
+            job.publish(*job.final_event())
+            job._listeners = []
+            job._closed = True
+
+    def _process_document(self, job: OCRJob, start_time: float):
+        def on_page(result: OCRResult, pages_done: int, total_pages: int):
+            # Under the job lock so a new subscriber's replay never misses or repeats a page
+            with job._lock:
+                job.results.append(result)
+                job.pages_done = pages_done
+                job.total_pages = total_pages
+                job.publish("page", result.model_dump())
+
+        def on_progress(pages_done: int, total_pages: int, eta_seconds: Optional[float]):
+            with job._lock:
+                job.pages_done = pages_done
+                job.total_pages = total_pages
+                job.eta_seconds = eta_seconds
+                job.publish("progress", job.progress_event())
+
+        results = self.ocr_service.process_file(
+            job.file_path, job.language, file_hash=job.file_hash,
+            profile=job.profile, on_page=on_page, on_progress=on_progress
+        )
+        self._save_document(job, results, time.time() - start_time)
+
+    def _save_document(self, job: OCRJob, results: List[OCRResult], total_time: float):
+        job.total_processing_time = total_time
+        job.response = OCRResponse(
+            job_id=job.job_id,
+            filename=job.filename,
+            total_pages=len(results),
+            results=results,
+            total_processing_time=total_time,
+            created_at=datetime.utcnow()
+        )
+
+        # Save to database for persistent history
+        db = SessionLocal()
+        try:
+            DocumentService(db).save_results(
+                job.job_id, job.user_id, job.filename, results, total_time
+            )
+        finally:
+            db.close()
+
+        job.total_pages = len(results)
+        job.pages_done = len(results)
+
+    def _process_batch(self, job: OCRBatchJob, start_time: float):
+        job.started_at = start_time
+        self.ocr_service.process_batch(
+            job.file_paths(), job.language, job.profile, on_file=job.record_file,
+            file_hashes=job.file_hashes
+        )
+        total_time = time.time() - start_time
+        job.total_processing_time = total_time
+
+        completed = [response for response in job.file_responses if response is not None]
+        job.total_pages = sum(response.total_pages for response in completed)
+        job.response = OCRBatchResponse(
+            batch_id=job.job_id,
+            total_files=len(job.files),
+            total_pages=job.total_pages,
+            files=completed,
+            failed=job.failures,
+            total_processing_time=total_time,
+            created_at=datetime.utcnow()
+        )
+
+        # One history entry per file, all or nothing
+        db = SessionLocal()
+        try:
+            DocumentService(db).save_batch(job.user_id, [
+                (response.job_id, response.filename, response.results, response.total_processing_time)
+                for response in completed
+            ])
+        finally:
+            db.close()
+
+    @staticmethod
+    def _page_seconds(job: OCRJob) -> Optional[float]:
+        """Mean processing time per page of a finished job, for Retry-After estimates"""
+        if isinstance(job, OCRBatchJob):
+            results = [r for response in job.file_responses if response for r in response.results]
+        else:
+            results = job.results
+        if not results:
+            return None
+        return sum(r.processing_time for r in results) / len(results)
+
+    def prune(self):
+        with self.lock:
+            self._prune()
+
+    def _prune(self):
+        """
+        Forget finished jobs after OCR_JOB_RETENTION_MINUTES, and the oldest
+        beyond OCR_JOB_MAX_FINISHED (results live on in the database).
+        Called with self.lock held.
+        """
+        now = datetime.utcnow()
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished_at),
+            key=lambda job: job.finished_at
+        )
+        excess = len(finished) - settings.OCR_JOB_MAX_FINISHED
+        for index, job in enumerate(finished):
+            age = (now - job.finished_at).total_seconds()
+            if index < excess or age > settings.OCR_JOB_RETENTION_MINUTES * 60:
+                del self.jobs[job.job_id]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: Optional[OCRJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> OCRJobQueue:
+    """Return the process-wide job queue, creating it on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = OCRJobQueue(settings.OCR_JOB_WORKERS, settings.OCR_JOB_QUEUE_SIZE)
+        return _queue
+
+
+def prune_job_queue():
+    """Forget expired finished jobs (called periodically; no-op before the first job)"""
+    with _queue_lock:
+        queue = _queue
+    if queue is not None:
+        queue.prune()
+
+
+def shutdown_job_queue():
+    """Stop accepting work (called on application shutdown)"""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
@@ -0,0 +1,164 @@
+"""
+app/services/ocr_cache.py
+Content-addressed, size-bounded on-disk cache for OCR results
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.ocr import OCRResult
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_pixels(image: np.ndarray) -> str:
+    """SHA-256 of an image's shape and pixel data"""
+    digest = hashlib.sha256(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def make_cache_key(*parts: object) -> str:
+    """Combine the parts that determine an OCR result into one key"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+class OCRCache:
+    """
+    JSON files under `cache_dir`, one per key, evicted least-recently-used
+    once the directory grows past `max_bytes`. A file's mtime is its last
+    access time, so the LRU order is shared by every worker process.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _entries(self) -> List[Path]:
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def get(self, key: str) -> Optional[List[OCRResult]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return [OCRResult(**item) for item in payload]
+
+    def put(self, key: str, results: List[OCRResult]):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = json.dumps([r.model_dump() for r in results]).encode("utf-8")
+
+        # Write-then-rename so readers in other processes never see partial files
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to write OCR cache entry: {e}")
+            return
+
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least-recently-used entries until under 90% of the limit"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+            try:
+                path.unlink()
+                self._size -= size
+                self.evictions += 1
+            except OSError:
+                continue
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[OCRCache] = None
+_page_cache: Optional[OCRCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[OCRCache]:
+    """Return the whole-file result cache, or None when disabled"""
+    global _cache
+    if not settings.OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache(
+                os.path.join(settings.OCR_CACHE_DIR, "files"),
+                settings.OCR_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _cache
+
+
+def get_page_cache() -> Optional[OCRCache]:
+    """Return the per-page cache (keyed by preprocessed pixels), or None when disabled"""
+    global _page_cache
+    if not settings.OCR_PAGE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _page_cache is None:
+            _page_cache = OCRCache(
+                os.path.join(settings.OCR_CACHE_DIR, "pages"),
+                settings.OCR_PAGE_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _page_cache
@@ -7,19 +7,46 @@ import pytesseract
 from PIL import Image
 import cv2
 import numpy as np
-from pdf2image import convert_from_path
 import time
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import os
 import re
 import subprocess
 
 from app.core.config import settings
-from app.services.preprocessing import ImagePreprocessor
-from app.schemas.ocr import OCRResult
+from app.services.preprocessing import GEOMETRY_STAGES, PREPROCESSING_PROFILES, ImagePreprocessor
+from app.services.page_pool import process_pages_parallel
+from app.services.scheduler import page_slot
+from app.services.pdf_rasterizer import (
+    PDFRasterizer, extract_text_layer, image_coverage, is_usable_text, page_sizes
+)
+from app.services.tesseract_pool import get_tesseract_pool, TesseractPoolError
+from app.services.ocr_cache import (
+    get_result_cache, get_page_cache, hash_file, hash_pixels, make_cache_key
+)
+from app.schemas.ocr import OCRResult, TextRegion, WordBox
 from app.core.exceptions import OCRProcessingException
 
 
+def check_progressive_settings():
+    """
+    Progressive mode crops refine lines from the original page at the draft's
+    word coordinates, so the draft profile must not move pixels (no deskew).
+    Raises ValueError on a bad configuration - called at startup.
+    """
+    if not settings.OCR_PROGRESSIVE:
+        return
+    draft = settings.OCR_DRAFT_PROFILE
+    if draft not in PREPROCESSING_PROFILES:
+        raise ValueError(f"OCR_DRAFT_PROFILE '{draft}' is not a preprocessing profile")
+    moving = GEOMETRY_STAGES.intersection(PREPROCESSING_PROFILES[draft])
+    if moving:
+        raise ValueError(
+            f"OCR_DRAFT_PROFILE '{draft}' includes {', '.join(sorted(moving))}: draft word "
+            f"positions wouldn't match the page. Use a profile without geometry stages."
+        )
+
+
 def check_tesseract_available() -> bool:
     """Check if Tesseract is installed and available"""
     try:
@@ -29,19 +56,190 @@ def check_tesseract_available() -> bool:
         return False
 
 
+# on_page(result, pages_done, total_pages) - progress hook for long documents
+PageCallback = Optional[Callable[[OCRResult, int, int], None]]
+
+# on_progress(pages_done, total_pages, eta_seconds) - eta is None until it can be estimated
+ProgressCallback = Optional[Callable[[int, int, Optional[float]], None]]
+
+# on_file(index, results, error) - one call per file of a batch, exactly one of results/error set
+FileCallback = Optional[Callable[[int, Optional[List[OCRResult]], Optional[Exception]], None]]
+
+
 class OCRService:
     """OCR processing service using Tesseract - optimized for speed & readability"""
 
     # Modern LSTM + single block of text (best for most scanned docs)
     TESSERACT_CONFIG = '--oem 1 --psm 6'
 
+    # Single text line - used when re-recognizing low-confidence lines
+    LINE_CONFIG = '--oem 1 --psm 7'
+
+    # Lower DPI for faster processing and less memory usage
+    PDF_DPI = 150
+
+    # Bump whenever preprocessing (or the result format) changes so cached results are not reused
+    PREPROCESSING_VERSION = "3"
+
     def __init__(self):
         if settings.TESSERACT_CMD:
             pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
         self.preprocessor = ImagePreprocessor()
         self.tesseract_available = check_tesseract_available()
 
-    def process_file(self, file_path: str, language: str = None) -> List[OCRResult]:
+    def process_file(
+        self, file_path: str, language: str = None, file_hash: str = None,
+        profile: str = None, on_page: PageCallback = None,
+        on_progress: ProgressCallback = None
+    ) -> List[OCRResult]:
+        """
+        OCR a PDF or image and return one OCRResult per page.
+        `on_page(result, pages_done, total_pages)` is called as each page finishes;
+        for PDFs `on_progress(pages_done, total_pages, eta_seconds)` follows it
+        (and is called once up front with the page count).
+        """
+        self._require_tesseract()
+
+        if language is None:
+            language = settings.DEFAULT_LANGUAGE
+
+        if profile is None:
+            profile = settings.DEFAULT_PREPROCESSING_PROFILE
+        
+        # Identical bytes + identical pipeline settings → identical result
+        cache = get_result_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = self.cache_key(file_hash or hash_file(file_path), language, profile)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if on_page is not None:
+                    for done, result in enumerate(cached, start=1):
+                        on_page(result, done, len(cached))
+                if on_progress is not None:
+                    on_progress(len(cached), len(cached), 0)
+                return cached
+
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext == '.pdf':
+            results = self._process_pdf(file_path, language, profile, on_page, on_progress)
+        else:
+            results = self._process_image(file_path, language, profile)
+            if on_page is not None:
+                on_page(results[0], 1, 1)
+
+        if cache is not None:
+            cache.put(cache_key, results)
+        return results
+
+    def cached_results(
+        self, file_hash: str, language: str = None, profile: str = None
+    ) -> Optional[List[OCRResult]]:
+        """Results of an earlier identical run, or None (without touching the file)"""
+        cache = get_result_cache()
+        if cache is None:
+            return None
+        return cache.get(self.cache_key(
+            file_hash,
+            language or settings.DEFAULT_LANGUAGE,
+            profile or settings.DEFAULT_PREPROCESSING_PROFILE
+        ))
+
+    def process_batch(
+        self, file_paths: List[str], language: str = None, profile: str = None,
+        on_file: FileCallback = None, file_hashes: Optional[List[str]] = None
+    ) -> List[Optional[List[OCRResult]]]:
+        """
+        OCR many files as one unit and return their results in input order
+        (None for files that failed - a bad file doesn't stop the batch).
+        Cached files are answered first; the remaining images are streamed
+        through the page pool together, so workers stay busy across file
+        boundaries; PDFs follow one at a time (their pages use the pool too).
+        """
+        self._require_tesseract()
+
+        if language is None:
+            language = settings.DEFAULT_LANGUAGE
+
+        if profile is None:
+            profile = settings.DEFAULT_PREPROCESSING_PROFILE
+
+        outcome: List[Optional[List[OCRResult]]] = [None] * len(file_paths)
+        cache = get_result_cache()
+        cache_keys: Dict[int, str] = {}
+
+        def finish(index: int, results: List[OCRResult] = None, error: Exception = None):
+            outcome[index] = results
+            if results is not None and cache is not None and index in cache_keys:
+                cache.put(cache_keys[index], results)
+            if on_file is not None:
+                on_file(index, results, error)
+
+        pending = []
+        for index, file_path in enumerate(file_paths):
+            if cache is not None:
+                file_hash = file_hashes[index] if file_hashes else hash_file(file_path)
+                cache_keys[index] = self.cache_key(file_hash, language, profile)
+                cached = cache.get(cache_keys[index])
+                if cached is not None:
+                    finish(index, cached)
+                    continue
+            pending.append(index)
+
+        pdfs = [i for i in pending if os.path.splitext(file_paths[i])[1].lower() == '.pdf']
+        images = [i for i in pending if i not in pdfs]
+
+        if settings.OCR_PARALLEL_PAGES and settings.OCR_WORKERS > 1 and len(images) > 1:
+            images = self._process_images_parallel(file_paths, images, language, profile, finish)
+
+        # Sequential path, and whatever the pooled run didn't get to
+        for index in images:
+            try:
+                finish(index, self._process_image(file_paths[index], language, profile))
+            except Exception as e:
+                finish(index, error=e)
+
+        for index in pdfs:
+            try:
+                finish(index, self._process_pdf(file_paths[index], language, profile))
+            except Exception as e:
+                finish(index, error=e)
+
+        return outcome
+
+    def _process_images_parallel(
+        self, file_paths: List[str], indexes: List[int], language: str, profile: str,
+        finish: Callable[..., None]
+    ) -> List[int]:
+        """
+        Run single-page images of a batch through the page pool as one stream.
+        The batch index travels as the page number. Returns the indexes left
+        unprocessed if a worker failed part way.
+        """
+        done = set()
+
+        def load():
+            for index in indexes:
+                image = cv2.imread(file_paths[index])
+                if image is None:
+                    done.add(index)
+                    finish(index, error=OCRProcessingException("Failed to load image"))
+                    continue
+                yield index, image
+
+        def on_result(result: OCRResult):
+            done.add(result.page_number)
+            finish(result.page_number, [result.model_copy(update={"page_number": 1})])
+
+        try:
+            process_pages_parallel(load(), language, profile, on_result=on_result)
+        except Exception as e:
+            print(f"Batch page pool run failed, finishing sequentially: {e}")
+
+        return [index for index in indexes if index not in done]
+
+    def _require_tesseract(self):
         if not self.tesseract_available:
             error_msg = (
                 "Tesseract OCR is not installed on the server. "
@@ -50,109 +248,532 @@ class OCRService:
                 "Your Dockerfile has Tesseract configured. "
             )
             raise OCRProcessingException(error_msg)
-            
-        if language is None:
-            language = settings.DEFAULT_LANGUAGE
-        
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext == '.pdf':
-            return self._process_pdf(file_path, language)
-        else:
-            return self._process_image(file_path, language)
 
-    def _process_pdf(self, pdf_path: str, language: str) -> List[OCRResult]:
+    def _pipeline_settings(self) -> tuple:
+        """Settings that change how a preprocessed page is recognized (part of both cache keys)"""
+        return (
+            self.TESSERACT_CONFIG, self.PREPROCESSING_VERSION, settings.OCR_ENGINE,
+            settings.OCR_SINGLE_PASS,
+            settings.OCR_TEXT_REGIONS, settings.OCR_TEXT_REGIONS_MAX_COVERAGE,
+            settings.OCR_TEXT_REGIONS_MAX_CALLS,
+            settings.OCR_PROGRESSIVE,
+            (settings.OCR_DRAFT_PROFILE, settings.OCR_REFINE_CONFIDENCE, settings.OCR_REFINE_UPSCALE,
+             settings.OCR_REFINE_MAX_LINES, settings.OCR_REFINE_MAX_CALLS)
+            if settings.OCR_PROGRESSIVE else None,
+        )
+
+    def cache_key(self, file_hash: str, language: str, profile: str) -> str:
+        """Result cache key: file content plus everything that changes the output"""
+        return make_cache_key(
+            file_hash, language, profile, self.PDF_DPI, *self._pipeline_settings(),
+            settings.PDF_USE_TEXT_LAYER,
+            (settings.PDF_TEXT_LAYER_MIN_CHARS, settings.PDF_TEXT_LAYER_MIN_DENSITY,
+             settings.PDF_TEXT_LAYER_MAX_IMAGE_COVERAGE)
+            if settings.PDF_USE_TEXT_LAYER else None,
+            settings.PDF_ADAPTIVE_DPI,
+            (settings.PDF_PROBE_DPI, settings.PDF_MIN_DPI, settings.PDF_MAX_DPI,
+             settings.OCR_TARGET_XHEIGHT_PX, settings.OCR_ADAPTIVE_MAX_DIMENSION)
+            if settings.PDF_ADAPTIVE_DPI else None,
+            settings.OCR_SKIP_BLANK_PAGES,
+            (settings.BLANK_PAGE_MAX_INK_RATIO, settings.BLANK_PAGE_MIN_STDDEV)
+            if settings.OCR_SKIP_BLANK_PAGES else None,
+            settings.OCR_AUTO_ROTATE,
+            (settings.OCR_ROTATE_MIN_CONFIDENCE, settings.OCR_ROTATE_MARGIN, settings.OCR_ROTATE_MIN_LINES)
+            if settings.OCR_AUTO_ROTATE else None,
+        )
+
+    def _process_pdf(
+        self, pdf_path: str, language: str, profile: str,
+        on_page: PageCallback = None, on_progress: ProgressCallback = None
+    ) -> List[OCRResult]:
         results = []
         try:
-            # Lower DPI for faster processing and less memory usage
-            images = convert_from_path(pdf_path, dpi=150)
-            
-            for page_num, image in enumerate(images, start=1):
-                cv2_image = self.preprocessor.pil_to_cv2(image)
-                result = self._process_single_image(cv2_image, page_num, language)
+            # Pages are rendered lazily, a window at a time, and freed once processed
+            rasterizer = PDFRasterizer(pdf_path, dpi=self.PDF_DPI)
+            total_pages = rasterizer.page_count
+            page_dpi: Dict[int, int] = {}
+            ocr_timing = {"started": None, "done": 0}
+
+            if on_progress is not None:
+                on_progress(0, total_pages, None)
+
+            def finish(result: OCRResult):
+                if result.source == "ocr":
+                    result = result.model_copy(
+                        update={"dpi": page_dpi.get(result.page_number, self.PDF_DPI)}
+                    )
+                    ocr_timing["done"] += 1
                 results.append(result)
-            return results
+                if on_page is not None:
+                    on_page(result, len(results), total_pages)
+                if on_progress is not None:
+                    remaining = total_pages - len(results)
+                    on_progress(len(results), total_pages, self._eta(ocr_timing, remaining))
+
+            # Digitally generated pages already carry their text - no need to OCR them
+            if settings.PDF_USE_TEXT_LAYER:
+                for result in self._extract_text_pages(pdf_path):
+                    finish(result)
+            text_pages = {r.page_number for r in results}
+            ocr_pages = [p for p in range(1, total_pages + 1) if p not in text_pages]
+
+            # Adaptive mode renders each page at the DPI its text size needs
+            if settings.PDF_ADAPTIVE_DPI:
+                max_dimension = settings.OCR_ADAPTIVE_MAX_DIMENSION
+                rendered = self._record_dpi(rasterizer.iter_pages_adaptive(ocr_pages), page_dpi)
+            else:
+                max_dimension = 1500
+                rendered = rasterizer.iter_pages(ocr_pages)
+
+            pages = (
+                (page_num, self.preprocessor.pil_to_cv2(image))
+                for page_num, image in rendered
+            )
+            ocr_timing["started"] = time.time()
+
+            if settings.OCR_PARALLEL_PAGES and settings.OCR_WORKERS > 1 and len(ocr_pages) > 1:
+                process_pages_parallel(
+                    pages, language, profile, max_dimension, on_result=finish
+                )
+            else:
+                for page_num, cv2_image in pages:
+                    # Wait our turn against other users' pages
+                    with page_slot():
+                        result = self._process_single_image(
+                            cv2_image, page_num, language, profile, max_dimension=max_dimension
+                        )
+                    finish(result)
+
+            return sorted(results, key=lambda r: r.page_number)
         except Exception as e:
             raise OCRProcessingException(f"Failed to process PDF: {str(e)}")
 
-    def _process_image(self, image_path: str, language: str) -> List[OCRResult]:
+    @staticmethod
+    def _eta(ocr_timing: Dict[str, object], remaining_pages: int) -> Optional[float]:
+        """Seconds left, from the wall time per OCR'd page so far (text-layer pages are ~free)"""
+        if remaining_pages == 0:
+            return 0.0
+        if not ocr_timing["started"] or not ocr_timing["done"]:
+            return None
+        per_page = (time.time() - ocr_timing["started"]) / ocr_timing["done"]
+        return per_page * remaining_pages
+
+    @staticmethod
+    def _record_dpi(pages: Iterator[Tuple[int, Image.Image, int]], page_dpi: Dict[int, int]):
+        """Pass adaptive-DPI pages through, remembering the DPI chosen for each"""
+        for page_num, image, dpi in pages:
+            page_dpi[page_num] = dpi
+            yield page_num, image
+
+    def _extract_text_pages(self, pdf_path: str) -> List[OCRResult]:
+        """Results for the pages whose embedded text layer is usable"""
+        start_time = time.time()
+        text_layer = extract_text_layer(pdf_path)
+        if not text_layer:
+            return []
+
+        # A text layer only replaces OCR when it covers the page: not a stamp
+        # on a scan (large raster image, or a few characters on a big page)
+        sizes = page_sizes(pdf_path)
+        coverage = image_coverage(pdf_path, sizes)
+        if coverage is None:
+            return []  # can't tell scans apart - OCR everything
+        usable = {
+            page_num: text for page_num, text in text_layer.items()
+            if page_num in sizes
+            and is_usable_text(text, sizes[page_num], coverage.get(page_num, 0.0))
+        }
+        if not usable:
+            return []
+
+        # One pdftotext run covers all pages - spread its cost evenly
+        per_page_time = (time.time() - start_time) / len(text_layer)
+        return [
+            OCRResult(
+                page_number=page_num,
+                text=self._clean_text(text),
+                confidence=1.0,  # exact embedded text, not a recognition guess
+                processing_time=per_page_time,
+                source="text_layer"
+            )
+            for page_num, text in usable.items()
+        ]
+
+    def _process_image(self, image_path: str, language: str, profile: str) -> List[OCRResult]:
         try:
             image = cv2.imread(image_path)
             if image is None:
                 raise OCRProcessingException("Failed to load image")
-            result = self._process_single_image(image, 1, language)
+            with page_slot():
+                result = self._process_single_image(image, 1, language, profile)
             return [result]
         except Exception as e:
             raise OCRProcessingException(f"Failed to process image: {str(e)}")
 
     def _process_single_image(
-        self, image: np.ndarray, page_number: int, language: str
+        self, image: np.ndarray, page_number: int, language: str,
+        profile: str = "balanced", max_dimension: int = 1500
     ) -> OCRResult:
         start_time = time.time()
         try:
-            # Resize large images to prevent memory issues (1500px max)
-            image = self.preprocessor.resize_if_needed(image, max_dimension=1500)
+            # Separator sheets and blank duplex backs: skip preprocessing and Tesseract
+            if settings.OCR_SKIP_BLANK_PAGES and self.preprocessor.is_blank(
+                image, settings.BLANK_PAGE_MAX_INK_RATIO, settings.BLANK_PAGE_MIN_STDDEV
+            ):
+                return OCRResult(
+                    page_number=page_number,
+                    text="",
+                    confidence=None,
+                    processing_time=time.time() - start_time,
+                    is_blank=True
+                )
+
+            # Resize large images to prevent memory issues (1500px max unless adaptive DPI)
+            image = self.preprocessor.resize_if_needed(image, max_dimension=max_dimension)
+
+            # Sideways / upside-down scans are turned upright before anything else
+            rotation = 0
+            if settings.OCR_AUTO_ROTATE:
+                rotation = self._detect_orientation(image)
+                image = self.preprocessor.rotate_clockwise(image, rotation)
+
+            # Progressive mode: cheap draft over the whole page, weak lines are
+            # refined later with the requested profile
+            draft_profile = settings.OCR_DRAFT_PROFILE if settings.OCR_PROGRESSIVE else profile
+
+            # === PREPROCESSING (named profile, timed per stage) ===
+            processed, stage_timings = self.preprocessor.run_profile(image, draft_profile)
+
+            # Pages shared across documents (cover sheets, T&Cs) are recognized once
+            page_cache = get_page_cache()
+            page_key = None
+            if page_cache is not None:
+                page_key = make_cache_key(
+                    hash_pixels(processed), language, profile, *self._pipeline_settings()
+                )
+                cached = page_cache.get(page_key)
+                if cached:
+                    return cached[0].model_copy(update={
+                        "page_number": page_number,
+                        "processing_time": time.time() - start_time,
+                        "stage_timings": stage_timings,
+                        "rotation": rotation
+                    })
 
-            # === OPTIMIZED PREPROCESSING ===
-            processed = self._optimized_preprocess(image)
+            # Layout pre-pass: only send text blocks to Tesseract
+            regions = None
+            if settings.OCR_TEXT_REGIONS:
+                regions = self._select_regions(processed)
 
             # Convert to PIL
             pil_image = self.preprocessor.cv2_to_pil(processed)
 
             # OCR
-            ocr_data = pytesseract.image_to_data(
-                pil_image, lang=language,
-                output_type=pytesseract.Output.DICT,
-                config=self.TESSERACT_CONFIG
-            )
+            if regions is not None:
+                ocr_data = self._recognize_regions(processed, regions, language)
+                text = self._text_from_data(ocr_data)
+            elif settings.OCR_SINGLE_PASS:
+                ocr_data = self._recognize(pil_image, language)
+                # Text and confidences come from the same Tesseract run
+                text = self._text_from_data(ocr_data)
+            else:
+                # Legacy two-pass mode (second Tesseract call for the text)
+                ocr_data = self._recognize(pil_image, language)
+                text = pytesseract.image_to_string(
+                    pil_image, lang=language, config=self.TESSERACT_CONFIG
+                )
 
-            text = pytesseract.image_to_string(
-                pil_image, lang=language, config=self.TESSERACT_CONFIG
-            )
+            # Second pass: heavier preprocessing only where the draft is unsure
+            refined_lines = None
+            if settings.OCR_PROGRESSIVE:
+                weak_lines = len(self._weak_lines(ocr_data))
+                if weak_lines > self._refine_line_limit():
+                    # Re-running that many lines one by one costs more than one full pass
+                    processed, full_timings = self.preprocessor.run_profile(image, profile)
+                    for stage, seconds in full_timings.items():
+                        stage_timings[stage] = stage_timings.get(stage, 0.0) + seconds
+                    ocr_data = self._recognize(self.preprocessor.cv2_to_pil(processed), language)
+                    refined_lines = weak_lines
+                else:
+                    ocr_data, refined_lines = self._refine_low_confidence(image, ocr_data, language, profile)
+                text = self._text_from_data(ocr_data)
 
             # Handle empty cases
             text = text or ""
 
             # Confidence
-            confidences = [int(c) for c in ocr_data['conf'] if c != '-1']
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            avg_confidence = self._average_confidence(ocr_data)
 
             processing_time = time.time() - start_time
 
             text = self._clean_text(text)
 
-            return OCRResult(
+            result = OCRResult(
                 page_number=page_number,
                 text=text,
                 confidence=avg_confidence / 100.0,
-                processing_time=processing_time
+                processing_time=processing_time,
+                preprocessing_profile=profile,
+                stage_timings=stage_timings,
+                regions=[
+                    TextRegion(x=x, y=y, width=w, height=h) for x, y, w, h in regions
+                ] if regions is not None else None,
+                refined_lines=refined_lines,
+                rotation=rotation,
+                words=self._words_from_data(ocr_data),
+                page_width=processed.shape[1],
+                page_height=processed.shape[0]
             )
 
+            if page_cache is not None:
+                page_cache.put(page_key, [result])
+            return result
+
         except Exception as e:
             processing_time = time.time() - start_time
             raise OCRProcessingException(f"OCR failed on page {page_number}: {str(e)}")
 
-    # ──── OPTIMIZED PREPROCESSING ───────────────────────────────────────
-    def _optimized_preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Faster & better for Tesseract: grayscale → denoise → CLAHE → light sharpen"""
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image.copy()
+    # ──── RECOGNITION ──────────────────────────────────────────────────
+    def _recognize(
+        self, pil_image: Image.Image, language: str, config: str = None
+    ) -> Dict[str, list]:
+        """Run Tesseract once and return the word-level TSV result as a dict"""
+        config = config or self.TESSERACT_CONFIG
+        pool = get_tesseract_pool()
+        if pool is not None:
+            try:
+                return pool.recognize(pil_image, language, config)
+            except TesseractPoolError as e:
+                print(f"Persistent Tesseract engine unavailable, falling back to pytesseract: {e}")
+
+        return pytesseract.image_to_data(
+            pil_image, lang=language,
+            output_type=pytesseract.Output.DICT,
+            config=config
+        )
 
-        # Denoise (keep it light)
-        denoised = cv2.bilateralFilter(gray, d=7, sigmaColor=50, sigmaSpace=50)
+    def _detect_orientation(self, image: np.ndarray) -> int:
+        """
+        Clockwise rotation that makes the page upright. Tesseract's orientation
+        detection (OSD) decides when it runs - trusted only above
+        OCR_ROTATE_MIN_CONFIDENCE, otherwise the page is left alone. Without
+        OSD (no osd.traineddata) the layout heuristic is used, which also
+        answers 0 unless the evidence is clear.
+        """
+        try:
+            osd = pytesseract.image_to_osd(
+                self.preprocessor.cv2_to_pil(image),
+                output_type=pytesseract.Output.DICT,
+                timeout=settings.OCR_TIMEOUT_SECONDS
+            )
+        except (pytesseract.TesseractError, pytesseract.TesseractNotFoundError, RuntimeError) as e:
+            # Also raised for "Too few characters" - the heuristic then finds too few lines
+            print(f"Tesseract OSD unavailable, using layout heuristic: {e}")
+            return self.preprocessor.detect_orientation(
+                image, min_lines=settings.OCR_ROTATE_MIN_LINES, margin=settings.OCR_ROTATE_MARGIN
+            )
+
+        if float(osd.get('orientation_conf', 0)) < settings.OCR_ROTATE_MIN_CONFIDENCE:
+            return 0
+        return int(osd.get('rotate', 0)) % 360
+
+    def _select_regions(self, processed: np.ndarray) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Text regions worth cropping, or None when cropping wouldn't save much:
+        dense pages where the blocks cover most of the page anyway, or - when
+        every call spawns tesseract and reloads its model - too many blocks.
+        """
+        regions = self.preprocessor.detect_text_regions(processed)
+        page_area = processed.shape[0] * processed.shape[1]
+        covered = sum(w * h for _, _, w, h in regions)
+        if not regions or covered > page_area * settings.OCR_TEXT_REGIONS_MAX_COVERAGE:
+            return None
+        if get_tesseract_pool() is None and len(regions) > settings.OCR_TEXT_REGIONS_MAX_CALLS:
+            return None
+        return regions
+
+    def _recognize_regions(
+        self, processed: np.ndarray, regions: List[Tuple[int, int, int, int]], language: str
+    ) -> Dict[str, list]:
+        """
+        Recognize each region crop and merge the results into one page-level
+        image_to_data dict: word boxes are shifted back to page coordinates and
+        block numbers are renumbered so regions stay separate in reading order.
+        """
+        merged: Dict[str, list] = {}
+        block_offset = 0
+        for x, y, w, h in regions:
+            crop = self.preprocessor.cv2_to_pil(processed[y:y + h, x:x + w])
+            data = self._recognize(crop, language)
+
+            for key, values in data.items():
+                if key == 'left':
+                    values = [int(v) + x for v in values]
+                elif key == 'top':
+                    values = [int(v) + y for v in values]
+                elif key == 'block_num':
+                    values = [int(v) + block_offset for v in values]
+                merged.setdefault(key, []).extend(values)
+
+            block_offset = max(merged.get('block_num') or [block_offset]) + 1
+        return merged
+
+    def _refine_low_confidence(
+        self, image: np.ndarray, ocr_data: Dict[str, list], language: str,
+        profile: str = "accurate"
+    ) -> Tuple[Dict[str, list], int]:
+        """
+        Re-recognize lines whose mean word confidence is below
+        OCR_REFINE_CONFIDENCE: crop the line from the (unpreprocessed) page,
+        run `profile` on it, upscale and OCR it as a single line. A refined
+        line replaces the draft only when its confidence is higher.
+        Draft coordinates are used on `image` directly, which is why the draft
+        profile may not move pixels (see check_progressive_settings).
+        Returns the merged data and lines replaced.
+        """
+        rows = self._data_rows(ocr_data)
+        replacements: Dict[Tuple[int, int, int], List[dict]] = {}
+        height, width = image.shape[:2]
+        scale = settings.OCR_REFINE_UPSCALE
+        pad = 4
+
+        for key, words in self._weak_lines(ocr_data).items():
+            draft_conf = self._mean_conf(words)
+            x0 = max(0, min(w['left'] for w in words) - pad)
+            y0 = max(0, min(w['top'] for w in words) - pad)
+            x1 = min(width, max(w['left'] + w['width'] for w in words) + pad)
+            y1 = min(height, max(w['top'] + w['height'] for w in words) + pad)
+            if x1 <= x0 or y1 <= y0:
+                continue
+
+            crop, _ = self.preprocessor.run_profile(image[y0:y1, x0:x1], profile)
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            refined = self._data_rows(self._recognize(
+                self.preprocessor.cv2_to_pil(crop), language, config=self.LINE_CONFIG
+            ))
+            refined_words = [r for r in refined if r['level'] == 5 and str(r['text']).strip()]
+
+            refined_conf = self._mean_conf(refined_words)
+            if refined_conf is None or refined_conf <= draft_conf:
+                continue
+
+            # Back to page coordinates, keeping the draft's block/paragraph/line slot
+            for r in refined_words:
+                r.update({
+                    'block_num': key[0], 'par_num': key[1], 'line_num': key[2],
+                    'left': x0 + int(r['left'] / scale), 'top': y0 + int(r['top'] / scale),
+                    'width': int(r['width'] / scale), 'height': int(r['height'] / scale),
+                })
+            replacements[key] = refined_words
+
+        if not replacements:
+            return ocr_data, 0
+
+        refined_count = len(replacements)
+        merged: List[dict] = []
+        emitted = set()
+        for row in rows:
+            key = self._line_key(row)
+            if row['level'] == 5 and key in replacements:
+                # Emit the refined words once, where the line's first word was;
+                # the line's other draft words are dropped
+                if key not in emitted:
+                    merged.extend(replacements[key])
+                    emitted.add(key)
+                continue
+            merged.append(row)
+
+        return self._data_columns(merged, list(ocr_data.keys())), refined_count
+
+    def _weak_lines(self, ocr_data: Dict[str, list]) -> Dict[Tuple[int, int, int], List[dict]]:
+        """Words of each line whose mean confidence is below OCR_REFINE_CONFIDENCE"""
+        lines: Dict[Tuple[int, int, int], List[dict]] = {}
+        for row in self._data_rows(ocr_data):
+            if row['level'] == 5 and str(row['text']).strip():
+                lines.setdefault(self._line_key(row), []).append(row)
+        return {
+            key: words for key, words in lines.items()
+            if self._mean_conf(words) is not None
+            and self._mean_conf(words) < settings.OCR_REFINE_CONFIDENCE
+        }
+
+    @staticmethod
+    def _refine_line_limit() -> int:
+        """Weak lines worth refining one by one - fewer when every call spawns tesseract"""
+        if get_tesseract_pool() is None:
+            return min(settings.OCR_REFINE_MAX_LINES, settings.OCR_REFINE_MAX_CALLS)
+        return settings.OCR_REFINE_MAX_LINES
+
+    @staticmethod
+    def _line_key(row: dict) -> Tuple[int, int, int]:
+        return (int(row['block_num']), int(row['par_num']), int(row['line_num']))
+
+    @staticmethod
+    def _mean_conf(words: List[dict]) -> Optional[float]:
+        confidences = [float(w['conf']) for w in words if float(w['conf']) >= 0]
+        return sum(confidences) / len(confidences) if confidences else None
+
+    @staticmethod
+    def _data_rows(ocr_data: Dict[str, list]) -> List[dict]:
+        """image_to_data columns → list of row dicts (numeric fields as int)"""
+        keys = list(ocr_data.keys())
+        rows = []
+        for values in zip(*(ocr_data[k] for k in keys)):
+            row = dict(zip(keys, values))
+            for k in ('level', 'block_num', 'par_num', 'line_num', 'left', 'top', 'width', 'height'):
+                if k in row:
+                    row[k] = int(row[k])
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _data_columns(rows: List[dict], keys: List[str]) -> Dict[str, list]:
+        """Inverse of _data_rows"""
+        return {k: [row.get(k) for row in rows] for k in keys}
+
+    @staticmethod
+    def _text_from_data(ocr_data: Dict[str, list]) -> str:
+        """
+        Rebuild page text from image_to_data output.
+        Words are grouped by (block, paragraph, line) exactly like Tesseract's
+        text renderer, so the result matches image_to_string after cleaning.
+        """
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        for i, word in enumerate(ocr_data.get('text', [])):
+            if int(ocr_data['level'][i]) != 5 or not word or not word.strip():
+                continue
+            key = (
+                int(ocr_data['block_num'][i]),
+                int(ocr_data['par_num'][i]),
+                int(ocr_data['line_num'][i]),
+            )
+            lines.setdefault(key, []).append(word.strip())
 
-        # Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(denoised)
+        # dicts keep insertion order, which is Tesseract's reading order
+        return '\n'.join(' '.join(words) for words in lines.values())
 
-        # Light sharpening (helps Tesseract a lot!)
-        kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-        sharpened = cv2.filter2D(enhanced, -1, kernel)
+    @staticmethod
+    def _words_from_data(ocr_data: Dict[str, list]) -> List[WordBox]:
+        """Word boxes from image_to_data output, in reading order"""
+        words = []
+        for i, word in enumerate(ocr_data.get('text', [])):
+            if int(ocr_data['level'][i]) != 5 or not word or not word.strip():
+                continue
+            words.append(WordBox(
+                text=word.strip(),
+                confidence=max(float(ocr_data['conf'][i]), 0.0),
+                x=int(ocr_data['left'][i]),
+                y=int(ocr_data['top'][i]),
+                width=int(ocr_data['width'][i]),
+                height=int(ocr_data['height'][i])
+            ))
+        return words
 
-        # Return grayscale enhanced image (NO binarization!)
-        return sharpened
+    @staticmethod
+    def _average_confidence(ocr_data: Dict[str, list]) -> float:
+        """Average word confidence (0-100), ignoring non-word rows (-1)"""
+        confidences = [float(c) for c in ocr_data.get('conf', []) if float(c) >= 0]
+        return sum(confidences) / len(confidences) if confidences else 0
 
     def _clean_text(self, text: str) -> str:
         if not text:
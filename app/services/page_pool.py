@@ -0,0 +1,138 @@
+"""
+app/services/page_pool.py
+Process pool for page-parallel OCR of multi-page documents
+"""
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+import multiprocessing
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.ocr import OCRResult
+from app.services.scheduler import acquire_page_slot, release_page_slot
+
+
+# Rough fixed cost of one Tesseract run (process + LSTM model), in MB
+TESSERACT_OVERHEAD_MB = 60
+
+# Preprocessing keeps ~4 working copies of the page alive (resize, gray, filter, CLAHE, sharpen)
+PREPROCESS_COPY_FACTOR = 4
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Per-process OCRService, built lazily inside each pool worker
+_worker_service = None
+
+
+def _ocr_page_in_worker(
+    image: np.ndarray, page_number: int, language: str, profile: str, max_dimension: int
+) -> OCRResult:
+    """Entry point executed inside a pool worker: preprocess + recognize one page"""
+    global _worker_service
+    from app.services.ocr_service import OCRService
+
+    if _worker_service is None:
+        _worker_service = OCRService()
+
+    try:
+        return _worker_service._process_single_image(
+            image, page_number, language, profile, max_dimension=max_dimension
+        )
+    except Exception as e:
+        # HTTPException subclasses don't survive pickling back to the parent
+        raise RuntimeError(getattr(e, "detail", str(e)))
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    """Return the shared page pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_page_pool():
+    """Stop the shared page pool (called on application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def estimate_page_memory_mb(image: np.ndarray, max_dimension: int = 1500) -> float:
+    """Estimate peak memory needed to OCR one page"""
+    height, width = image.shape[:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    return estimate_page_memory_mb_for_size(width, height, channels, max_dimension)
+
+
+def estimate_page_memory_mb_for_size(
+    width: int, height: int, channels: int = 3, max_dimension: int = 1500
+) -> float:
+    """Same estimate from page dimensions alone (before the page is decoded)"""
+    scale = min(1.0, max_dimension / max(height, width, 1))
+    image_bytes = width * height * channels
+    working_bytes = (height * width * scale * scale) * PREPROCESS_COPY_FACTOR
+    return image_bytes / (1024 * 1024) + working_bytes / (1024 * 1024) + TESSERACT_OVERHEAD_MB
+
+
+def max_pages_in_flight(page_memory_mb: float) -> int:
+    """How many pages may be processed at once within the per-job memory budget"""
+    by_memory = int(settings.OCR_JOB_MEMORY_MB // max(page_memory_mb, 1))
+    return max(1, min(settings.OCR_WORKERS, by_memory))
+
+
+def process_pages_parallel(
+    pages: Iterable[Tuple[int, np.ndarray]], language: str, profile: str,
+    max_dimension: int = 1500, on_result: Callable[[OCRResult], None] = None
+) -> List[OCRResult]:
+    """
+    OCR (page_number, image) pairs on the process pool.
+    Pages are submitted lazily so that no more than the memory budget allows
+    is in flight at once. Results are returned (and passed to `on_result`)
+    in page order.
+    """
+    pool = get_page_pool()
+    pending: Deque[Future] = deque()
+    results: List[OCRResult] = []
+    limit = None
+
+    for page_number, image in pages:
+        if limit is None:
+            limit = max_pages_in_flight(estimate_page_memory_mb(image, max_dimension))
+
+        while len(pending) >= limit:
+            _collect(pending.popleft(), results, on_result)
+
+        # Fair-share slot is held from submission until the worker is done with the page
+        ticket = acquire_page_slot()
+        try:
+            future = pool.submit(_ocr_page_in_worker, image, page_number, language, profile, max_dimension)
+        except Exception:
+            release_page_slot(ticket)
+            raise
+        future.add_done_callback(lambda _, ticket=ticket: release_page_slot(ticket))
+        pending.append(future)
+
+    while pending:
+        _collect(pending.popleft(), results, on_result)
+
+    return results
+
+
+def _collect(future: Future, results: List[OCRResult], on_result: Callable[[OCRResult], None]):
+    result = future.result()
+    results.append(result)
+    if on_result is not None:
+        on_result(result)
@@ -0,0 +1,216 @@
+"""
+app/services/pdf_rasterizer.py
+Streaming, bounded-memory PDF rasterization and text-layer extraction (poppler)
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import math
+import re
+import subprocess
+
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from app.core.config import settings
+from app.services.preprocessing import ImagePreprocessor
+
+
+class PDFRasterizer:
+    """
+    Renders a PDF lazily, a window of pages at a time.
+    Only one window of page images is alive at once, so peak memory does not
+    grow with the page count.
+    """
+
+    def __init__(self, pdf_path: str, dpi: int = 150, window: int = None):
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.window = max(1, window or settings.PDF_RASTER_WINDOW)
+        self.page_count = int(pdfinfo_from_path(pdf_path)["Pages"])
+
+    def iter_pages(self, pages: Iterable[int] = None) -> Iterator[Tuple[int, Image.Image]]:
+        """Yield (page_number, image) pairs in page order, optionally only for `pages`"""
+        wanted = sorted(set(pages)) if pages is not None else list(range(1, self.page_count + 1))
+
+        for first_page, last_page in self._windows(wanted):
+            images = convert_from_path(
+                self.pdf_path,
+                dpi=self.dpi,
+                first_page=first_page,
+                last_page=last_page
+            )
+
+            page_number = first_page
+            while images:
+                # Pop so the window list doesn't keep processed pages alive
+                image = images.pop(0)
+                yield page_number, image
+                image.close()
+                page_number += 1
+
+    def iter_pages_adaptive(
+        self, pages: Iterable[int] = None
+    ) -> Iterator[Tuple[int, Image.Image, int]]:
+        """
+        Yield (page_number, image, dpi) with a per-page DPI chosen from a cheap
+        low-resolution probe render, so text lands in Tesseract's preferred size.
+        """
+        wanted = sorted(set(pages)) if pages is not None else list(range(1, self.page_count + 1))
+
+        for first_page, last_page in self._windows(wanted):
+            probes = convert_from_path(
+                self.pdf_path,
+                dpi=settings.PDF_PROBE_DPI,
+                first_page=first_page,
+                last_page=last_page,
+                grayscale=True
+            )
+
+            page_number = first_page
+            while probes:
+                probe = probes.pop(0)
+                dpi = self._choose_dpi(page_number, np.array(probe))
+                probe.close()
+
+                image = convert_from_path(
+                    self.pdf_path, dpi=dpi, first_page=page_number, last_page=page_number
+                )[0]
+                yield page_number, image, dpi
+                image.close()
+                page_number += 1
+
+    def _choose_dpi(self, page_number: int, probe: np.ndarray) -> int:
+        """Lowest DPI (in 25 DPI steps) that brings the x-height up to the target size"""
+        x_height = ImagePreprocessor.estimate_x_height(probe)
+        if x_height is None:
+            print(f"Page {page_number}: no text size estimate, using {self.dpi} DPI")
+            return self.dpi
+
+        wanted = settings.PDF_PROBE_DPI * settings.OCR_TARGET_XHEIGHT_PX / x_height
+        dpi = int(math.ceil(wanted / 25.0) * 25)
+        dpi = max(settings.PDF_MIN_DPI, min(settings.PDF_MAX_DPI, dpi))
+        print(
+            f"Page {page_number}: x-height {x_height:.1f}px @ {settings.PDF_PROBE_DPI} DPI "
+            f"→ rendering at {dpi} DPI"
+        )
+        return dpi
+
+    def _windows(self, pages: List[int]) -> Iterator[Tuple[int, int]]:
+        """Group page numbers into runs of consecutive pages, at most `window` long"""
+        run_start = None
+        previous = None
+        for page in pages:
+            if run_start is None:
+                run_start = page
+            elif page != previous + 1 or page - run_start >= self.window:
+                yield run_start, previous
+                run_start = page
+            previous = page
+        if run_start is not None:
+            yield run_start, previous
+
+
+def extract_text_layer(pdf_path: str) -> Dict[int, str]:
+    """
+    Extract the embedded text of every page with poppler's pdftotext.
+    Returns {page_number: text}; empty when the tool is missing or fails.
+    """
+    try:
+        completed = subprocess.run(
+            ['pdftotext', '-enc', 'UTF-8', pdf_path, '-'],
+            capture_output=True, check=True, timeout=settings.OCR_TIMEOUT_SECONDS
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
+        print(f"pdftotext failed, falling back to OCR for all pages: {e}")
+        return {}
+
+    # pdftotext ends every page with a form feed
+    pages = completed.stdout.decode('utf-8', errors='replace').split('\f')
+    return {page_number: text for page_number, text in enumerate(pages[:-1] or pages, start=1)}
+
+
+def page_sizes(pdf_path: str) -> Dict[int, Tuple[float, float]]:
+    """{page_number: (width, height) in points} from pdfinfo; empty when it fails"""
+    try:
+        completed = subprocess.run(
+            # -l -1: through the last page (pdfinfo clamps out-of-range values)
+            ['pdfinfo', '-f', '1', '-l', '-1', pdf_path],
+            capture_output=True, check=True, timeout=settings.OCR_TIMEOUT_SECONDS
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
+        print(f"pdfinfo failed, can't check text layer density: {e}")
+        return {}
+    return parse_page_sizes(completed.stdout.decode('utf-8', errors='replace'))
+
+
+def parse_page_sizes(output: str) -> Dict[int, Tuple[float, float]]:
+    # "Page    1 size: 612 x 792 pts (letter)"
+    return {
+        int(page): (float(width), float(height))
+        for page, width, height in re.findall(
+            r'^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)', output, re.MULTILINE
+        )
+    }
+
+
+def image_coverage(pdf_path: str, sizes: Dict[int, Tuple[float, float]]) -> Optional[Dict[int, float]]:
+    """
+    {page_number: share of the page area covered by raster images} from
+    `pdfimages -list`; None when the tool fails (coverage unknown)
+    """
+    try:
+        completed = subprocess.run(
+            ['pdfimages', '-list', pdf_path],
+            capture_output=True, check=True, timeout=settings.OCR_TIMEOUT_SECONDS
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
+        print(f"pdfimages failed, can't check pages for scanned images: {e}")
+        return None
+    return parse_image_coverage(completed.stdout.decode('utf-8', errors='replace'), sizes)
+
+
+def parse_image_coverage(output: str, sizes: Dict[int, Tuple[float, float]]) -> Dict[int, float]:
+    coverage: Dict[int, float] = {}
+    for line in output.splitlines()[2:]:  # two header lines
+        # page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+        fields = line.split()
+        if len(fields) < 14 or fields[2] != 'image' or fields[0] == 'page':
+            continue
+        try:
+            page, width, height = int(fields[0]), int(fields[3]), int(fields[4])
+            x_ppi, y_ppi = float(fields[12]), float(fields[13])
+        except ValueError:
+            continue
+        if page not in sizes or x_ppi <= 0 or y_ppi <= 0:
+            continue
+        # Drawn size in points: pixels / (pixels per inch) * 72
+        image_area = (width / x_ppi * 72) * (height / y_ppi * 72)
+        page_width, page_height = sizes[page]
+        coverage[page] = coverage.get(page, 0.0) + image_area / (page_width * page_height)
+    return coverage
+
+
+def is_usable_text(
+    text: str, page_size: Optional[Tuple[float, float]] = None, image_share: float = 0.0
+) -> bool:
+    """
+    Does an embedded text layer look like the real content of the page, rather
+    than an empty or garbage layer - or a digital stamp (header, Bates number)
+    on top of a scanned page?
+    """
+    stripped = ''.join(text.split())
+    if len(stripped) < settings.PDF_TEXT_LAYER_MIN_CHARS:
+        return False
+    # Broken font encodings come out as replacement characters or symbols
+    readable = sum(1 for ch in stripped if ch.isalnum() or ch in '.,;:!?\'"()-%$&/@')
+    if readable / len(stripped) < 0.8:
+        return False
+    # The body of the page is a scan
+    if image_share > settings.PDF_TEXT_LAYER_MAX_IMAGE_COVERAGE:
+        return False
+    if page_size is not None:
+        area_sq_in = page_size[0] * page_size[1] / (72 * 72)
+        if len(stripped) / area_sq_in < settings.PDF_TEXT_LAYER_MIN_DENSITY:
+            return False
+    return True
@@ -6,8 +6,9 @@ Advanced image preprocessing pipeline for OCR
 import cv2
 import numpy as np
 from PIL import Image
-from typing import Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import io
+import time
 
 
 class ImagePreprocessor:
@@ -39,6 +40,37 @@ class ImagePreprocessor:
         
         return deskewed
     
+    @staticmethod
+    def run_profile(image: np.ndarray, profile: str) -> Tuple[np.ndarray, Dict[str, float]]:
+        """
+        Run the stages of a named profile (see PREPROCESSING_PROFILES) in order.
+        Returns the processed image and the wall time of each stage in seconds.
+        """
+        timings: Dict[str, float] = {}
+        for stage in PREPROCESSING_PROFILES[profile]:
+            start = time.perf_counter()
+            image = PREPROCESSING_STAGES[stage](image)
+            timings[stage] = time.perf_counter() - start
+        return image, timings
+
+    @staticmethod
+    def _grayscale(image: np.ndarray) -> np.ndarray:
+        """Convert to single-channel grayscale (no-op if already gray)"""
+        if len(image.shape) == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image.copy()
+
+    @staticmethod
+    def _light_denoise(image: np.ndarray) -> np.ndarray:
+        """Lighter bilateral filter - keeps thin strokes intact"""
+        return cv2.bilateralFilter(image, d=7, sigmaColor=50, sigmaSpace=50)
+
+    @staticmethod
+    def _sharpen(image: np.ndarray) -> np.ndarray:
+        """Light sharpening kernel (helps Tesseract on soft scans)"""
+        kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+        return cv2.filter2D(image, -1, kernel)
+
     @staticmethod
     def _denoise(image: np.ndarray) -> np.ndarray:
         """Apply bilateral filtering for noise reduction"""
@@ -68,21 +100,8 @@ class ImagePreprocessor:
     @staticmethod
     def _deskew(image: np.ndarray) -> np.ndarray:
         """Detect and correct skew in the image"""
-        # Find all white pixels
-        coords = np.column_stack(np.where(image > 0))
-        
-        if len(coords) < 100:  # Not enough points to determine skew
-            return image
-        
-        # Calculate the angle of skew
-        angle = cv2.minAreaRect(coords)[-1]
-        
-        # Adjust angle
-        if angle < -45:
-            angle = 90 + angle
-        elif angle > 45:
-            angle = angle - 90
-        
+        angle = ImagePreprocessor.estimate_skew(image)
+
         # Only deskew if angle is significant (> 0.5 degrees)
         if abs(angle) < 0.5:
             return image
@@ -100,7 +119,338 @@ class ImagePreprocessor:
         )
         
         return rotated
-    
+
+    @staticmethod
+    def _ink_mask(image: np.ndarray, max_dimension: int) -> np.ndarray:
+        """Downscaled binary mask with text pixels set (works for gray or binarized pages)"""
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        small = ImagePreprocessor.resize_if_needed(image, max_dimension=max_dimension)
+        _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        return ink
+
+    @staticmethod
+    def estimate_skew(
+        image: np.ndarray, max_angle: float = 5.0, work_dimension: int = 800,
+        max_points: int = 20000
+    ) -> float:
+        """
+        Skew angle in degrees (cv2.getRotationMatrix2D convention: rotating by
+        the result straightens the page) from a projection profile.
+
+        Ink pixels of a downscaled page are projected onto the vertical axis
+        at candidate angles; text lines line up - and the histogram is most
+        peaked - at the true skew. Coarse 0.5° search, then 0.1° refinement.
+        Cost is bounded by work_dimension and max_points, not page size.
+        """
+        ink = ImagePreprocessor._ink_mask(image, work_dimension)
+        ys, xs = np.nonzero(ink)
+        if len(ys) < 100:  # Not enough points to determine skew
+            return 0.0
+
+        step = max(1, len(ys) // max_points)
+        ys = ys[::step].astype(np.float64)
+        xs = xs[::step].astype(np.float64)
+        xs -= xs.mean()
+        ys -= ys.mean()
+
+        def peakiness(angle: float) -> float:
+            theta = np.deg2rad(angle)
+            projected = ys * np.cos(theta) - xs * np.sin(theta)
+            bins = np.round(projected - projected.min()).astype(np.int64)
+            counts = np.bincount(bins).astype(np.float64)
+            return float((counts * counts).sum())
+
+        coarse = np.arange(-max_angle, max_angle + 0.25, 0.5)
+        best = max(coarse, key=peakiness)
+        fine = np.arange(best - 0.5, best + 0.55, 0.1)
+        return float(round(max(fine, key=peakiness), 2))
+
+    @staticmethod
+    def detect_orientation(
+        image: np.ndarray, work_dimension: int = 1000, min_lines: int = 5, margin: float = 1.5
+    ) -> int:
+        """
+        Clockwise rotation (0, 90, 180 or 270) that makes the page upright.
+
+        Sideways pages are spotted from the shape of text lines: smeared along
+        the reading direction, lines become long thin blobs, horizontal on an
+        upright page and vertical on a sideways one. Upside-down pages are
+        spotted from line shape: in Latin scripts ascenders and capitals put
+        more ink above the x-height band than descenders put below it.
+
+        Anything short of `min_lines` lines or a `margin` between the two
+        readings returns 0 - leaving a page as it is, is always safe; all-caps
+        text, tables and single lines are left alone.
+        """
+        ink = ImagePreprocessor._ink_mask(image, work_dimension)
+        ys, xs = np.nonzero(ink)
+        if len(ys) < 200:
+            return 0
+
+        # Crop to the ink so page margins don't inflate either profile
+        ink = ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+        rotation = 0
+        horizontal = ImagePreprocessor._count_text_lines(ink)
+        vertical = ImagePreprocessor._count_text_lines(cv2.rotate(ink, cv2.ROTATE_90_CLOCKWISE))
+        if vertical >= min_lines and vertical >= margin * max(horizontal, 1):
+            ink = cv2.rotate(ink, cv2.ROTATE_90_CLOCKWISE)
+            rotation = 90
+        elif horizontal < min_lines:
+            return 0
+
+        upside_down = ImagePreprocessor._is_upside_down(ink, min_lines, margin)
+        if upside_down is None:
+            # Also when sideways: guessing the wrong way up is no better
+            return 0
+        return (rotation + 180) % 360 if upside_down else rotation
+
+    @staticmethod
+    def rotate_clockwise(image: np.ndarray, degrees: int) -> np.ndarray:
+        """Rotate by a multiple of 90 degrees (as returned by detect_orientation)"""
+        codes = {
+            90: cv2.ROTATE_90_CLOCKWISE,
+            180: cv2.ROTATE_180,
+            270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+        }
+        return cv2.rotate(image, codes[degrees]) if degrees in codes else image
+
+    @staticmethod
+    def _count_text_lines(ink: np.ndarray) -> int:
+        """
+        Horizontal text lines in an ink mask: glyphs are smeared sideways by
+        about their own height, then blobs much wider than tall are counted.
+        Table rules are a single blob each and barely count.
+        """
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        # Ignore specks and rules when sizing glyphs
+        glyphs = heights[(heights >= 3) & (stats[1:, cv2.CC_STAT_WIDTH] < 4 * heights)]
+        if len(glyphs) < 10:
+            return 0
+        glyph_height = int(np.median(glyphs))
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, glyph_height), 1))
+        smeared = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(smeared, connectivity=8)
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        lines = (widths >= 6 * heights) & (heights >= 0.5 * glyph_height) & (heights <= 3 * glyph_height)
+        return int(lines.sum())
+
+    @staticmethod
+    def _is_upside_down(ink: np.ndarray, min_lines: int = 5, margin: float = 1.5) -> Optional[bool]:
+        """
+        Compare ink above vs below the x-height band of each text line.
+        None when there are too few lines or the two sides are too close to call
+        (all-caps text has neither ascenders nor descenders).
+        """
+        profile = ink.sum(axis=1).astype(np.float64)
+        in_line = profile > profile.max() * 0.05
+
+        above = below = 0.0
+        lines = 0
+        row = 0
+        rows = len(profile)
+        while row < rows:
+            if not in_line[row]:
+                row += 1
+                continue
+            start = row
+            while row < rows and in_line[row]:
+                row += 1
+            band = profile[start:row]
+            if len(band) < 4:
+                continue
+            core = np.nonzero(band >= band.max() * 0.5)[0]
+            above += band[:core[0]].sum()
+            below += band[core[-1] + 1:].sum()
+            lines += 1
+
+        if lines < min_lines:
+            return None
+        # The asymmetry must be clear and a visible share of the ink
+        if abs(above - below) < 0.02 * profile.sum():
+            return None
+        if below > above * margin:
+            return True
+        if above > below * margin:
+            return False
+        return None
+
+    @staticmethod
+    def is_blank(
+        image: np.ndarray, max_ink_ratio: float = 0.0003, min_stddev: float = 1.5
+    ) -> bool:
+        """
+        Blank-page check. A ~200px thumbnail settles most pages: any real
+        amount of ink means text. A flat or nearly inkless thumbnail is only a
+        candidate - a single short line is little ink at that size too - and
+        is blank when a copy at least 1000px across has no glyph-sized mark.
+        """
+        thumb = ImagePreprocessor._thumbnail(image)
+
+        if float(thumb.std()) >= min_stddev:
+            # "Ink" = clearly darker than the paper (median) tone
+            paper = float(np.median(thumb))
+            ink_ratio = float(np.count_nonzero(thumb < paper - 40)) / thumb.size
+            if ink_ratio >= max_ink_ratio:
+                return False
+
+        return ImagePreprocessor._count_marks(image) == 0
+
+    @staticmethod
+    def _count_marks(image: np.ndarray, work_dimension: int = 1000, min_height: int = 4) -> int:
+        """Dark connected components at least `min_height` px tall (dust and noise are smaller)"""
+        work = ImagePreprocessor._thumbnail(image, work_dimension)
+        paper = float(np.median(work))
+        ink = (work < paper - 40).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        return int(np.count_nonzero(stats[1:, cv2.CC_STAT_HEIGHT] >= min_height))
+
+    @staticmethod
+    def _thumbnail(image: np.ndarray, max_dimension: int = 200) -> np.ndarray:
+        """
+        Fast grayscale thumbnail: strided green channel, then an integer-factor
+        area downscale (much cheaper than a fractional INTER_AREA resize).
+        """
+        gray = image[::2, ::2, 1] if len(image.shape) == 3 else image[::2, ::2]
+        factor = max(1, max(gray.shape[:2]) // max_dimension)
+        height = gray.shape[0] // factor * factor
+        width = gray.shape[1] // factor * factor
+        gray = np.ascontiguousarray(gray[:height, :width])
+        if factor == 1:
+            return gray
+        return cv2.resize(gray, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def estimate_x_height(image: np.ndarray) -> Optional[float]:
+        """
+        Estimate the typical lowercase glyph height (in pixels) from connected
+        components. Meant for a cheap low-resolution render of the page.
+        Returns None when the page has too few glyph-like components.
+        """
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+
+        # Dark text on light paper → foreground = white after inversion
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+        page_height = gray.shape[0]
+        heights = [
+            stats[i, cv2.CC_STAT_HEIGHT]
+            for i in range(1, count)
+            # Drop specks, rules, images and merged blobs
+            if 2 <= stats[i, cv2.CC_STAT_HEIGHT] <= page_height / 20
+            and stats[i, cv2.CC_STAT_WIDTH] <= stats[i, cv2.CC_STAT_HEIGHT] * 3
+            and stats[i, cv2.CC_STAT_AREA] >= 3
+        ]
+
+        if len(heights) < 20:
+            return None
+        # Lowercase letters dominate running text, so the median lands near the x-height
+        return float(np.median(heights))
+
+    @staticmethod
+    def detect_text_regions(
+        image: np.ndarray, padding: int = 8, min_density: float = 0.03, max_density: float = 0.6
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        Layout pre-pass: find text blocks as (x, y, width, height) boxes in
+        reading order. Characters are smeared together with a wide closing so
+        words and lines merge into blocks; blocks that are too sparse (specks,
+        rules) or too solid (photos, logos) are dropped.
+        """
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        height, width = ink.shape
+
+        # Kernel scaled to the page: bridges letter and word gaps, not column gutters
+        kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT, (max(3, width // 60), max(3, height // 150))
+        )
+        blocks = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+
+        regions = []
+        for i in range(1, count):
+            x, y, w, h, _ = stats[i]
+            if w < 10 or h < 6:
+                continue
+            density = cv2.countNonZero(ink[y:y + h, x:x + w]) / float(w * h)
+            if not (min_density <= density <= max_density):
+                continue
+            x0, y0 = max(0, x - padding), max(0, y - padding)
+            x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+            regions.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+
+        regions = ImagePreprocessor._merge_overlapping(regions)
+        regions = ImagePreprocessor._merge_stacked(regions)
+        return sorted(regions, key=lambda r: (r[1], r[0]))
+
+    @staticmethod
+    def _merge_stacked(
+        regions: List[Tuple[int, int, int, int]]
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        Merge boxes stacked in the same column (lines of one paragraph or of a
+        ragged/right-aligned column): they overlap horizontally and the gap
+        between them is at most a typical box height - every box left over is
+        another recognition call
+        """
+        if len(regions) < 2:
+            return regions
+        max_gap = float(np.median([h for _, _, _, h in regions]))
+
+        regions = sorted(regions, key=lambda r: (r[1], r[0]))
+        merged = True
+        while merged:
+            merged = False
+            result: List[Tuple[int, int, int, int]] = []
+            for x, y, w, h in regions:
+                for i, (mx, my, mw, mh) in enumerate(result):
+                    overlaps_horizontally = x < mx + mw and mx < x + w
+                    gap = max(y - (my + mh), my - (y + h))
+                    if overlaps_horizontally and gap <= max_gap:
+                        nx, ny = min(x, mx), min(y, my)
+                        result[i] = (nx, ny, max(x + w, mx + mw) - nx, max(y + h, my + mh) - ny)
+                        merged = True
+                        break
+                else:
+                    result.append((x, y, w, h))
+            # Grown boxes can now overlap others
+            regions = ImagePreprocessor._merge_overlapping(result)
+        return regions
+
+    @staticmethod
+    def _merge_overlapping(
+        regions: List[Tuple[int, int, int, int]]
+    ) -> List[Tuple[int, int, int, int]]:
+        """Merge boxes that overlap (padding can make neighbours touch)"""
+        merged = True
+        while merged:
+            merged = False
+            result: List[Tuple[int, int, int, int]] = []
+            for x, y, w, h in regions:
+                for i, (mx, my, mw, mh) in enumerate(result):
+                    if x < mx + mw and mx < x + w and y < my + mh and my < y + h:
+                        nx, ny = min(x, mx), min(y, my)
+                        result[i] = (nx, ny, max(x + w, mx + mw) - nx, max(y + h, my + mh) - ny)
+                        merged = True
+                        break
+                else:
+                    result.append((x, y, w, h))
+            regions = result
+        return regions
+
     @staticmethod
     def resize_if_needed(image: np.ndarray, max_dimension: int = 1500) -> np.ndarray:
         """Resize image if it's too large - optimized for memory-constrained environments"""
@@ -131,3 +481,28 @@ class ImagePreprocessor:
             return Image.fromarray(cv2_image)
         else:  # Color
             return Image.fromarray(cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB))
+
+
+# Stage name → implementation, used by profiles
+PREPROCESSING_STAGES: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "grayscale": ImagePreprocessor._grayscale,
+    "light_denoise": ImagePreprocessor._light_denoise,
+    "denoise": ImagePreprocessor._denoise,
+    "enhance_contrast": ImagePreprocessor._enhance_contrast,
+    "sharpen": ImagePreprocessor._sharpen,
+    "adaptive_threshold": ImagePreprocessor._adaptive_threshold,
+    "deskew": ImagePreprocessor._deskew,
+}
+
+# Stages that move pixels - coordinates found after them don't map back to the input
+GEOMETRY_STAGES = {"deskew"}
+
+# Named preprocessing profiles, cheapest first
+PREPROCESSING_PROFILES: Dict[str, List[str]] = {
+    # Clean digital scans: contrast only
+    "fast": ["grayscale", "enhance_contrast"],
+    # Default: grayscale → light denoise → CLAHE → sharpen (no binarization)
+    "balanced": ["grayscale", "light_denoise", "enhance_contrast", "sharpen"],
+    # Noisy or skewed scans: full pipeline with thresholding and deskew
+    "accurate": ["grayscale", "denoise", "enhance_contrast", "adaptive_threshold", "deskew"],
+}
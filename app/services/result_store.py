@@ -0,0 +1,154 @@
+"""
+app/services/result_store.py
+Finished OCR results, kept for a limited time in a SQLite file shared by all worker processes
+"""
+
+from typing import Dict, Optional, Tuple, Union
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from app.core.config import settings
+from app.schemas.ocr import OCRBatchResponse, OCRResponse
+
+
+StoredResponse = Union[OCRResponse, OCRBatchResponse]
+
+# Expired rows are purged on write at most this often (seconds)
+PURGE_INTERVAL = 60
+
+
+class ResultStore:
+    """
+    job_id → (user_id, response), compressed JSON in SQLite.
+    Entries expire `ttl_seconds` after they were written; past `max_bytes`
+    the least recently read ones are evicted. WAL mode lets every gunicorn
+    worker read while another writes, so /result works from any worker.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    job_id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_results_created ON results (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_results_accessed ON results (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, job_id: str, user_id: int, response: StoredResponse):
+        kind = "batch" if isinstance(response, OCRBatchResponse) else "document"
+        payload = zlib.compress(response.model_dump_json().encode("utf-8"))
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, kind, payload, len(payload), now, now)
+            )
+
+        if now - self._last_purge > PURGE_INTERVAL:
+            self.purge_expired()
+        self._evict()
+
+    def get(self, job_id: str) -> Optional[Tuple[int, StoredResponse]]:
+        """(owner user_id, response), or None when missing or expired"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT user_id, kind, payload FROM results WHERE job_id = ? AND created_at > ?",
+            (job_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+
+        with conn:
+            conn.execute("UPDATE results SET accessed_at = ? WHERE job_id = ?", (time.time(), job_id))
+
+        user_id, kind, payload = row
+        data = json.loads(zlib.decompress(payload))
+        model = OCRBatchResponse if kind == "batch" else OCRResponse
+        return user_id, model(**data)
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+
+    def purge_expired(self) -> int:
+        """Drop entries past their TTL; returns how many were removed"""
+        self._last_purge = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM results WHERE created_at <= ?", (time.time() - self.ttl_seconds,)
+            )
+        return cursor.rowcount
+
+    def _evict(self):
+        """Delete least recently read entries until under 90% of the size limit"""
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        doomed = []
+        rows = conn.execute("SELECT job_id, size FROM results ORDER BY accessed_at").fetchall()
+        for job_id, size in rows:
+            if total <= target:
+                break
+            doomed.append((job_id,))
+            total -= size
+
+        with conn:
+            conn.executemany("DELETE FROM results WHERE job_id = ?", doomed)
+
+    def stats(self) -> Dict[str, object]:
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        return {
+            "entries": count,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Return this process's handle on the shared result store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(
+                settings.RESULT_STORE_PATH,
+                settings.RESULT_STORE_TTL_MINUTES * 60,
+                settings.RESULT_STORE_MAX_MB * 1024 * 1024
+            )
+        return _store
@@ -0,0 +1,193 @@
+"""
+app/services/scheduler.py
+Fair-share page scheduler - interleaves pages of different users' jobs
+"""
+
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+import itertools
+import threading
+import time
+
+from app.core.config import settings
+
+
+# Share of page slots each priority class gets while others are waiting
+PRIORITY_CLASSES = {
+    "interactive": 4.0,  # single images - someone is watching the spinner
+    "bulk": 1.0,  # PDFs and batches
+}
+
+# Wait samples kept per class for the percentile figures
+WAIT_SAMPLES = 1000
+
+
+class PageTicket:
+    """One page waiting for (or holding) a slot"""
+
+    def __init__(self, user_id: int, priority: str, finish_tag: float, sequence: int):
+        self.user_id = user_id
+        self.priority = priority
+        self.finish_tag = finish_tag
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+
+
+class FairPageScheduler:
+    """
+    Weighted fair queuing over page slots.
+    Each page gets a virtual finish tag: max(virtual time, the user's last
+    tag) + 1 / class weight. Free slots go to the waiting page with the
+    lowest tag whose user is under the per-user cap, so a user with a
+    1000-page backlog only gets their fair share while others are waiting,
+    and interactive pages overtake bulk ones.
+    """
+
+    def __init__(self, slots: int, user_cap: int):
+        self.slots = max(1, slots)
+        self.user_cap = max(1, user_cap)
+        self.in_use = 0
+        self.virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._waiting: List[PageTicket] = []
+        self._user_running: Dict[int, int] = defaultdict(int)
+        self._user_tags: Dict[int, float] = {}
+        self._waits: Dict[str, Deque[float]] = {
+            name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITY_CLASSES
+        }
+        self._wait_counts: Dict[str, int] = defaultdict(int)
+
+    def acquire(self, user_id: int, priority: str) -> PageTicket:
+        """Block until this page may run"""
+        weight = PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES["bulk"])
+        with self._condition:
+            start_tag = max(self.virtual_time, self._user_tags.get(user_id, 0.0))
+            ticket = PageTicket(user_id, priority, start_tag + 1.0 / weight, next(self._sequence))
+            self._user_tags[user_id] = ticket.finish_tag
+            self._waiting.append(ticket)
+
+            while self._next_ticket() is not ticket:
+                self._condition.wait()
+
+            self._waiting.remove(ticket)
+            self.in_use += 1
+            self._user_running[user_id] += 1
+            self.virtual_time = max(self.virtual_time, ticket.finish_tag - 1.0 / weight)
+
+            waited = time.monotonic() - ticket.enqueued_at
+            self._waits.setdefault(priority, deque(maxlen=WAIT_SAMPLES)).append(waited)
+            self._wait_counts[priority] += 1
+
+            # Another slot may still be free for someone else
+            self._condition.notify_all()
+        return ticket
+
+    def release(self, ticket: PageTicket):
+        with self._condition:
+            self.in_use -= 1
+            self._user_running[ticket.user_id] -= 1
+            if not self._user_running[ticket.user_id]:
+                del self._user_running[ticket.user_id]
+                # Idle users start fresh at the current virtual time
+                if not any(t.user_id == ticket.user_id for t in self._waiting):
+                    self._user_tags.pop(ticket.user_id, None)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, user_id: int, priority: str):
+        ticket = self.acquire(user_id, priority)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def _next_ticket(self) -> Optional[PageTicket]:
+        """The waiting page that gets the next free slot, if a slot is free"""
+        if self.in_use >= self.slots:
+            return None
+        eligible = [
+            t for t in self._waiting if self._user_running[t.user_id] < self.user_cap
+        ]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda t: (t.finish_tag, t.sequence))
+
+    def stats(self) -> Dict[str, object]:
+        with self._condition:
+            waiting: Dict[str, int] = defaultdict(int)
+            for ticket in self._waiting:
+                waiting[ticket.priority] += 1
+
+            classes = {}
+            for name, samples in self._waits.items():
+                ordered = sorted(samples)
+                classes[name] = {
+                    "weight": PRIORITY_CLASSES.get(name),
+                    "waiting": waiting.get(name, 0),
+                    "pages_started": self._wait_counts.get(name, 0),
+                    "wait_mean_seconds": sum(ordered) / len(ordered) if ordered else 0.0,
+                    "wait_p95_seconds": ordered[int(len(ordered) * 0.95)] if ordered else 0.0,
+                    "wait_max_seconds": ordered[-1] if ordered else 0.0,
+                }
+
+            return {
+                "slots": self.slots,
+                "in_use": self.in_use,
+                "user_cap": self.user_cap,
+                "active_users": len(self._user_running),
+                "classes": classes,
+            }
+
+
+_scheduler: Optional[FairPageScheduler] = None
+_scheduler_lock = threading.Lock()
+
+# Which user / class the current job thread is working for
+_job_context = threading.local()
+
+
+def get_scheduler() -> Optional[FairPageScheduler]:
+    """Return the process-wide page scheduler, or None when fair scheduling is off"""
+    global _scheduler
+    if not settings.OCR_FAIR_SCHEDULING:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairPageScheduler(settings.OCR_PAGE_SLOTS, settings.OCR_USER_PAGE_CAP)
+        return _scheduler
+
+
+@contextmanager
+def job_context(user_id: int, priority: str):
+    """Tag the pages this thread processes with their owner and priority class"""
+    _job_context.owner = (user_id, priority)
+    try:
+        yield
+    finally:
+        _job_context.owner = None
+
+
+def acquire_page_slot() -> Optional[PageTicket]:
+    """Wait for a page slot; None outside a job or with fair scheduling off"""
+    owner = getattr(_job_context, "owner", None)
+    scheduler = get_scheduler()
+    if owner is None or scheduler is None:
+        return None
+    return scheduler.acquire(*owner)
+
+
+def release_page_slot(ticket: Optional[PageTicket]):
+    if ticket is not None:
+        get_scheduler().release(ticket)
+
+
+@contextmanager
+def page_slot():
+    """Hold a page slot for the duration of the block"""
+    ticket = acquire_page_slot()
+    try:
+        yield
+    finally:
+        release_page_slot(ticket)
@@ -0,0 +1,307 @@
+"""
+app/services/search_service.py
+Full-text search over stored page text (SQLite FTS5 / PostgreSQL tsvector + GIN)
+
+The index holds terms only, not a second copy of the text - that lives,
+compressed, in document_pages. Snippets are cut from the decoded text of the
+pages a search returns.
+"""
+
+from sqlalchemy import exists, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Dict, List, Sequence, Tuple
+import re
+import unicodedata
+
+from app.models.user import Document, DocumentPage
+
+
+# PostgreSQL text search configuration - 'simple' doesn't assume English
+PG_TEXT_SEARCH_CONFIG = "simple"
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_WORDS = 16
+
+SQLITE_DDL = [
+    # Contentless: only the inverted index is kept, the rowid is the page id.
+    # The owner column holds a 'u<user_id>' token so the user filter is
+    # answered by the full-text index itself instead of a join; prefix
+    # indexes keep short "term*" queries from scanning the whole vocabulary
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS page_search USING fts5(
+        body, owner, content = '',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS page_search (
+        page_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL,
+        tsv TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_page_search_tsv ON page_search USING GIN (tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_page_search_user ON page_search (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_page_search_document ON page_search (document_id)",
+]
+
+# Rows written per statement while backfilling
+BACKFILL_BATCH = 500
+
+
+def ensure_search_index(engine: Engine):
+    """Create the search table for this database and fill it on first run"""
+    dialect = engine.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        print(f"Full-text search is not available on {dialect}")
+        return
+
+    with engine.begin() as conn:
+        for statement in (SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL):
+            conn.execute(text(statement))
+        if conn.execute(text("SELECT 1 FROM page_search LIMIT 1")).first() is not None:
+            return
+
+    with Session(bind=engine) as db:
+        SearchIndex(db).backfill()
+        db.commit()
+
+
+def _fold(word: str) -> str:
+    """Lower case without diacritics, as the index tokenizes"""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def make_snippet(body: str, query: str, words: int = SNIPPET_WORDS) -> str:
+    """About `words` words of a page around the first matching term, terms marked"""
+    terms = [_fold(term) for term in re.findall(r"\w+\*?", query, re.UNICODE)]
+    whole = {term for term in terms if not term.endswith("*")}
+    prefixes = tuple(term[:-1] for term in terms if term.endswith("*"))
+
+    tokens = list(re.finditer(r"\w+", body, re.UNICODE))
+    if not tokens:
+        return ""
+    matched = [
+        (_fold(token.group()) in whole) or (bool(prefixes) and _fold(token.group()).startswith(prefixes))
+        for token in tokens
+    ]
+    first = matched.index(True) if True in matched else 0
+    start = max(0, min(first - words // 4, len(tokens) - words))
+    end = min(len(tokens), start + words)
+
+    parts = []
+    position = tokens[start].start()
+    for token, hit in zip(tokens[start:end], matched[start:end]):
+        parts.append(body[position:token.start()])
+        parts.append(f"{SNIPPET_START}{token.group()}{SNIPPET_END}" if hit else token.group())
+        position = token.end()
+    snippet = " ".join("".join(parts).split())  # line breaks of the page become spaces
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(tokens) else "")
+
+
+def match_expression(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 expression: every word becomes a quoted
+    phrase (all must match), a trailing * keeps prefix search
+    """
+    terms = re.findall(r"\w+\*?", query, re.UNICODE)
+    phrases = [
+        f'"{term[:-1]}"*' if term.endswith("*") else f'"{term}"'
+        for term in terms
+    ]
+    return " ".join(phrases)
+
+
+class SearchIndex:
+    """Keeps page_search in step with document_pages and answers searches"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    @property
+    def available(self) -> bool:
+        return self.dialect in ("sqlite", "postgresql")
+
+    def index_pages(self, document: Document, pages: Sequence[Tuple[int, str]]):
+        """Add (page_id, text) rows of a document (same transaction as the pages)"""
+        self._insert([
+            {"page_id": page_id, "user_id": document.user_id, "document_id": document.id, "body": body}
+            for page_id, body in pages
+        ])
+
+    def backfill(self):
+        """
+        Index every stored page, plus legacy documents that only have a text blob
+        (as page 1 under the negated document id, which can't clash with a page id).
+        Text is decompressed here, so this walks the tables in id order, a batch at a time.
+        """
+        last_id = 0
+        while True:
+            rows = self.db.query(
+                DocumentPage.id, Document.user_id, DocumentPage.document_id, DocumentPage.text
+            ).join(Document, Document.id == DocumentPage.document_id).filter(
+                DocumentPage.id > last_id
+            ).order_by(DocumentPage.id).limit(BACKFILL_BATCH).all()
+            if not rows:
+                break
+            self._insert([
+                {"page_id": page_id, "user_id": user_id, "document_id": document_id, "body": body}
+                for page_id, user_id, document_id, body in rows
+                if body
+            ])
+            last_id = rows[-1][0]
+
+        last_id = 0
+        while True:
+            rows = self.db.query(Document.id, Document.user_id, Document.extracted_text).filter(
+                Document.id > last_id,
+                Document.extracted_text.isnot(None),
+                ~exists().where(DocumentPage.document_id == Document.id)
+            ).order_by(Document.id).limit(BACKFILL_BATCH).all()
+            if not rows:
+                break
+            self._insert([
+                {"page_id": -document_id, "user_id": user_id, "document_id": document_id, "body": body}
+                for document_id, user_id, body in rows
+            ])
+            last_id = rows[-1][0]
+
+    def _insert(self, rows: List[Dict]):
+        if not self.available or not rows:
+            return
+        if self.dialect == "sqlite":
+            self.db.execute(
+                text("""
+                    INSERT INTO page_search (rowid, body, owner)
+                    VALUES (:page_id, :body, 'u' || :user_id)
+                """),
+                rows
+            )
+        else:
+            self.db.execute(
+                text(f"""
+                    INSERT INTO page_search (page_id, user_id, document_id, tsv)
+                    VALUES (:page_id, :user_id, :document_id,
+                            to_tsvector('{PG_TEXT_SEARCH_CONFIG}', :body))
+                """),
+                rows
+            )
+
+    def remove_document(self, document: Document):
+        """Drop a document's index rows - before its pages are deleted"""
+        if not self.available:
+            return
+        if self.dialect == "postgresql":
+            self.db.execute(
+                text("DELETE FROM page_search WHERE document_id = :document_id"),
+                {"document_id": document.id}
+            )
+            return
+
+        # A contentless FTS5 row is removed by handing back exactly what was
+        # indexed - so only rows that were indexed, with their text
+        pages = self.db.query(DocumentPage.id, DocumentPage.text).filter(
+            DocumentPage.document_id == document.id
+        ).all()
+        entries = [(page_id, body) for page_id, body in pages if body]
+        if not pages:
+            body = self.db.query(Document.extracted_text).filter(Document.id == document.id).scalar()
+            if body is not None:
+                entries = [(-document.id, body)]
+        if entries:
+            self.db.execute(
+                text("""
+                    INSERT INTO page_search (page_search, rowid, body, owner)
+                    VALUES ('delete', :page_id, :body, 'u' || :user_id)
+                """),
+                [{"page_id": page_id, "body": body, "user_id": document.user_id}
+                 for page_id, body in entries]
+            )
+
+    def search(self, user_id: int, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Best matching pages of the user's documents, with highlighted snippets"""
+        if not self.available:
+            return []
+
+        if self.dialect == "sqlite":
+            expression = match_expression(query)
+            if not expression:
+                return []
+            rows = self.db.execute(
+                text("""
+                    SELECT rowid AS page_id, bm25(page_search, 1.0, 0.0) AS rank
+                    FROM page_search
+                    WHERE page_search MATCH :match
+                    ORDER BY rank
+                    LIMIT :limit OFFSET :offset
+                """),
+                {
+                    "match": f"owner : u{int(user_id)} AND body : ({expression})",
+                    "limit": limit, "offset": offset
+                }
+            ).fetchall()
+            # bm25: lower is better
+            hits = [(r.page_id, -r.rank) for r in rows]
+        else:
+            rows = self.db.execute(
+                text(f"""
+                    SELECT ps.page_id, ts_rank(ps.tsv, q) AS rank
+                    FROM page_search ps,
+                         websearch_to_tsquery('{PG_TEXT_SEARCH_CONFIG}', :query) q
+                    WHERE ps.user_id = :user_id AND ps.tsv @@ q
+                    ORDER BY rank DESC
+                    LIMIT :limit OFFSET :offset
+                """),
+                {"query": query, "user_id": user_id, "limit": limit, "offset": offset}
+            ).fetchall()
+            hits = [(r.page_id, r.rank) for r in rows]
+        if not hits:
+            return []
+
+        # Text is decoded for the returned pages only: (document_id, page_number, text)
+        page_ids = [page_id for page_id, _ in hits if page_id > 0]
+        pages = {
+            page_id: (document_id, page_number, body)
+            for page_id, document_id, page_number, body in self.db.query(
+                DocumentPage.id, DocumentPage.document_id, DocumentPage.page_number, DocumentPage.text
+            ).filter(DocumentPage.id.in_(page_ids))
+        } if page_ids else {}
+        legacy_ids = [-page_id for page_id, _ in hits if page_id < 0]
+        if legacy_ids:
+            pages.update(
+                (-document_id, (document_id, 1, body or ""))
+                for document_id, body in self.db.query(Document.id, Document.extracted_text).filter(
+                    Document.id.in_(legacy_ids)
+                )
+            )
+
+        documents = {
+            d.id: d for d in self.db.query(Document).filter(
+                Document.id.in_({document_id for document_id, _, _ in pages.values()}),
+                Document.user_id == user_id
+            )
+        }
+
+        results = []
+        for page_id, score in hits:
+            if page_id not in pages or pages[page_id][0] not in documents:
+                continue
+            document_id, page_number, body = pages[page_id]
+            document = documents[document_id]
+            results.append({
+                "job_id": document.job_id,
+                "filename": document.filename,
+                "page_number": page_number,
+                "snippet": make_snippet(body, query),
+                "score": round(float(score), 4),
+                "created_at": document.created_at.isoformat()
+            })
+        return results
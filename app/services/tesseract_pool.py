@@ -0,0 +1,207 @@
+"""
+app/services/tesseract_pool.py
+Persistent Tesseract recognizers (tesserocr) - no process spawn or model reload per page
+"""
+
+from typing import Dict, Optional, Tuple
+import queue
+import re
+import threading
+
+from PIL import Image
+
+from app.core.config import settings
+
+try:
+    import tesserocr
+except ImportError:  # optional dependency - fall back to pytesseract
+    tesserocr = None
+
+
+# Column order of Tesseract's TSV renderer (same as pytesseract.image_to_data)
+TSV_COLUMNS = [
+    'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+    'left', 'top', 'width', 'height', 'conf', 'text'
+]
+
+
+class TesseractPoolError(Exception):
+    """Raised when the persistent engine can't serve a request"""
+
+
+def parse_config(config: str) -> Tuple[int, int]:
+    """Extract (oem, psm) from a Tesseract CLI config string"""
+    oem = re.search(r'--oem\s+(\d+)', config or '')
+    psm = re.search(r'--psm\s+(\d+)', config or '')
+    return (int(oem.group(1)) if oem else 1, int(psm.group(1)) if psm else 3)
+
+
+def parse_tsv(tsv: str) -> Dict[str, list]:
+    """Parse headerless TSV output into the image_to_data dict layout"""
+    data: Dict[str, list] = {column: [] for column in TSV_COLUMNS}
+    for row in tsv.splitlines():
+        fields = row.split('\t')
+        if len(fields) < len(TSV_COLUMNS) - 1:
+            continue
+        if len(fields) == len(TSV_COLUMNS) - 1:
+            fields.append('')
+        for column, value in zip(TSV_COLUMNS, fields):
+            if column == 'text':
+                data[column].append(value)
+            elif column == 'conf':
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    return data
+
+
+class TesseractWorker:
+    """One long-lived recognizer with its language model loaded"""
+
+    def __init__(self, language: str, oem: int):
+        self.language = language
+        self.oem = oem
+        self.pages_processed = 0
+        self.api = tesserocr.PyTessBaseAPI(lang=language, oem=oem)
+
+    def recognize(self, image: Image.Image, psm: int) -> Dict[str, list]:
+        self.api.SetPageSegMode(psm)
+        self.api.SetImage(image)
+        tsv = self.api.GetTSVText(0)
+        self.api.Clear()
+        self.pages_processed += 1
+        return parse_tsv(tsv)
+
+    def is_healthy(self) -> bool:
+        """Cheap liveness check: the engine still reports its loaded language"""
+        try:
+            return self.language in (self.api.GetInitLanguagesAsString() or '')
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.api.End()
+        except Exception:
+            pass
+
+
+class TesseractPool:
+    """
+    Warm recognizers, keyed by (language, oem), at most `size` per key.
+    Workers are health-checked on checkout and recycled after
+    `recycle_after` pages to contain memory growth in libtesseract.
+    """
+
+    def __init__(self, size: int, recycle_after: int):
+        self.size = max(1, size)
+        self.recycle_after = max(1, recycle_after)
+        self._idle: Dict[Tuple[str, int], queue.Queue] = {}
+        self._created: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self.recycled = 0
+        self.unhealthy = 0
+
+    def recognize(self, image: Image.Image, language: str, config: str) -> Dict[str, list]:
+        oem, psm = parse_config(config)
+        key = (language, oem)
+        worker = self._checkout(key)
+        try:
+            data = worker.recognize(image, psm)
+        except Exception as e:
+            self._discard(key, worker)
+            raise TesseractPoolError(f"Recognizer failed: {e}")
+        self._checkin(key, worker)
+        return data
+
+    def _checkout(self, key: Tuple[str, int]) -> TesseractWorker:
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.Queue())
+            can_create = idle.empty() and self._created.get(key, 0) < self.size
+            if can_create:
+                self._created[key] = self._created.get(key, 0) + 1
+
+        if can_create:
+            try:
+                return TesseractWorker(*key)
+            except Exception as e:
+                self._forget(key)
+                raise TesseractPoolError(f"Could not start recognizer for '{key[0]}': {e}")
+
+        try:
+            worker = idle.get(timeout=settings.OCR_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise TesseractPoolError("Timed out waiting for a free recognizer")
+
+        if not worker.is_healthy():
+            self.unhealthy += 1
+            self._discard(key, worker)
+            return self._checkout(key)
+        return worker
+
+    def _checkin(self, key: Tuple[str, int], worker: TesseractWorker):
+        if worker.pages_processed >= self.recycle_after:
+            self.recycled += 1
+            self._discard(key, worker)
+            return
+        self._idle[key].put(worker)
+
+    def _discard(self, key: Tuple[str, int], worker: TesseractWorker):
+        worker.close()
+        self._forget(key)
+
+    def _forget(self, key: Tuple[str, int]):
+        with self._lock:
+            self._created[key] = max(0, self._created.get(key, 0) - 1)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "engine": "tesserocr",
+                "workers": {f"{lang}/oem{oem}": n for (lang, oem), n in self._created.items()},
+                "recycled": self.recycled,
+                "unhealthy": self.unhealthy,
+            }
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+            self._created.clear()
+
+
+_pool: Optional[TesseractPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_tesseract_pool() -> Optional[TesseractPool]:
+    """
+    Return this process's recognizer pool, or None when the persistent
+    engine is disabled or tesserocr isn't installed.
+    """
+    global _pool
+    if settings.OCR_ENGINE != "tesserocr" or tesserocr is None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = TesseractPool(settings.TESSERACT_POOL_SIZE, settings.TESSERACT_RECYCLE_PAGES)
+        return _pool
+
+
+def shutdown_tesseract_pool():
+    """Release all recognizers (called on application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def engine_status() -> Dict[str, object]:
+    """Describe which recognition engine is active, for health checks"""
+    pool = get_tesseract_pool()
+    if pool is None:
+        return {"engine": "pytesseract", "requested": settings.OCR_ENGINE}
+    return pool.stats()
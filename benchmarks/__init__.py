@@ -0,0 +1,4 @@
+"""
+benchmarks/
+Standalone performance scripts (not part of the application)
+"""
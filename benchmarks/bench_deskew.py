@@ -0,0 +1,78 @@
+"""
+benchmarks/bench_deskew.py
+Compare the projection-profile skew estimator against the previous
+minAreaRect-over-all-foreground-pixels implementation
+
+Usage: python -m benchmarks.bench_deskew [--repeat 5]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.services.preprocessing import ImagePreprocessor
+
+
+def legacy_skew_angle(image: np.ndarray) -> float:
+    """Angle computed by the previous ImagePreprocessor._deskew"""
+    coords = np.column_stack(np.where(image > 0))
+    if len(coords) < 100:
+        return 0.0
+
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = 90 + angle
+    elif angle > 45:
+        angle = angle - 90
+    return angle
+
+
+def synthetic_page(angle: float, width: int, height: int) -> np.ndarray:
+    """Binarized text page (as produced by the threshold stage) skewed by `angle` degrees"""
+    page = np.full((height, width), 255, np.uint8)
+    line_height = max(24, height // 45)
+    for i, y in enumerate(range(line_height * 3, height - line_height * 2, line_height)):
+        cv2.putText(
+            page, f"Invoice line {i}: quick brown fox, total due 1,234.56",
+            (width // 15, y), cv2.FONT_HERSHEY_SIMPLEX, line_height / 40, 0, 2
+        )
+    matrix = cv2.getRotationMatrix2D((width // 2, height // 2), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (width, height), borderValue=255)
+
+
+def timed(func, image, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(image)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [(1275, 1650), (2550, 3300)]  # letter @ 150 and 300 DPI
+    angles = [-4.0, -1.5, 0.0, 0.8, 2.5]
+
+    print(f"{'size':>10} {'true':>6} | {'legacy':>8} {'err':>6} {'ms':>8} | {'new':>8} {'err':>6} {'ms':>8}")
+    for width, height in sizes:
+        for angle in angles:
+            page = synthetic_page(angle, width, height)
+            # Straightening angle is the negative of the applied skew
+            expected = -angle
+
+            legacy, legacy_time = timed(legacy_skew_angle, page, args.repeat)
+            new, new_time = timed(ImagePreprocessor.estimate_skew, page, args.repeat)
+
+            print(
+                f"{width}x{height:<5} {angle:>6.1f} | "
+                f"{legacy:>8.2f} {abs(legacy - expected):>6.2f} {legacy_time * 1000:>8.1f} | "
+                f"{new:>8.2f} {abs(new - expected):>6.2f} {new_time * 1000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
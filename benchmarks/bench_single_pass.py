@@ -0,0 +1,76 @@
+"""
+benchmarks/bench_single_pass.py
+Compare single-pass OCR (image_to_data only) against the legacy two-pass path
+
+Usage: python -m benchmarks.bench_single_pass <file.pdf|image> [--lang eng] [--repeat 3]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import pytesseract
+from pdf2image import convert_from_path
+
+from app.services.ocr_service import OCRService
+
+
+def load_pages(path: str):
+    """Load a PDF or image as a list of OpenCV images"""
+    if os.path.splitext(path)[1].lower() == '.pdf':
+        return [OCRService().preprocessor.pil_to_cv2(p) for p in convert_from_path(path, dpi=150)]
+    image = cv2.imread(path)
+    if image is None:
+        raise SystemExit(f"Could not read image: {path}")
+    return [image]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--lang", default="eng")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = OCRService()
+    pages = load_pages(args.path)
+
+    two_pass_total = 0.0
+    single_pass_total = 0.0
+    mismatches = 0
+
+    for page_num, image in enumerate(pages, start=1):
+        image = service.preprocessor.resize_if_needed(image, max_dimension=1500)
+        processed, _ = service.preprocessor.run_profile(image, "balanced")
+        pil_image = service.preprocessor.cv2_to_pil(processed)
+
+        for _ in range(args.repeat):
+            # Legacy: image_to_data + image_to_string
+            start = time.perf_counter()
+            service._recognize(pil_image, args.lang)
+            legacy_text = pytesseract.image_to_string(
+                pil_image, lang=args.lang, config=service.TESSERACT_CONFIG
+            )
+            two_pass_total += time.perf_counter() - start
+
+            # Single pass: image_to_data only
+            start = time.perf_counter()
+            data = service._recognize(pil_image, args.lang)
+            single_text = service._text_from_data(data)
+            single_pass_total += time.perf_counter() - start
+
+        if service._clean_text(legacy_text) != service._clean_text(single_text):
+            mismatches += 1
+            print(f"Page {page_num}: text differs between modes")
+
+    runs = len(pages) * args.repeat
+    print(f"Pages: {len(pages)}  repeats: {args.repeat}")
+    print(f"Two-pass    avg per page: {two_pass_total / runs:.3f}s")
+    print(f"Single-pass avg per page: {single_pass_total / runs:.3f}s")
+    print(f"Saved per page:           {(two_pass_total - single_pass_total) / runs:.3f}s")
+    print(f"Pages with differing text: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
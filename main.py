@@ -19,6 +19,12 @@ from app.core.database import engine, Base
 from app.routers import auth, users, ocr, pages
 from app.middleware.rate_limit_middleware import RateLimitMiddleware
 from app.utils.file_handlers import cleanup_old_files
+from app.services.page_pool import shutdown_page_pool
+from app.services.tesseract_pool import shutdown_tesseract_pool, engine_status
+from app.services.job_queue import prune_job_queue, shutdown_job_queue
+from app.services.search_service import ensure_search_index
+from app.core.text_codec import get_text_codec
+from app.services.ocr_service import check_progressive_settings
 import asyncio
 
 
@@ -27,23 +33,36 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("Starting PDF OCR Text Extractor...")
+    check_progressive_settings()
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist - add indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    get_text_codec()  # loads the text dictionaries, so after create_all
+    ensure_search_index(engine)
     print(" Database tables created")
     
     # Start background cleanup task
     cleanup_task = asyncio.create_task(periodic_cleanup())
+    prune_task = asyncio.create_task(periodic_job_prune())
     
     yield
     
     # Shutdown
     print("Shutting down application...")
     cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    prune_task.cancel()
+    shutdown_job_queue()
+    shutdown_page_pool()
+    shutdown_tesseract_pool()
+    for task in (cleanup_task, prune_task):
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
 
 async def periodic_cleanup():
@@ -58,6 +77,18 @@ async def periodic_cleanup():
             print(f"Error in cleanup task: {e}")
 
 
+async def periodic_job_prune():
+    """Forget expired finished jobs even when no new uploads arrive"""
+    while True:
+        try:
+            await asyncio.sleep(60)
+            prune_job_queue()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"Error pruning jobs: {e}")
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="PDF OCR Text Extractor",
@@ -129,7 +160,8 @@ async def health_check():
     return {
         "status": "healthy",
         "version": "1.0.0",
-        "service": "pdf-ocr-extractor"
+        "service": "pdf-ocr-extractor",
+        "ocr_engine": engine_status()
     }
 
 
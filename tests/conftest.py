@@ -0,0 +1,17 @@
+"""
+tests/conftest.py
+Settings need a few environment variables before the app modules are imported
+"""
+
+import os
+import sys
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="ocr-tests-")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/test.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("OCR_CACHE_DIR", os.path.join(_scratch, "ocr_cache"))
+os.environ.setdefault("RESULT_STORE_PATH", os.path.join(_scratch, "results.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
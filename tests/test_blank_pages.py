@@ -0,0 +1,32 @@
+"""
+tests/test_blank_pages.py
+Blank-page detection: scanner noise is blank, a single short line is not
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.preprocessing import ImagePreprocessor
+
+
+def _letter_page() -> np.ndarray:
+    """US Letter at 300 DPI"""
+    return np.full((3300, 2550, 3), 255, np.uint8)
+
+
+@pytest.mark.parametrize("text, scale", [("Total 42", 0.8), ("Page 2", 0.6), ("7", 0.6)])
+def test_one_short_line_is_not_blank(text, scale):
+    page = _letter_page()
+    cv2.putText(page, text, (300, 1500), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 2)
+    assert not ImagePreprocessor.is_blank(page)
+
+
+def test_white_and_noisy_scans_are_blank():
+    assert ImagePreprocessor.is_blank(_letter_page())
+
+    rng = np.random.default_rng(0)
+    scan = np.clip(rng.normal(245, 3, (3300, 2550)), 0, 255).astype(np.uint8)
+    for y, x in rng.integers(100, 2400, (30, 2)):
+        scan[y:y + 2, x:x + 2] = 90  # dust
+    assert ImagePreprocessor.is_blank(scan)
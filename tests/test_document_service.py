@@ -0,0 +1,119 @@
+"""
+tests/test_document_service.py
+History and page windows: keyset cursors, next_start, limits
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, get_db
+from app.core.dependencies import get_verified_user
+from app.models.user import User
+from app.routers import ocr
+from app.schemas.ocr import OCRResult
+from app.services import document_service
+from app.services.document_service import DocumentService
+from app.services.search_service import ensure_search_index
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/documents.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    with Session(bind=engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client(db):
+    user = User(email="reader@example.com", hashed_password="x", is_verified=True)
+    db.add(user)
+    db.commit()
+    app = FastAPI()
+    app.include_router(ocr.router)
+    app.dependency_overrides[get_verified_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app), user
+
+
+def _save(db, user_id, job_id, pages=1, created_at=datetime(2024, 5, 1, 12, 0)):
+    results = [OCRResult(page_number=n, text=f"page {n}", processing_time=0.1) for n in range(1, pages + 1)]
+    document = DocumentService(db).save_results(job_id, user_id, f"{job_id}.pdf", results, 0.1)
+    document.created_at = created_at
+    db.commit()
+    return document
+
+
+def test_history_cursor_breaks_created_at_ties_by_id(db):
+    for i in range(5):
+        _save(db, 1, f"job-{i}")  # all in the same instant
+    _save(db, 2, "other-user")
+    service = DocumentService(db)
+
+    seen, cursor = [], None
+    while True:
+        documents, cursor = service.get_history(1, limit=2, cursor=cursor)
+        seen += [document["job_id"] for document in documents]
+        if cursor is None:
+            break
+
+    assert seen == ["job-4", "job-3", "job-2", "job-1", "job-0"]
+
+
+def test_history_last_page_has_no_cursor(db):
+    _save(db, 1, "job-0", created_at=datetime(2024, 5, 1))
+    _save(db, 1, "job-1", created_at=datetime(2024, 5, 2))
+
+    documents, cursor = DocumentService(db).get_history(1, limit=2)
+    assert [document["job_id"] for document in documents] == ["job-1", "job-0"]
+    assert cursor is None
+
+
+def test_history_limit_is_clamped(db, monkeypatch):
+    monkeypatch.setattr(document_service, "MAX_HISTORY_PER_REQUEST", 3)
+    for i in range(5):
+        _save(db, 1, f"job-{i}")
+    service = DocumentService(db)
+
+    assert len(service.get_history(1, limit=1000)[0]) == 3
+    assert len(service.get_history(1, limit=0)[0]) == 1
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bm90IGEgY3Vyc29y", "MjAyNC0wNS0wMXx4"])
+def test_malformed_history_cursor_is_a_bad_request(client, cursor):
+    http, _ = client
+    response = http.get("/history", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid history cursor"
+
+
+def test_page_windows_follow_next_start(client, db):
+    http, user = client
+    _save(db, user.id, "job-a", pages=5)
+
+    numbers, start = [], 1
+    while start is not None:
+        body = http.get("/document/job-a/pages", params={"start": start, "limit": 2}).json()
+        numbers += [page["page_number"] for page in body["pages"]]
+        start = body["next_start"]
+    assert numbers == [1, 2, 3, 4, 5]
+
+    # An end past the last page doesn't promise more
+    body = http.get("/document/job-a/pages", params={"start": 4, "end": 50}).json()
+    assert [page["page_number"] for page in body["pages"]] == [4, 5]
+    assert body["next_start"] is None
+
+
+def test_page_limit_is_clamped(db, monkeypatch):
+    monkeypatch.setattr(document_service, "MAX_PAGES_PER_REQUEST", 3)
+    document = _save(db, 1, "job-a", pages=5)
+    service = DocumentService(db)
+
+    assert [page.page_number for page in service.get_pages(document, limit=1000)] == [1, 2, 3]
+    assert [page.page_number for page in service.get_pages(document, start=2, limit=0)] == [2]
@@ -0,0 +1,105 @@
+"""
+tests/test_export.py
+Exports read back with the tools a user would open them with
+"""
+
+from xml.etree import ElementTree
+import io
+import re
+import shutil
+import subprocess
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.schemas.ocr import OCRResult, WordBox
+from app.services.document_service import DocumentService
+from app.services.export_service import ExportService
+from app.services.search_service import ensure_search_index
+
+XHTML = "{http://www.w3.org/1999/xhtml}"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/export.db")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    with Session(bind=engine) as session:
+        yield session
+
+
+def _save(db, job_id="job-a"):
+    words = [
+        WordBox(text="Invoice", confidence=96, x=100, y=80, width=210, height=40),
+        WordBox(text="2291", confidence=91, x=330, y=80, width=120, height=40),
+        WordBox(text="Total", confidence=88, x=100, y=160, width=150, height=40),
+        WordBox(text="<due>", confidence=85, x=270, y=160, width=150, height=40),
+    ]
+    results = [
+        OCRResult(page_number=1, text="Invoice 2291\nTotal <due>", processing_time=0.1,
+                  words=words, page_width=1200, page_height=1600),
+        OCRResult(page_number=2, text="Terms & conditions", processing_time=0.1, source="text_layer"),
+    ]
+    return DocumentService(db).save_results(job_id, 1, f"{job_id}.pdf", results, 0.2)
+
+
+def _export(db, document, fmt) -> bytes:
+    chunks = list(ExportService(db).export(document, fmt))
+    return b"".join(chunks)
+
+
+def test_hocr_parses_with_words_and_boxes(db):
+    root = ElementTree.fromstring(_export(db, _save(db), "hocr"))
+
+    pages = root.findall(f".//{XHTML}div[@class='ocr_page']")
+    assert [page.get("title") for page in pages] == ["bbox 0 0 1200 1600; ppageno 0", "ppageno 1"]
+    lines = pages[0].findall(f"{XHTML}span[@class='ocr_line']")
+    words = [[word.text for word in line] for line in lines]
+    assert words == [["Invoice", "2291"], ["Total", "<due>"]]
+    assert lines[1][1].get("title") == "bbox 270 160 420 200; x_wconf 85"
+    assert pages[1].find(f"{XHTML}p").text == "Terms & conditions"
+
+
+def test_text_pdf_objects_are_where_the_xref_says(db):
+    pdf = _export(db, _save(db), "text-pdf")
+
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%EOF\n")
+    xref_at = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[xref_at:].startswith(b"xref\n")
+    offsets = re.findall(rb"(\d{10}) 00000 n ", pdf[xref_at:])
+    for object_id, offset in enumerate(offsets, start=1):
+        assert pdf[int(offset):].startswith(b"%d 0 obj" % object_id)
+    assert b"/Count 2" in pdf
+
+
+@pytest.mark.skipif(shutil.which("pdftotext") is None, reason="poppler-utils not installed")
+def test_text_pdf_text_extracts(db, tmp_path):
+    path = tmp_path / "export.pdf"
+    path.write_bytes(_export(db, _save(db), "text-pdf"))
+
+    text = subprocess.run(
+        ["pdftotext", str(path), "-"], capture_output=True, check=True
+    ).stdout.decode("utf-8")
+    pages = text.split("\f")
+    assert pages[0].split() == ["Invoice", "2291", "Total", "<due>"]
+    assert pages[1].split() == ["Terms", "&", "conditions"]
+
+
+def test_zip_holds_one_file_per_document(db):
+    _save(db, "job-a")
+    _save(db, "job-b")
+
+    chunks = list(ExportService(db).export_zip(1, None, "txt"))
+    assert all(chunks)
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert names == ["job-a_job-a.txt", "job-b_job-b.txt"]
+        assert archive.read(names[0]).decode("utf-8") == (
+            "--- Page 1 ---\nInvoice 2291\nTotal <due>\n\n--- Page 2 ---\nTerms & conditions"
+        )
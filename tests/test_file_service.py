@@ -0,0 +1,101 @@
+"""
+tests/test_file_service.py
+Uploads written to disk: archives within the batch limits, streamed bodies, signature checks
+"""
+
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.core.exceptions import BadRequestException
+from app.services import file_service
+from app.services.file_service import FileService
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _zip(members) -> UploadFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return UploadFile(buffer, filename="scans.zip")
+
+
+def test_archive_members_are_saved(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    saved = FileService().save_archive(_zip([("a.png", PNG + b"a"), ("notes.txt", b"skip me")]))
+    assert [name for name, _, _ in saved] == ["a.png"]
+    assert os.path.exists(saved[0][1])
+
+
+def test_archive_expanding_past_limit_is_refused(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "BATCH_MAX_EXTRACTED_MB", 1)
+    # Zeros compress to almost nothing: a small upload, 1.8MB unpacked
+    members = [(f"{i}.png", PNG + bytes(600 * 1024)) for i in range(3)]
+
+    with pytest.raises(BadRequestException, match="unpacks to more than 1MB"):
+        FileService().save_archive(_zip(members))
+    assert os.listdir(tmp_path) == []
+
+
+async def _body(chunks, consumed):
+    for chunk in chunks:
+        consumed.append(len(chunk))
+        yield chunk
+
+
+def test_contents_must_match_the_extension(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    upload = UploadFile(io.BytesIO(PNG + bytes(100)), filename="invoice.pdf")
+
+    with pytest.raises(BadRequestException, match="don't match its extension"):
+        FileService().save_upload(upload)
+    assert os.listdir(tmp_path) == []
+
+
+def test_streamed_body_is_written_in_large_pieces(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    calls = []
+
+    async def run_in_threadpool(func, *args):
+        calls.append(len(args[0]))
+        return func(*args)
+    monkeypatch.setattr(file_service, "run_in_threadpool", run_in_threadpool)
+    chunks = [PNG] + [bytes(64 * 1024)] * 20
+
+    path, digest = asyncio.run(FileService().save_request_stream(_body(chunks, []), "scan.png"))
+
+    assert calls == [file_service.CHUNK_SIZE + len(PNG), 4 * 64 * 1024]
+    assert os.path.getsize(path) == sum(len(chunk) for chunk in chunks)
+
+
+def test_stream_crossing_the_limit_is_aborted(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    consumed = []
+    chunks = [PNG] + [bytes(64 * 1024)] * 80  # 5MB, no Content-Length
+
+    with pytest.raises(BadRequestException, match="too large"):
+        asyncio.run(FileService().save_request_stream(_body(chunks, consumed), "scan.png"))
+    assert len(consumed) < len(chunks)
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversize_content_length_is_refused_before_reading(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    consumed = []
+
+    with pytest.raises(BadRequestException, match="too large"):
+        asyncio.run(FileService().save_request_stream(
+            _body([PNG], consumed), "scan.png", content_length=2 * 1024 * 1024
+        ))
+    assert consumed == [] and os.listdir(tmp_path) == []
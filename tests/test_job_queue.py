@@ -0,0 +1,87 @@
+"""
+tests/test_job_queue.py
+Job queue: admission bookkeeping and jobs answered without a worker
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.core.database import Base, engine
+from app.core.exceptions import ServiceUnavailableException
+from app.schemas.ocr import OCRResult
+from app.services import job_queue
+from app.services.admission import AdmissionController
+from app.services.job_queue import OCRJob, OCRJobQueue
+from app.services.search_service import ensure_search_index
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(memory_budget_mb=1024, max_queued_pages=2, page_slots=1)
+    monkeypatch.setattr(job_queue, "get_admission_controller", lambda: controller)
+    return controller
+
+
+@pytest.fixture
+def queue(admission):
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    queue = OCRJobQueue(workers=1, max_queued=1)
+    yield queue
+    queue.executor.shutdown(wait=True)
+
+
+def test_cached_upload_completes_without_queueing(queue, monkeypatch, tmp_path):
+    upload = tmp_path / "scan.png"
+    upload.write_bytes(b"png")
+    cached = [OCRResult(page_number=1, text="Invoice 42", processing_time=0.5)]
+    monkeypatch.setattr(queue.ocr_service, "cached_results", lambda *args: cached)
+    monkeypatch.setattr(queue.executor, "submit", lambda *args: pytest.fail("job was queued"))
+    finished = []
+
+    job = queue.submit(OCRJob(1, "scan.png", str(upload), file_hash="ab" * 32), on_complete=finished.append)
+
+    assert job.status == "completed" and job.future.done()
+    assert job.response.results[0].text == "Invoice 42"
+    assert finished == [job]
+    assert not upload.exists()
+
+
+def test_failed_submit_gives_admission_back(queue, admission, monkeypatch, tmp_path):
+    upload = tmp_path / "scan.png"
+    upload.write_bytes(b"png")
+
+    def shut_down(*args):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+    monkeypatch.setattr(queue.executor, "submit", shut_down)
+
+    job = OCRJob(1, "scan.png", str(upload))
+    with pytest.raises(RuntimeError):
+        queue.submit(job)
+    assert admission.stats()["queued_jobs"] == 0 and admission.stats()["queued_pages"] == 0
+    assert queue.get(job.job_id) is None
+
+
+def test_capacity_is_checked_before_anything_is_saved(queue, admission):
+    queue.check_capacity()
+
+    admission.queued_pages = admission.max_queued_pages
+    with pytest.raises(ServiceUnavailableException):
+        queue.check_capacity()
+
+
+def test_prune_keeps_only_recent_finished_jobs(queue, monkeypatch):
+    monkeypatch.setattr(settings, "OCR_JOB_MAX_FINISHED", 2)
+    now = datetime.utcnow()
+    jobs = [OCRJob(1, f"{i}.png", f"{i}.png") for i in range(5)]
+    ages = [settings.OCR_JOB_RETENTION_MINUTES + 1, 5, 3, 1]
+    for minutes, job in zip(ages, jobs):
+        job.status, job.finished_at = "completed", now - timedelta(minutes=minutes)
+    queue.jobs = {job.job_id: job for job in jobs}
+
+    queue.prune()
+
+    # The expired job and the oldest beyond the limit go; the running job stays
+    assert set(queue.jobs) == {jobs[2].job_id, jobs[3].job_id, jobs[4].job_id}
@@ -0,0 +1,65 @@
+"""
+tests/test_orientation.py
+Auto-rotate heuristic: turns clearly rotated pages, leaves everything else alone
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.preprocessing import ImagePreprocessor
+
+BODY = [
+    "The quick brown fox jumps over the lazy dog",
+    "Typography is the art of arranging type",
+    "Payment is due within thirty days of receipt",
+    "Please quote the invoice number on all queries",
+    "Shipping and handling charges apply per order",
+    "All prices include applicable sales tax",
+    "Thank you for your business this quarter",
+    "Questions? Call our support line any day",
+]
+
+
+def _page(lines, scale=0.9, step=55) -> np.ndarray:
+    page = np.full((1500, 1100), 255, np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(page, line, (80, 150 + i * step), cv2.FONT_HERSHEY_SIMPLEX, scale, 0, 2)
+    return page
+
+
+def _table() -> np.ndarray:
+    """Ruled 12-row table of short all-caps cells"""
+    page = np.full((1500, 1100), 255, np.uint8)
+    columns = [60, 360, 620, 860, 1040]
+    bottom = 150 + 12 * 60 - 40
+    for row in range(12):
+        y = 150 + row * 60
+        cv2.line(page, (60, y - 40), (1040, y - 40), 0, 2)
+        for x, cell in zip(columns, [f"ITEM {row}", "1,250.00", "QTY 4", "EUR"]):
+            cv2.putText(page, cell, (x + 10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    cv2.line(page, (60, bottom), (1040, bottom), 0, 2)
+    for x in columns:
+        cv2.line(page, (x, 110), (x, bottom), 0, 2)
+    return page
+
+
+@pytest.mark.parametrize("page", [
+    _page([line.upper() for line in BODY]),
+    _table(),
+    _page(["INVOICE 2291 Total due 1,250.00"], scale=1.2),
+], ids=["all-caps", "table", "single-line"])
+def test_upright_pages_are_not_rotated(page):
+    assert ImagePreprocessor.detect_orientation(page) == 0
+
+
+@pytest.mark.parametrize("turned", [0, 90, 180, 270])
+def test_rotated_text_page_is_turned_back(turned):
+    page = ImagePreprocessor.rotate_clockwise(_page(BODY), turned)
+    assert ImagePreprocessor.detect_orientation(page) == (360 - turned) % 360
+
+
+def test_unclear_sideways_pages_are_left_alone():
+    # Sideways all-caps text: which way is up can't be told, so don't guess
+    page = ImagePreprocessor.rotate_clockwise(_page([line.upper() for line in BODY]), 90)
+    assert ImagePreprocessor.detect_orientation(page) == 0
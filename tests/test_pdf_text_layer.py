@@ -0,0 +1,58 @@
+"""
+tests/test_pdf_text_layer.py
+When an embedded PDF text layer may replace OCR
+"""
+
+from app.services.pdf_rasterizer import is_usable_text, parse_image_coverage, parse_page_sizes
+
+
+LETTER = (612.0, 792.0)
+
+PDFINFO_OUTPUT = """Title:          scan
+Pages:          2
+Page    1 size: 612 x 792 pts (letter)
+Page    1 rot:  0
+Page    2 size: 595.276 x 841.89 pts (A4)
+Page    2 rot:  0
+"""
+
+PDFIMAGES_OUTPUT = """page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio
+--------------------------------------------------------------------------------------------
+   1     0 image    2550  3300  gray    1   8  jpeg   no        10  0   300   300  346K  4.1%
+   2     1 image     300   150  rgb     3   8  jpeg   no        14  0   300   300  12K  8.9%
+   2     2 smask     300   150  gray    1   8  image  no        14  0   300   300  2K  4.4%
+"""
+
+BODY = "Quarterly report. Revenue grew in every region this year, led by new contracts. " * 30
+
+
+def test_parses_page_sizes():
+    sizes = parse_page_sizes(PDFINFO_OUTPUT)
+    assert sizes[1] == LETTER
+    assert sizes[2] == (595.276, 841.89)
+
+
+def test_image_coverage_of_full_page_scan_and_small_logo():
+    coverage = parse_image_coverage(PDFIMAGES_OUTPUT, parse_page_sizes(PDFINFO_OUTPUT))
+    assert coverage[1] > 0.99  # 8.5 x 11 in at 300 ppi
+    assert coverage[2] < 0.01  # 1 x 0.5 in logo, soft mask not counted
+
+
+def test_digital_page_is_usable():
+    assert is_usable_text(BODY, LETTER, image_share=0.0)
+
+
+def test_stamp_on_scanned_page_is_not_usable():
+    stamp = "CONFIDENTIAL - ABC0001234 Page 1 of 12"
+    assert not is_usable_text(stamp, LETTER, image_share=1.0)
+    # Even when the image couldn't be measured, a stamp is too sparse for a page
+    assert not is_usable_text(stamp, LETTER, image_share=0.0)
+
+
+def test_full_text_over_scan_image_is_not_trusted():
+    # e.g. a scan with a previous OCR layer - OCR it again rather than trust it blindly
+    assert not is_usable_text(BODY, LETTER, image_share=0.95)
+
+
+def test_garbage_layer_is_not_usable():
+    assert not is_usable_text("�" * 500, LETTER)
@@ -0,0 +1,78 @@
+"""
+tests/test_progressive_refine.py
+Progressive mode: weak draft lines re-recognized and merged back
+"""
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import ocr_service
+from app.services.ocr_service import OCRService, check_progressive_settings
+
+COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+           'left', 'top', 'width', 'height', 'conf', 'text']
+
+
+def _data(words, line_num=1, top=100):
+    """image_to_data columns for one line of (text, conf) words"""
+    data = {column: [] for column in COLUMNS}
+    for i, (text, conf) in enumerate(words, start=1):
+        for column, value in zip(COLUMNS, [5, 1, 1, 1, line_num, i, 100 + i * 120, top, 100, 30, conf, text]):
+            data[column].append(value)
+    return data
+
+
+def _concat(*parts):
+    return {column: sum((part[column] for part in parts), []) for column in COLUMNS}
+
+
+def test_refined_line_replaces_every_draft_word(monkeypatch):
+    service = OCRService()
+    draft = _concat(
+        _data([("Heilo", 40), ("wcrld", 35), ("agaim", 30)]),
+        _data([("Second", 95), ("line", 96)], line_num=2, top=160),
+    )
+    refined = _data([("Hello", 92), ("world", 93), ("again", 91)], top=10)
+    monkeypatch.setattr(service, "_recognize", lambda image, language, config=None: refined)
+
+    page = np.full((400, 800, 3), 255, np.uint8)
+    merged, replaced = service._refine_low_confidence(page, draft, "eng", "fast")
+
+    assert replaced == 1
+    assert service._text_from_data(merged) == "Hello world again\nSecond line"
+
+
+def test_draft_profile_must_keep_geometry(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_PROGRESSIVE", True)
+    monkeypatch.setattr(settings, "OCR_DRAFT_PROFILE", "fast")
+    check_progressive_settings()
+
+    monkeypatch.setattr(settings, "OCR_DRAFT_PROFILE", "accurate")
+    with pytest.raises(ValueError, match="deskew"):
+        check_progressive_settings()
+
+
+@pytest.mark.parametrize("weak, calls", [(2, 3), (10, 2)])
+def test_refine_calls_stay_bounded(monkeypatch, weak, calls):
+    monkeypatch.setattr(settings, "OCR_PROGRESSIVE", True)
+    monkeypatch.setattr(settings, "OCR_TEXT_REGIONS", False)
+    monkeypatch.setattr(settings, "OCR_REFINE_MAX_CALLS", 2)
+    monkeypatch.setattr(ocr_service, "get_page_cache", lambda: None)
+    monkeypatch.setattr(ocr_service, "get_tesseract_pool", lambda: None)
+    service = OCRService()
+    draft = _concat(*(_data([("w", 20)], line_num=n, top=40 * n) for n in range(1, weak + 1)))
+    recognized = []
+
+    def recognize(image, language, config=None):
+        recognized.append(config)
+        return draft
+    monkeypatch.setattr(service, "_recognize", recognize)
+
+    page = np.full((600, 800, 3), 255, np.uint8)
+    page[100:110, 100:700] = 0
+    result = service._process_single_image(page, 1, "eng", "fast")
+
+    # Draft, then one call per weak line - or one full pass once they're too many
+    assert len(recognized) == calls
+    assert not result.is_blank
@@ -0,0 +1,108 @@
+"""
+tests/test_result_store.py
+Result store: TTL expiry, size-based eviction and access from other threads
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+import random
+import threading
+
+import pytest
+
+from app.schemas.ocr import OCRBatchResponse, OCRResponse, OCRResult
+from app.services import result_store
+from app.services.result_store import ResultStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_store, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+def _response(job_id: str, seed: int = 0) -> OCRResponse:
+    # Random text barely compresses, so every response stores about the same size
+    text = "%064x" % random.Random(seed).getrandbits(256)
+    return OCRResponse(
+        job_id=job_id, filename=f"{job_id}.png", total_pages=1,
+        results=[OCRResult(page_number=1, text=text, processing_time=0.1)],
+        total_processing_time=0.1, created_at=datetime(2024, 1, 1)
+    )
+
+
+def test_put_and_get(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "results.db"), ttl_seconds=60, max_bytes=1 << 20)
+    store.put("job-a", 7, _response("job-a"))
+    batch = OCRBatchResponse(
+        batch_id="batch-b", total_files=1, total_pages=1, files=[_response("job-b")],
+        total_processing_time=0.1, created_at=datetime(2024, 1, 1)
+    )
+    store.put("batch-b", 8, batch)
+
+    user_id, response = store.get("job-a")
+    assert user_id == 7 and response == _response("job-a")
+    assert store.get("batch-b") == (8, batch)
+    assert store.get("missing") is None
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "results.db"), ttl_seconds=60, max_bytes=1 << 20)
+    store.put("job-a", 1, _response("job-a"))
+
+    clock.now += 59
+    assert store.get("job-a") is not None
+    clock.now += 2
+    assert store.get("job-a") is None
+
+    assert store.purge_expired() == 1
+    assert store.stats()["entries"] == 0
+
+
+def test_least_recently_read_entries_are_evicted_first(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "results.db"), ttl_seconds=3600, max_bytes=1 << 20)
+    for seed, job_id in enumerate(["job-a", "job-b", "job-c"]):
+        clock.now += 1
+        store.put(job_id, 1, _response(job_id, seed))
+    clock.now += 1
+    store.get("job-a")  # oldest written, most recently read
+
+    # Room for three entries and a half: a fourth pushes out one
+    size = store.stats()["size_bytes"]
+    store.max_bytes = size + size // 6
+    clock.now += 1
+    store.put("job-d", 1, _response("job-d", 3))
+
+    assert store.get("job-b") is None
+    assert [store.get(job_id) is not None for job_id in ["job-a", "job-c", "job-d"]] == [True] * 3
+
+
+def test_other_threads_and_processes_see_results(tmp_path, clock):
+    path = str(tmp_path / "results.db")
+    store = ResultStore(path, ttl_seconds=60, max_bytes=1 << 20)
+    store.put("job-a", 1, _response("job-a"))
+
+    seen = {}
+
+    def read():
+        seen["result"] = store.get("job-a")
+        seen["connection"] = store._connect()
+        store.put("job-b", 2, _response("job-b"))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+
+    assert seen["result"] == (1, _response("job-a"))
+    assert seen["connection"] is not store._connect()
+    # Another worker process opens its own store on the same file
+    assert ResultStore(path, ttl_seconds=60, max_bytes=1 << 20).get("job-b") == (2, _response("job-b"))
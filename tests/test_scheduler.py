@@ -0,0 +1,177 @@
+"""
+tests/test_scheduler.py
+Fair page scheduler: finish-tag order, per-user cap, slots given back on failure
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import page_pool, scheduler
+from app.services.scheduler import FairPageScheduler, job_context
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _grant_order(fair, requests):
+    """
+    Queue (user_id, priority) pages one after another behind a held slot,
+    then free it and return the users in the order their pages ran
+    """
+    order = []
+    held = fair.acquire(0, "bulk")
+
+    def page(user_id, priority):
+        ticket = fair.acquire(user_id, priority)
+        order.append(user_id)
+        fair.release(ticket)
+
+    threads = []
+    for user_id, priority in requests:
+        thread = threading.Thread(target=page, args=(user_id, priority))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: len(fair._waiting) == len(threads))
+
+    fair.release(held)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_pages_run_in_finish_tag_order():
+    fair = FairPageScheduler(slots=1, user_cap=1)
+    order = _grant_order(fair, [(1, "bulk"), (1, "bulk"), (1, "bulk"), (2, "bulk")])
+    # User 2 arrived last but is owed a turn before user 1's second page
+    assert order == [1, 2, 1, 1]
+
+
+def test_interactive_pages_weigh_more_than_bulk():
+    fair = FairPageScheduler(slots=1, user_cap=1)
+    order = _grant_order(fair, [(1, "bulk"), (1, "bulk")] + [(2, "interactive")] * 4)
+    # Tags: bulk 1, 2; interactive 0.25, 0.5, 0.75, 1 (ties go to the earlier page)
+    assert order == [2, 2, 2, 1, 2, 1]
+
+
+def test_interactive_page_overtakes_bulk_backlog():
+    fair = FairPageScheduler(slots=2, user_cap=2)
+    backlog = iter(range(1000))
+    lock = threading.Lock()
+    grants = []
+
+    def bulk_worker():
+        while True:
+            with lock:
+                if next(backlog, None) is None:
+                    return
+            ticket = fair.acquire(1, "bulk")
+            with lock:
+                grants.append(1)
+            time.sleep(0.0005)
+            fair.release(ticket)
+
+    workers = [threading.Thread(target=bulk_worker) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    _wait_for(lambda: len(grants) >= 20)
+
+    with lock:
+        requested_at = len(grants)
+    ticket = fair.acquire(2, "interactive")
+    with lock:
+        granted_at = len(grants)
+        grants.append(2)
+    fair.release(ticket)
+    for worker in workers:
+        worker.join()
+
+    # The next free slot went to user 2, not to the rest of user 1's 1000 pages
+    assert granted_at - requested_at <= 1
+    assert grants.index(2) < 100
+    assert grants.count(1) == 1000
+
+
+def test_user_page_cap_holds():
+    fair = FairPageScheduler(slots=4, user_cap=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def pages():
+        for _ in range(10):
+            with fair.slot(1, "bulk"):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.001)
+                with lock:
+                    running[0] -= 1
+
+    threads = [threading.Thread(target=pages) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+    assert fair.in_use == 0 and fair.stats()["active_users"] == 0
+
+
+def test_wait_stats_per_class():
+    fair = FairPageScheduler(slots=1, user_cap=1)
+    held = fair.acquire(1, "bulk")
+    waiter = threading.Thread(target=lambda: fair.release(fair.acquire(2, "interactive")))
+    waiter.start()
+    _wait_for(lambda: fair.stats()["classes"]["interactive"]["waiting"] == 1)
+    time.sleep(0.05)
+    fair.release(held)
+    waiter.join()
+
+    classes = fair.stats()["classes"]
+    assert classes["bulk"]["pages_started"] == 1 and classes["bulk"]["wait_max_seconds"] < 0.05
+    assert classes["interactive"]["pages_started"] == 1 and classes["interactive"]["waiting"] == 0
+    assert classes["interactive"]["wait_max_seconds"] >= 0.05
+
+
+@pytest.fixture
+def fair(monkeypatch):
+    fair = FairPageScheduler(slots=1, user_cap=1)
+    monkeypatch.setattr(settings, "OCR_FAIR_SCHEDULING", True)
+    monkeypatch.setattr(scheduler, "_scheduler", fair)
+    return fair
+
+
+def test_page_pool_gives_slots_back_when_a_worker_fails(fair, monkeypatch):
+    def fail(image, page_number, *args):
+        raise RuntimeError(f"page {page_number} failed")
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(page_pool, "get_page_pool", lambda: executor)
+    monkeypatch.setattr(page_pool, "_ocr_page_in_worker", fail)
+    pages = [(n, np.zeros((10, 10), np.uint8)) for n in (1, 2, 3)]
+
+    with job_context(1, "bulk"), pytest.raises(RuntimeError, match="page 1 failed"):
+        page_pool.process_pages_parallel(pages, "eng", "fast")
+    executor.shutdown(wait=True)
+
+    _wait_for(lambda: fair.in_use == 0)
+
+
+def test_page_pool_gives_slot_back_when_submit_fails(fair, monkeypatch):
+    class ShutDownPool:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(page_pool, "get_page_pool", lambda: ShutDownPool())
+
+    with job_context(1, "bulk"), pytest.raises(RuntimeError, match="shutdown"):
+        page_pool.process_pages_parallel([(1, np.zeros((10, 10), np.uint8))], "eng", "fast")
+    assert fair.in_use == 0
@@ -0,0 +1,63 @@
+"""
+tests/test_search.py
+Full-text search: contentless index, snippets cut from the stored pages
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.schemas.ocr import OCRResult
+from app.services.document_service import DocumentService
+from app.services.search_service import SearchIndex, ensure_search_index, make_snippet
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/search.db")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    with Session(bind=engine) as session:
+        yield session
+
+
+def _save(db, job_id, user_id, *pages):
+    results = [
+        OCRResult(page_number=number, text=body, processing_time=0.1)
+        for number, body in enumerate(pages, start=1)
+    ]
+    return DocumentService(db).save_results(job_id, user_id, f"{job_id}.pdf", results, 0.2)
+
+
+def test_search_finds_pages_with_snippets(db):
+    _save(db, "job-a", 1, "Cover sheet", "Invoice 2291\nTotal due: 1,250.00 EUR by 30 June")
+    _save(db, "job-b", 2, "Invoice for somebody else")
+
+    hits = SearchIndex(db).search(1, "invoice tot*")
+
+    assert [(hit["job_id"], hit["page_number"]) for hit in hits] == [("job-a", 2)]
+    assert hits[0]["snippet"] == "<mark>Invoice</mark> 2291 <mark>Total</mark> due: 1,250.00 EUR by 30 June"
+
+
+def test_index_keeps_no_copy_of_the_text(db):
+    _save(db, "job-a", 1, "Quarterly report for the board")
+    ddl = db.execute(text("SELECT sql FROM sqlite_master WHERE name = 'page_search'")).scalar()
+    assert "content = ''" in ddl
+    assert db.execute(text("SELECT body FROM page_search")).scalar() is None
+
+
+def test_deleted_document_leaves_the_index(db):
+    document = _save(db, "job-a", 1, "Quarterly report", "")
+    DocumentService(db).delete_document(document)
+
+    assert SearchIndex(db).search(1, "quarterly") == []
+    integrity = "INSERT INTO page_search (page_search, rank) VALUES ('integrity-check', 1)"
+    db.execute(text(integrity))  # raises if the delete corrupted the index
+
+
+def test_snippet_marks_accented_and_prefix_matches():
+    body = " ".join(f"word{i}" for i in range(30)) + " Café crème brûlée " + " ".join(["tail"] * 30)
+    snippet = make_snippet(body, "cafe brul*")
+    assert "<mark>Café</mark> crème <mark>brûlée</mark>" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
@@ -0,0 +1,26 @@
+"""
+tests/test_text_codec.py
+Stored text compression with dictionaries kept in the database
+"""
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.text_codec import HEADER, TextCodec, save_dictionary, train_dictionary
+
+PAGES = [f"Invoice {n} Payment terms: net 30 days. Remit to Acme Supplies Ltd, Portsmouth" for n in range(40)]
+
+
+def setup_function():
+    Base.metadata.create_all(bind=engine)
+
+
+def test_trained_dictionary_is_shared_through_the_database():
+    data = train_dictionary(PAGES)
+    with SessionLocal() as db:
+        dict_id = save_dictionary(db, data)
+
+    # A process started later - another worker, or after a redeploy
+    writer, reader = TextCodec("zlib", 6), TextCodec("zlib", 6)
+    value = writer.encode(PAGES[0])
+    assert HEADER.unpack_from(value)[1] == dict_id
+    assert reader.decode(value) == PAGES[0]
+
@@ -0,0 +1,56 @@
+"""
+tests/test_text_regions.py
+Layout pre-pass: text blocks sent to recognition one by one
+"""
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.ocr_service import OCRService
+from app.services.preprocessing import ImagePreprocessor
+
+
+def _text(page, text, x, y, scale=0.9, align_right=False):
+    (width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    origin = (x - width, y) if align_right else (x, y)
+    cv2.putText(page, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 0, 2)
+
+
+def form_page() -> np.ndarray:
+    """Sparse form: a title top-left and a right-aligned 4-line address column"""
+    page = np.full((1500, 1100), 255, np.uint8)
+    _text(page, "Purchase Order 2291", 80, 120, scale=1.2)
+    for i, line in enumerate(["Acme Supplies Ltd", "42 Harbour Road", "Portsmouth", "PO1 3AX"]):
+        _text(page, line, 1020, 420 + i * 55, align_right=True)
+    return page
+
+
+def test_right_aligned_column_is_one_region():
+    regions = ImagePreprocessor.detect_text_regions(form_page())
+    assert len(regions) == 2
+    column = regions[1]
+    assert column[1] < 420 - 20 and column[1] + column[3] > 420 + 3 * 55
+
+
+def test_separate_columns_are_not_merged():
+    page = np.full((1500, 1100), 255, np.uint8)
+    for i in range(4):
+        _text(page, "left column text", 60, 300 + i * 55)
+        _text(page, "right column", 1040, 300 + i * 55, align_right=True)
+    assert len(ImagePreprocessor.detect_text_regions(page)) == 2
+
+
+def test_many_regions_fall_back_to_whole_page_without_persistent_engine(monkeypatch):
+    page = np.full((1500, 1100), 255, np.uint8)
+    # Scattered labels far apart: one block each
+    for i in range(6):
+        _text(page, f"Field {i}", 80 + (i % 2) * 600, 150 + i * 220)
+    assert len(ImagePreprocessor.detect_text_regions(page)) == 6
+
+    monkeypatch.setattr("app.services.ocr_service.get_tesseract_pool", lambda: None)
+    assert OCRService()._select_regions(page) is None
+
+    monkeypatch.setattr("app.services.ocr_service.get_tesseract_pool", lambda: object())
+    assert len(OCRService()._select_regions(page)) == 6
+    assert 6 > settings.OCR_TEXT_REGIONS_MAX_CALLS